@@ -8,7 +8,8 @@ Description: 程序入口，直接进入登录界面
 @Contact  ：king.songtao@gmail.com
 """
 import streamlit as st
-from utils.utils import set_login_state, check_login_state, log_out, add_active_session
+from utils.app_metrics import page_timer
+from utils.utils import set_login_state, check_login_state, log_out, add_active_session, show_notices
 from utils.db_operations_v2 import login_auth
 from utils.styles import apply_global_styles
 
@@ -16,6 +17,8 @@ from utils.styles import apply_global_styles
 def main():
     st.set_page_config(page_title='ATM-Cleaning', page_icon='images/favicon.png')
     apply_global_styles()
+    # 显示其他页面跳转时暂存的提示，如未登录、密码修改成功
+    show_notices()
     # 添加CSS样式
     st.markdown(
         """
@@ -114,4 +117,5 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    with page_timer():
+        main()
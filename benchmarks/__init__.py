@@ -0,0 +1,9 @@
+"""
+Description: 数据层基准测试
+
+-*- Encoding: UTF-8 -*-
+@File     ：__init__.py
+@Author   ：King Songtao
+@Time     ：2025/2/23 下午3:05
+@Contact  ：king.songtao@gmail.com
+"""
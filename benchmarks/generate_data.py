@@ -0,0 +1,249 @@
+"""
+Description: 生成基准测试用的模拟数据
+
+    按墨尔本的地址、保洁组规模、ABN 比例和收入分布生成 clean_teams、users 和 work_orders，
+    并重建月度汇总表。相同的参数和随机种子生成相同的数据。
+
+    在项目根目录运行：
+        python -m benchmarks.generate_data --db benchmarks/data/bench.sqlite --orders 100000
+    也可以用 --url 指定 MySQL 测试库；目标库已有工单时需加 --reset 清空，请勿指向生产库。
+
+-*- Encoding: UTF-8 -*-
+@File     ：generate_data.py
+@Author   ：King Songtao
+@Time     ：2025/2/23 下午3:10
+@Contact  ：king.songtao@gmail.com
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from configs.settings import *
+from utils.amount_calculator import calculate_total_amounts, invalidate_team_cache
+from utils.db_engine import DATABASE_URL_ENV, get_connection
+from utils.db_operations_v2 import rebuild_team_month_rollup
+from utils.query_cache import query_cache
+
+# 工单来源及占比
+SOURCES = {
+    'Airtasker': 0.3, '老客户': 0.2, '小红书': 0.15, '微信': 0.15,
+    'Gumtree': 0.08, 'Google': 0.07, 'Facebook': 0.05
+}
+
+# 墨尔本常见区域及邮编
+SUBURBS = [
+    ('Melbourne', 3000), ('Southbank', 3006), ('Docklands', 3008), ('Carlton', 3053), ('Brunswick', 3056),
+    ('Fitzroy', 3065), ('Collingwood', 3066), ('Preston', 3072), ('Doncaster', 3108), ('Richmond', 3121),
+    ('Hawthorn', 3122), ('Camberwell', 3124), ('Box Hill', 3128), ('Ringwood', 3134), ('South Yarra', 3141),
+    ('Glen Waverley', 3150), ('Clayton', 3168), ('Dandenong', 3175), ('Prahran', 3181), ('St Kilda', 3182),
+    ('Frankston', 3199), ('Footscray', 3011), ('Sunshine', 3020), ('Point Cook', 3030), ('Werribee', 3030)
+]
+
+STREETS = [
+    "A'Beckett St", 'Collins St', 'Bourke St', 'Flinders St', 'Elizabeth St', 'Swanston St', 'Lonsdale St',
+    'Queen St', 'William St', 'Spencer St', 'Lygon St', 'Sydney Rd', 'Chapel St', 'Church St', 'High St',
+    'Station St', 'Victoria St', 'Whitehorse Rd', 'Burwood Hwy', 'Springvale Rd', 'Blackburn Rd',
+    'Glenferrie Rd', 'Toorak Rd', 'Punt Rd', 'Hoddle St', 'Nicholson St', 'Racecourse Rd', 'Ballarat Rd'
+]
+
+REMARKS = ['钥匙在前台', '需要带梯子', '有宠物', '退租清洁', '客户要求下午到', '停车位在B2']
+
+STAFF = ['张伟', '王芳', '李娜', '刘洋', '陈静', '杨磊', '赵敏', '黄婷']
+
+# 与新建工单页一致的保洁时间选项
+WORK_TIMES = [
+    f"{'上午' if hour < 12 else '下午'} {hour:02d}:{minute:02d}"
+    for hour in range(6, 22) for minute in range(0, 60, 15)
+]
+
+# 付款方式占比：仅现金、仅转账、两者都有
+PAYMENT_MIX = [0.4, 0.45, 0.15]
+
+INSERT_CHUNK_SIZE = 5000
+
+
+def generate_teams(rng, count: int) -> pd.DataFrame:
+    """生成保洁组：约 40% 注册 ABN，约 15% 已离职"""
+    return pd.DataFrame({
+        'team_name': [f"保洁{i + 1:03d}组" for i in range(count)],
+        'contact_number': [f"04{number:08d}" for number in rng.integers(0, 10 ** 8, count)],
+        'is_active': (rng.random(count) >= 0.15).astype(int),
+        'has_abn': (rng.random(count) < 0.4).astype(int),
+        'notes': None
+    })
+
+
+def generate_orders(rng, count: int, teams: pd.DataFrame, days: int = 730, today: date = None) -> pd.DataFrame:
+    """生成最近 days 天内的工单
+
+    Args:
+        rng: numpy 随机数生成器
+        count: 工单数量
+        teams: generate_teams 生成的保洁组
+        days: 登记日期分布的天数
+        today: 基准日期，默认为当天
+
+    Returns:
+        DataFrame: 列与 work_orders 表一致的工单数据
+    """
+    today = today or date.today()
+    start = np.datetime64(today - timedelta(days=days))
+
+    order_dates = start + rng.integers(0, days + 1, count).astype('timedelta64[D]')
+    work_dates = order_dates + rng.integers(0, 15, count).astype('timedelta64[D]')
+    # 约 8% 的工单尚未确定保洁日期
+    unscheduled = rng.random(count) < 0.08
+
+    # 少数保洁组承接大部分工单，约 6% 尚未派单
+    weights = rng.dirichlet(np.full(len(teams), 0.8))
+    cleaners = np.asarray(teams['team_name'])[rng.choice(len(teams), count, p=weights)]
+    cleaners = np.where(rng.random(count) < 0.06, '暂未派单', cleaners)
+
+    # 订单金额服从对数正态分布，按 5 元取整
+    amounts = np.clip(np.round(rng.lognormal(np.log(180), 0.45, count) / 5) * 5, 60, 1500).astype(int)
+    payment = rng.choice(3, count, p=PAYMENT_MIX)
+    cash_share = np.round(amounts * rng.uniform(0.3, 0.7, count)).astype(int)
+    income1 = np.select([payment == 0, payment == 2], [amounts, cash_share], 0)
+    income2 = amounts - income1
+    subsidy = np.where(rng.random(count) < 0.06, rng.choice([10, 20, 30, 50], count), np.nan)
+
+    abn_map = {name: bool(has_abn) for name, has_abn in zip(teams['team_name'], teams['has_abn'])}
+    order_amount, total_amount = calculate_total_amounts(
+        {'income1': income1, 'income2': income2, 'assigned_cleaner': cleaners}, abn_map
+    )
+
+    invoice_status = np.where(income2 > 0, np.where(rng.random(count) < 0.7, '已开票', '未开票'), '不开票')
+
+    units = rng.integers(1, 3000, count)
+    numbers = rng.integers(1, 500, count)
+    streets = rng.integers(0, len(STREETS), count)
+    suburbs = rng.integers(0, len(SUBURBS), count)
+    has_unit = rng.random(count) < 0.35
+    addresses = [
+        f"{f'{unit}/' if unit_flag else ''}{number} {STREETS[street]}, "
+        f"{SUBURBS[suburb][0]} VIC {SUBURBS[suburb][1]}"
+        for unit, unit_flag, number, street, suburb in zip(units, has_unit, numbers, streets, suburbs)
+    ]
+
+    created_at = pd.to_datetime(order_dates) + pd.to_timedelta(rng.integers(8 * 3600, 20 * 3600, count), unit='s')
+
+    return pd.DataFrame({
+        'order_date': pd.to_datetime(order_dates).date,
+        'work_date': np.where(unscheduled, None, pd.to_datetime(work_dates).date),
+        'work_time': np.where(unscheduled, None, np.asarray(WORK_TIMES)[rng.integers(0, len(WORK_TIMES), count)]),
+        'created_by': np.asarray(STAFF)[rng.integers(0, len(STAFF), count)],
+        'source': rng.choice(list(SOURCES), count, p=list(SOURCES.values())),
+        'work_address': addresses,
+        'assigned_cleaner': cleaners,
+        'income1': income1,
+        'income2': income2,
+        'subsidy': subsidy,
+        'order_amount': np.round(order_amount, 2),
+        'total_amount': np.round(total_amount, 2),
+        'remarks': np.where(rng.random(count) < 0.1, np.asarray(REMARKS)[rng.integers(0, len(REMARKS), count)], None),
+        'invoice_status': invoice_status,
+        'created_at': created_at.to_pydatetime(),
+        'updated_at': created_at.to_pydatetime()
+    })
+
+
+def _to_python(value):
+    """将 numpy/pandas 标量转换为数据库驱动支持的 Python 类型"""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _insert(connection, table: str, frame: pd.DataFrame):
+    """分批插入数据，NaN 写入为 NULL"""
+    columns = list(frame.columns)
+    statement = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)})"
+    )
+    frame = frame.astype(object).where(frame.notna(), None)
+    for start in range(0, len(frame), INSERT_CHUNK_SIZE):
+        rows = frame.iloc[start:start + INSERT_CHUNK_SIZE].to_dict('records')
+        connection.execute(statement, [{key: _to_python(value) for key, value in row.items()} for row in rows])
+
+
+def generate_dataset(conn, orders: int, teams: int = 30, seed: int = 0, reset: bool = False) -> dict:
+    """向数据库写入模拟的保洁组、员工和工单，并重建月度汇总表
+
+    Args:
+        conn: 数据库连接
+        orders: 工单数量
+        teams: 保洁组数量（不含“暂未派单”）
+        seed: 随机种子
+        reset: 是否先清空工单、保洁组和员工数据；为 False 且已有工单时抛出异常
+
+    Returns:
+        dict: 各表写入的行数及耗时
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    team_frame = generate_teams(rng, teams)
+    order_frame = generate_orders(rng, orders, team_frame)
+
+    with conn.engine.begin() as connection:
+        existing = connection.execute(text("SELECT COUNT(*) FROM work_orders")).scalar()
+        if existing and not reset:
+            raise RuntimeError(f"目标数据库已有 {existing} 条工单，如需覆盖请使用 reset")
+
+        for table in ['work_order_images', 'work_order_tombstones', 'team_month_rollup', 'work_orders', 'clean_teams', 'users']:
+            connection.execute(text(f"DELETE FROM {table}"))
+
+        _insert(connection, 'clean_teams', pd.concat([
+            pd.DataFrame([{'team_name': '暂未派单', 'contact_number': '', 'is_active': 1, 'has_abn': 0, 'notes': None}]),
+            team_frame
+        ], ignore_index=True))
+        _insert(connection, 'users', pd.DataFrame({
+            'username': ['admin'] + [f"staff{i + 1}" for i in range(len(STAFF))],
+            'password': 'bench',
+            'role': ['admin'] + ['customer_service'] * len(STAFF),
+            'name': ['管理员'] + STAFF
+        }))
+        _insert(connection, 'work_orders', order_frame)
+
+    query_cache.clear()
+    invalidate_team_cache()
+    success, error = rebuild_team_month_rollup()
+    if not success:
+        raise RuntimeError(error)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"已生成 {teams} 个保洁组、{orders} 条工单，耗时 {elapsed:.1f} 秒")
+    return {'clean_teams': teams + 1, 'users': len(STAFF) + 1, 'work_orders': orders, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试用的模拟数据")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help="SQLite 数据库文件，不存在时自动创建")
+    target.add_argument('--url', help="SQLAlchemy 连接地址，如 MySQL 测试库")
+    parser.add_argument('--orders', type=int, default=100000, help="工单数量")
+    parser.add_argument('--teams', type=int, default=30, help="保洁组数量")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--reset', action='store_true', help="清空目标库中已有的工单、保洁组和员工")
+    args = parser.parse_args()
+
+    if args.db:
+        os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    os.environ[DATABASE_URL_ENV] = args.url or f"sqlite:///{os.path.abspath(args.db)}"
+
+    try:
+        generate_dataset(get_connection(), args.orders, args.teams, args.seed, args.reset)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
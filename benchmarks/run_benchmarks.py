@@ -0,0 +1,411 @@
+"""
+Description: 数据层基准测试
+
+    对每个数据规模生成（或复用）一个 SQLite 模拟数据库，依次计时 db_operations_v2 中的全部函数
+    以及页面中的 pandas 后处理，结果写入 JSON，便于在版本之间比较。
+
+    只读函数分别测量缓存未命中（cold，每次执行前清空共享查询缓存）和命中（warm）两种情况；
+    写入函数每次执行后都会使相关缓存失效，只测量一次。写入测试尽量还原修改，
+    但会新增和删除工单、改变 updated_at，因此数据库文件仅用于基准测试。
+
+    在项目根目录运行：
+        python -m benchmarks.run_benchmarks --sizes 10000,100000,1000000
+        python -m benchmarks.run_benchmarks --sizes 10000 --compare benchmarks/results/上一版本.json
+
+-*- Encoding: UTF-8 -*-
+@File     ：run_benchmarks.py
+@Author   ：King Songtao
+@Time     ：2025/2/23 下午4:20
+@Contact  ：king.songtao@gmail.com
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import generate_dataset
+from configs.settings import *
+from utils import db_operations_v2 as db
+from utils.amount_calculator import invalidate_team_cache
+from utils.data_context import DataContext
+from utils.db_engine import DATABASE_URL_ENV, get_connection, read_sql
+from utils.db_metrics import count_rows
+from utils.query_cache import query_cache
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+
+
+def _tuple_error(result):
+    """db_operations_v2 的函数大多以 (结果, 错误信息) 返回，最后一项为错误信息"""
+    return result[-1] if isinstance(result, tuple) else None
+
+
+# 一个测试项：
+#   name: 名称
+#   kind: read（只读，分别测量 cold/warm）、write（写入）或 page（页面后处理）
+#   run: 无参数的函数
+#   error: 从返回值中取出错误信息的函数
+Case = namedtuple('Case', ['name', 'kind', 'run', 'error'], defaults=[_tuple_error])
+
+
+def measure(case: Case, repeat: int, before=None) -> dict:
+    """执行测试项 repeat 次并统计耗时（毫秒）
+
+    Args:
+        case: 测试项
+        repeat: 执行次数
+        before: 每次执行前调用（不计时），如清空缓存
+
+    Returns:
+        dict: 耗时统计及返回的行数
+    """
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = case.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+        error = case.error(result)
+        if error:
+            raise RuntimeError(f"{case.name} 执行失败：{error}")
+        rows = count_rows(result)
+
+    timings = np.array(timings)
+    return {
+        'repeat': repeat,
+        'min_ms': round(float(timings.min()), 3),
+        'median_ms': round(float(np.median(timings)), 3),
+        'mean_ms': round(float(timings.mean()), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'max_ms': round(float(timings.max()), 3),
+        'rows': rows
+    }
+
+
+def _label(item: dict) -> str:
+    """结果的显示名称，只读测试项附带缓存状态"""
+    return f"[{item['size']}] {item['name']}" + (f" ({item['cache']})" if item['cache'] else '')
+
+
+def clear_caches():
+    query_cache.clear()
+    invalidate_team_cache()
+
+
+def read_cases(context: dict) -> list:
+    """只读函数的测试项"""
+    today = context['today']
+    team = context['team']
+    page_size = BaseConfig().WORK_ORDER_PAGE_SIZE
+
+    def orders_page_batch():
+        # 与工单管理页每次运行登记的查询一致
+        data = DataContext(db.connect_db(read_only=True))
+        data.add('teams', db.active_clean_teams_query())
+        data.add('totals', db.work_order_totals_query('month'))
+        data.add('filter_options', db.work_order_filter_options_query('month'))
+        for name, spec in db.work_order_changes_queries(None, 'month').items():
+            data.add(f"changes_{name}", spec)
+        data.add('page', db.work_orders_page_query('month', page_size=page_size))
+        return data.fetch()
+
+    cases = [
+        Case(f"get_work_orders[{time_range}]", 'read', lambda time_range=time_range: db.get_work_orders(time_range))
+        for time_range in ['week', 'month', 'year']
+    ]
+    cases += [
+        Case('get_work_orders_page[first]', 'read', lambda: db.get_work_orders_page('year', page_size=page_size)),
+        Case('get_work_orders_page[deep]', 'read',
+             lambda: db.get_work_orders_page('year', cursor=context['deep_cursor'], page_size=page_size)),
+        Case('get_work_orders_page[team]', 'read',
+             lambda: db.get_work_orders_page('year', page_size=page_size, cleaners=[team['team_name']])),
+        Case('get_work_order_totals[month]', 'read', lambda: db.get_work_order_totals('month')),
+        Case('get_work_order_totals[year]', 'read', lambda: db.get_work_order_totals('year')),
+        Case('get_work_order_filter_options[year]', 'read', lambda: db.get_work_order_filter_options('year')),
+        Case('get_work_order_changes[60s]', 'read',
+             lambda: db.get_work_order_changes(context['watermark'] - timedelta(seconds=60), 'month')),
+        Case('get_work_orders_by_date_range[30d]', 'read',
+             lambda: db.get_work_orders_by_date_range(today - timedelta(days=30), today)),
+        Case('get_team_monthly_orders', 'read',
+             lambda: db.get_team_monthly_orders(team['id'], today.year, today.month)),
+        Case('get_all_teams_monthly_orders', 'read',
+             lambda: db.get_all_teams_monthly_orders(today.year, today.month)),
+        Case('get_active_clean_teams', 'read', db.get_active_clean_teams),
+        Case('get_all_clean_teams', 'read', db.get_all_clean_teams),
+        Case('get_all_staff_acc', 'read', db.get_all_staff_acc),
+        Case('login_auth', 'read', lambda: db.login_auth('admin', 'bench'), lambda result: result[2]),
+        Case('DataContext[orders_statistics]', 'read', orders_page_batch)
+    ]
+    return cases
+
+
+def page_cases(context: dict) -> list:
+    """页面中 pandas 后处理的测试项，页面组件在命令行中运行时不输出任何内容"""
+    from pages.monthly_review import process_orders_data, show_team_monthly_stats
+    from pages.orders_statistics import show_work_orders_table
+    from pages.staff_acc import show_clean_teams_table
+
+    today = context['today']
+    team = context['team']
+    page, _ = db.get_work_orders_page('year', page_size=BaseConfig().WORK_ORDER_PAGE_SIZE)
+    teams, _ = db.get_active_clean_teams()
+    cleaner_options = [item['team_name'] for item in teams]
+    orders, totals, _ = db.get_all_teams_monthly_orders(today.year, today.month)
+    team_orders = orders[orders['team_name'] == team['team_name']]
+    team_totals = totals.loc[team['team_name']] if team['team_name'] in totals.index else None
+    clean_teams, _ = db.get_all_clean_teams()
+
+    return [
+        Case('orders_statistics.show_work_orders_table', 'page',
+             lambda: show_work_orders_table(page, cleaner_options)),
+        Case('monthly_review.process_orders_data[all teams]', 'page', lambda: process_orders_data(orders)),
+        Case('monthly_review.show_team_monthly_stats', 'page',
+             lambda: show_team_monthly_stats(team, team_orders.copy(), team_totals, today.year, today.month)),
+        Case('staff_acc.show_clean_teams_table', 'page',
+             lambda: show_clean_teams_table(clean_teams))
+    ]
+
+
+def write_cases(context: dict) -> list:
+    """写入函数的测试项，执行顺序即列表顺序"""
+    team = context['team']
+    today = context['today']
+    sample = context['sample_orders']
+    created_ids = []
+    abn_state = {'has_abn': bool(team['has_abn'])}
+    counter = {'team': 0, 'account': 0, 'order': 0}
+
+    def create_order():
+        return db.create_work_order(
+            today, '管理员', 'benchmark', '1 Benchmark St, Melbourne VIC 3000',
+            income1=120, income2=80, work_date=today, work_time='上午 09:00', assigned_cleaner=team['team_name']
+        )
+
+    def delete_order():
+        if not created_ids:
+            created_ids.extend(read_sql(
+                get_connection(), "SELECT id FROM work_orders WHERE source = 'benchmark' ORDER BY id"
+            )['id'].tolist())
+        return db.delete_work_order(int(created_ids.pop()))
+
+    def update_order():
+        row = sample[counter['order'] % len(sample)]
+        counter['order'] += 1
+        return db.update_work_order({'id': row['id'], 'income1': row['income1'], 'remarks': 'benchmark'})
+
+    def update_bulk():
+        return db.update_work_orders_bulk([
+            {**{field: row.get(field) for field in db.BULK_UPDATE_FIELDS}, 'id': row['id']} for row in sample
+        ])
+
+    def toggle_team_abn():
+        abn_state['has_abn'] = not abn_state['has_abn']
+        return db.update_clean_team(
+            team['id'], team['team_name'], team['contact_number'], abn_state['has_abn'], True, team['notes']
+        )
+
+    def create_team():
+        counter['team'] += 1
+        return db.create_clean_team(f"基准测试{counter['team']}组", '0400000000')
+
+    def delete_team():
+        team_id = read_sql(
+            get_connection(), "SELECT id FROM clean_teams WHERE team_name = :name",
+            {'name': f"基准测试{counter['team']}组"}
+        )['id'].iloc[0]
+        counter['team'] -= 1
+        return db.delete_clean_team(int(team_id))
+
+    def create_account():
+        counter['account'] += 1
+        index = counter['account']
+        return db.create_new_account(f"bench{index}", 'bench', f"基准测试{index}", 'customer_service')
+
+    def update_account():
+        index = counter['account']
+        return db.update_account(f"bench{index}", f"基准测试{index}", 'bench2')
+
+    def delete_account():
+        index = counter['account']
+        counter['account'] -= 1
+        return db.delete_account(f"bench{index}")
+
+    # 每个创建测试项之后是对应的删除测试项，执行次数相同，数据库恢复到测试前的行数
+    return [
+        Case('create_work_order', 'write', create_order),
+        Case('update_work_order', 'write', update_order),
+        Case(f"update_work_orders_bulk[{len(sample)}]", 'write', update_bulk),
+        Case('delete_work_order', 'write', delete_order),
+        Case('update_clean_team[toggle abn]', 'write', toggle_team_abn),
+        Case('create_clean_team', 'write', create_team),
+        Case('delete_clean_team', 'write', delete_team),
+        Case('create_new_account', 'write', create_account),
+        Case('update_account', 'write', update_account),
+        Case('delete_account', 'write', delete_account),
+        Case('rebuild_team_month_rollup', 'write', db.rebuild_team_month_rollup)
+    ]
+
+
+def prepare_context() -> dict:
+    """读取测试所需的参数：工单最多的在职保洁组、深分页游标和一批样本工单"""
+    conn = get_connection()
+    team = read_sql(conn, """
+        SELECT t.id, t.team_name, t.contact_number, t.has_abn, t.notes
+        FROM clean_teams t JOIN work_orders w ON w.assigned_cleaner = t.team_name
+        WHERE t.is_active = 1 AND t.team_name != '暂未派单'
+        GROUP BY t.id, t.team_name, t.contact_number, t.has_abn, t.notes
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """).iloc[0].to_dict()
+    team['id'] = int(team['id'])
+
+    # 翻页 20 次得到的游标，用于测量靠后页面的查询
+    cursor = None
+    for _ in range(20):
+        page, error = db.get_work_orders_page('year', cursor=cursor, page_size=BaseConfig().WORK_ORDER_PAGE_SIZE)
+        if error or page['next_cursor'] is None:
+            break
+        cursor = page['next_cursor']
+
+    sample, _ = db.get_work_orders_page('month', page_size=50)
+    # 水位线取自数据库时间（SQLite 中为 UTC），与 updated_at 一致
+    changes, _ = db.get_work_order_changes(None, 'month')
+    return {
+        'today': date.today(),
+        'team': team,
+        'deep_cursor': cursor,
+        'watermark': changes['watermark'],
+        'sample_orders': sample['orders'].astype(object).where(sample['orders'].notna(), None).to_dict('records')
+    }
+
+
+def prepare_database(size: int, seed: int, data_dir: Path, regenerate: bool = False):
+    """切换到指定规模的模拟数据库，不存在时生成
+
+    Args:
+        size: 工单数量
+        seed: 随机种子
+        data_dir: 模拟数据库的保存目录
+        regenerate: 是否重新生成已存在的数据库
+    """
+    db_path = data_dir / f"bench_{size}_seed{seed}.sqlite"
+    if regenerate:
+        for suffix in ['', '-wal', '-shm']:
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    is_new = not db_path.exists()
+
+    os.environ[DATABASE_URL_ENV] = f"sqlite:///{db_path}"
+    clear_caches()
+    if is_new:
+        generate_dataset(get_connection(), size, seed=seed)
+
+
+def run_size(size: int, repeat: int, seed: int, data_dir: Path, regenerate: bool) -> list:
+    """在一个数据规模下执行全部测试项"""
+    prepare_database(size, seed, data_dir, regenerate)
+    context = prepare_context()
+    results = []
+
+    def record(case, cache, stats):
+        results.append({'size': size, 'name': case.name, 'kind': case.kind, 'cache': cache, **stats})
+        logger.info(f"{_label(results[-1])}: 中位数 {stats['median_ms']:.2f} ms")
+
+    for case in read_cases(context):
+        record(case, 'cold', measure(case, repeat, before=clear_caches))
+        record(case, 'warm', measure(case, repeat))
+
+    for case in page_cases(context):
+        record(case, None, measure(case, repeat))
+
+    # 偶数次执行使 update_clean_team 还原 ABN 状态
+    write_repeat = repeat + repeat % 2
+    for case in write_cases(context):
+        record(case, None, measure(case, write_repeat))
+
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR.parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_file: str, threshold: float) -> list:
+    """与上一次的结果比较中位数耗时，返回变慢超过 threshold 倍的测试项"""
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {
+            (item['size'], item['name'], item['cache']): item['median_ms'] for item in json.load(f)['results']
+        }
+
+    regressions = []
+    for item in results:
+        before = baseline.get((item['size'], item['name'], item['cache']))
+        if before and item['median_ms'] > before * threshold:
+            regressions.append({**item, 'baseline_median_ms': before, 'ratio': round(item['median_ms'] / before, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据层基准测试")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="工单数量，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=5, help="每个测试项的执行次数")
+    parser.add_argument('--seed', type=int, default=0, help="模拟数据的随机种子")
+    parser.add_argument('--data-dir', default=str(BENCHMARK_DIR / 'data'), help="模拟数据库的保存目录")
+    parser.add_argument('--regenerate', action='store_true', help="重新生成已存在的模拟数据库")
+    parser.add_argument('--output', help="结果文件，默认为 benchmarks/results/<时间>.json")
+    parser.add_argument('--compare', help="用于比较的上一次结果文件")
+    parser.add_argument('--threshold', type=float, default=1.2, help="中位数耗时超过上一次的多少倍视为变慢")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for size in sizes:
+        results += run_size(size, args.repeat, args.seed, data_dir, args.regenerate)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'backend': 'sqlite',
+        'config': {'sizes': sizes, 'repeat': args.repeat, 'seed': args.seed},
+        'results': results
+    }
+
+    output = Path(args.output or BENCHMARK_DIR / 'results' / f"{datetime.now():%Y-%m-%d_%H-%M-%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for item in regressions:
+            print(f"变慢：{_label(item)} "
+                  f"{item['baseline_median_ms']:.2f} ms -> {item['median_ms']:.2f} ms（{item['ratio']}x）")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,9 +23,76 @@ class BaseConfig(object):
             'port': 3306
         }
 
+        # 数据库连接池配置，传递给 sqlalchemy.create_engine
+        self.DATABASE_POOL_SETTING = {
+            'pool_size': 10,  # 常驻连接数
+            'max_overflow': 10,  # 连接用尽时允许额外创建的连接数
+            'pool_timeout': 10,  # 等待空闲连接的最长时间（秒）
+            'pool_recycle': 1800,  # 连接最长使用时间（秒），需小于 MySQL 的 wait_timeout
+            'pool_pre_ping': True  # 取出连接前检查连接是否可用
+        }
+
+        # 数据库超时配置
+        self.DATABASE_TIMEOUT_SETTING = {
+            'connect_timeout': 10,  # 建立连接超时（秒）
+            'read_timeout': 30,  # 读取结果超时（秒）
+            'write_timeout': 30,  # 发送语句超时（秒）
+            'max_execution_time': 30000  # SELECT 语句最长执行时间（毫秒）
+        }
+
+        # 数据库瞬时错误（连接断开、死锁、锁等待超时）的重试配置
+        self.DATABASE_RETRY_SETTING = {
+            'attempts': 3,  # 最多尝试次数
+            'backoff': 0.5  # 首次重试前的等待时间（秒），之后每次翻倍
+        }
+
+        # 只读副本配置，secrets 中没有对应连接时所有读写都使用主库
+        self.DATABASE_REPLICA_SETTING = {
+            'connection': 'mysql_replica',  # secrets 中副本连接的名称
+            'max_lag': 5,  # 允许的最大复制延迟（秒），也是会话写入后继续从主库读取的时长
+            'check_interval': 10,  # 检查复制延迟的间隔（秒）
+            'retry_after': 30  # 副本不可用或延迟过大后，改用主库的时长（秒）
+        }
+
+        # 数据访问函数的耗时统计配置
+        self.DATABASE_METRICS_SETTING = {
+            'slow_query_ms': 500,  # 单次调用超过该耗时（毫秒）时记录慢查询日志
+            'sample_size': 1000  # 每个函数保留最近多少次调用的耗时，用于计算 p50/p95/p99
+        }
+
+        # 页面渲染、LLM 调用和会话内存的统计配置，显示在系统设置的运维面板中
+        self.APP_METRICS_SETTING = {
+            'sample_size': 500,  # 每个页面/LLM 调用保留最近多少次耗时，用于计算分位数
+            'session_stale_after': 3600,  # 超过该时长（秒）未运行页面的会话不再统计内存
+            'refresh_interval': 5  # 运维面板自动刷新的间隔（秒）
+        }
+
+        # 链路追踪配置，每次页面运行及其中的数据库、LLM、Word 文档操作以 JSON Lines 写入日志目录
+        self.TRACE_SETTING = {
+            'enabled': True,  # 是否记录
+            'file_name': 'traces.jsonl',  # 日志目录下的文件名
+            'max_bytes': 10 * 1024 * 1024,  # 单个文件的最大字节数，超过后轮转
+            'backup_count': 5  # 保留的轮转文件数量
+        }
+
         # 日志相关配置信息
         self.LOG_DIRECTORY = "logs"
 
+        # 工单管理表格每页显示的工单数量
+        self.WORK_ORDER_PAGE_SIZE = 50
+
+        # 保洁组ABN状态缓存的有效期（秒），保洁组信息修改时会立即失效
+        self.TEAM_CACHE_TTL = 300
+
+        # 跨会话共享的查询结果缓存最多保存的结果数量
+        self.QUERY_CACHE_MAX_ENTRIES = 512
+
+        # 工单页增量刷新时水位线向前重叠的秒数，避免遗漏提交较晚的事务
+        self.WORK_ORDER_REFRESH_OVERLAP = 5
+
+        # 工单删除记录的保留天数，超过保留期的水位线需全量重新加载
+        self.WORK_ORDER_TOMBSTONE_RETENTION_DAYS = 7
+
         # 自定义员工管理页账户信息表头
         self.CUSTOM_HEADER = {
             "id": "账户编号",
@@ -8,7 +8,8 @@ Description: AI智能问答助手页面
 """
 import streamlit as st
 from langchain.memory import ConversationBufferMemory
-from utils.utils import get_response, stream_res, navigation, check_login_state
+from utils.app_metrics import page_timer
+from utils.utils import get_response, stream_res, navigation, require_login, redirect, LOGIN_PAGE
 from utils.styles import apply_global_styles
 
 # 页面配置必须是第一个Streamlit命令
@@ -46,17 +47,12 @@ def clear_chat_history():
 def init_session_state():
     """初始化会话状态"""
     # 检查登录状态
-    login_state, _ = check_login_state()
-    if not login_state:
-        st.error("请先登录！")
-        st.switch_page("app.py")
-        return False
+    require_login()
 
     # 获取当前登录用户
     username = st.session_state.get("logged_in_username")
     if not username:
-        st.error("无法获取用户信息！")
-        st.switch_page("app.py")
+        redirect(LOGIN_PAGE, "无法获取用户信息！请重新登录。", icon="⚠️")
         return False
 
     # 初始化用户特定的聊天记录和记忆
@@ -131,4 +127,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    with page_timer():
+        main()
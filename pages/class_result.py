@@ -8,7 +8,9 @@ Description: 课程处理结果页面
 import time
 import streamlit as st
 from docx import Document
-from utils.utils import navigation, check_login_state, get_response_connie
+from utils.app_metrics import page_timer
+from utils.tracing import span, traced
+from utils.utils import navigation, require_login, get_response_connie
 from utils.styles import apply_global_styles
 import re
 from datetime import datetime
@@ -211,6 +213,7 @@ def generate_summary(date_str, time_str, course_name, chapter_overview):
         return None
 
 
+@traced('docx.create_summary_document')
 def create_summary_document(summary_text, original_filename):
     """创建总结文档"""
     try:
@@ -318,7 +321,8 @@ def process_documents(uploaded_files):
                         message_index += 1
 
                     # 提取文档信息
-                    doc = Document(uploaded_file)
+                    with span('docx.read', file_name=uploaded_file.name):
+                        doc = Document(uploaded_file)
                     doc_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
                     date_str, time_str, course_name = extract_course_info(uploaded_file.name)
                     chapter_overview = extract_chapter_overview(doc_content)
@@ -375,97 +379,74 @@ def process_documents(uploaded_files):
 def class_result():
     st.set_page_config(page_title='ATM-Cleaning', page_icon='images/favicon.png')
     apply_global_styles()
-    login_state, role = check_login_state()
-
-    if not login_state:
-        error = st.error("您还没有登录！3秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        error = st.error("您还没有登录！2秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        st.error("您还没有登录！1秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        st.switch_page("pages/login_page.py")
+    require_login(users=("connie",))
+
+    navigation()
+    st.title("📚自动化课程总结")
+    st.divider()
+
+    # 检查是否有要处理的文件
+    if 'files_to_process' not in st.session_state:
+        st.warning("没有需要处理的文件，请返回上传页面。", icon="⚠️")
+        if st.button("返回上传页面", type="primary"):
+            st.switch_page("pages/zongjie.py")
+        return
+
+    # 如果处理已完成，显示结果
+    if st.session_state.get('processing_complete', False):
+        if 'generated_docs' in st.session_state:
+            st.success(f"共处理完成 {len(st.session_state['generated_docs'])} 个文件！")
+
+            # 显示处理完成的文件列表
+            st.write("已完成处理的文件：")
+            for filename, _ in st.session_state['generated_docs']:
+                st.text(filename)
+
+            st.divider()  # 添加分隔线
+
+            col1, col2 = st.columns(2)
+            with col1:
+                # 显示下载按钮
+                if len(st.session_state['generated_docs']) == 1:
+                    filename, doc_binary = st.session_state['generated_docs'][0]
+                    st.download_button(
+                        label="下载课程总结",
+                        data=doc_binary,
+                        file_name=filename,
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        type="primary",
+                        use_container_width=True
+                    )
+                else:
+                    # 创建zip文件
+                    zip_buffer = io.BytesIO()
+                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                        for filename, doc_binary in st.session_state['generated_docs']:
+                            zip_file.writestr(filename, doc_binary.getvalue())
+
+                    st.download_button(
+                        label="下载所有课程总结",
+                        data=zip_buffer.getvalue(),
+                        file_name="课程总结集.zip",
+                        mime="application/zip",
+                        type="primary",
+                        use_container_width=True
+                    )
+
+            with col2:
+                if st.button("返回上传页面", use_container_width=True):
+                    confirm_return_dialog()
+
+        # 显示失败的文件列表
+        if 'failed_files' in st.session_state and st.session_state['failed_files']:
+            st.error("以下文件处理失败：")
+            for filename, reason in st.session_state['failed_files']:
+                st.write(f"- {filename}：{reason}")
     else:
-        # 检查是否是特定用户
-        current_user = st.session_state.get("logged_in_username")
-        if current_user != "connie":
-            error = st.error("您没有权限访问此页面！3秒后跳转至登录页面...", icon="⚠️")
-            time.sleep(1)
-            error.empty()
-            error = st.error("您没有权限访问此页面！2秒后跳转至登录页面...", icon="⚠️")
-            time.sleep(1)
-            error.empty()
-            st.error("您没有权限访问此页面！1秒后跳转至登录页面...", icon="⚠️")
-            time.sleep(1)
-            st.switch_page("pages/login_page.py")
-        else:
-            navigation()
-            st.title("📚自动化课程总结")
-            st.divider()
-
-            # 检查是否有要处理的文件
-            if 'files_to_process' not in st.session_state:
-                st.warning("没有需要处理的文件，请返回上传页面。", icon="⚠️")
-                if st.button("返回上传页面", type="primary"):
-                    st.switch_page("pages/zongjie.py")
-                return
-
-            # 如果处理已完成，显示结果
-            if st.session_state.get('processing_complete', False):
-                if 'generated_docs' in st.session_state:
-                    st.success(f"共处理完成 {len(st.session_state['generated_docs'])} 个文件！")
-
-                    # 显示处理完成的文件列表
-                    st.write("已完成处理的文件：")
-                    for filename, _ in st.session_state['generated_docs']:
-                        st.text(filename)
-
-                    st.divider()  # 添加分隔线
-
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        # 显示下载按钮
-                        if len(st.session_state['generated_docs']) == 1:
-                            filename, doc_binary = st.session_state['generated_docs'][0]
-                            st.download_button(
-                                label="下载课程总结",
-                                data=doc_binary,
-                                file_name=filename,
-                                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                type="primary",
-                                use_container_width=True
-                            )
-                        else:
-                            # 创建zip文件
-                            zip_buffer = io.BytesIO()
-                            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                                for filename, doc_binary in st.session_state['generated_docs']:
-                                    zip_file.writestr(filename, doc_binary.getvalue())
-
-                            st.download_button(
-                                label="下载所有课程总结",
-                                data=zip_buffer.getvalue(),
-                                file_name="课程总结集.zip",
-                                mime="application/zip",
-                                type="primary",
-                                use_container_width=True
-                            )
-
-                    with col2:
-                        if st.button("返回上传页面", use_container_width=True):
-                            confirm_return_dialog()
-
-                # 显示失败的文件列表
-                if 'failed_files' in st.session_state and st.session_state['failed_files']:
-                    st.error("以下文件处理失败：")
-                    for filename, reason in st.session_state['failed_files']:
-                        st.write(f"- {filename}：{reason}")
-            else:
-                # 开始处理文档
-                process_documents(st.session_state['files_to_process'])
+        # 开始处理文档
+        process_documents(st.session_state['files_to_process'])
 
 
 if __name__ == '__main__':
-    class_result()
+    with page_timer():
+        class_result()
@@ -7,14 +7,14 @@ Description: 月度结算页面
 @Time     ：2025/2/6 下午4:15
 @Contact  ：king.songtao@gmail.com
 """
-import time
 import pandas as pd
 import streamlit as st
 from datetime import datetime
 
+from utils.app_metrics import page_timer
 from utils.styles import apply_global_styles
-from utils.utils import check_login_state, navigation, get_theme_color
-from utils.db_operations_v2 import get_active_clean_teams, get_team_monthly_orders
+from utils.utils import require_login, navigation
+from utils.db_operations_v2 import get_active_clean_teams, get_all_teams_monthly_orders
 
 
 def process_orders_data(orders_df):
@@ -59,18 +59,17 @@ def process_orders_data(orders_df):
     return df[display_columns]
 
 
-def show_team_monthly_stats(team, selected_year, selected_month):
-    """显示单个保洁组的月度统计信息"""
-    # 获取工单数据
-    orders, error = get_team_monthly_orders(
-        team['id'], selected_year, selected_month
-    )
-
-    if error:
-        st.error(f"获取工单统计失败：{error}", icon="⚠️")
-        return
+def show_team_monthly_stats(team, orders, team_totals, selected_year, selected_month):
+    """显示单个保洁组的月度统计信息
 
-    if orders.empty:
+    Args:
+        team: 保洁组信息
+        orders: 该保洁组当月的工单明细
+        team_totals: 该保洁组当月的汇总统计，无工单时为 None
+        selected_year: 年份
+        selected_month: 月份
+    """
+    if orders.empty or team_totals is None:
         st.info(f"{selected_year}年{selected_month}月暂无工单记录")
         return
 
@@ -90,11 +89,11 @@ def show_team_monthly_stats(team, selected_year, selected_month):
 
     st.divider()
 
-    # 计算统计信息
-    income1 = pd.to_numeric(orders['income1'], errors='coerce').fillna(0).sum()  # 现金收入
-    income2 = pd.to_numeric(orders['income2'], errors='coerce').fillna(0).sum()  # 转账收入
-    total_amount = pd.to_numeric(orders['total_amount'], errors='coerce').fillna(0).sum()  # 总金额(含GST)
-    subsidy = pd.to_numeric(orders['subsidy'], errors='coerce').fillna(0).sum()  # 补贴
+    # 统计信息直接使用查询时按保洁组汇总的结果
+    income1 = team_totals['income1']  # 现金收入
+    income2 = team_totals['income2']  # 转账收入
+    total_amount = team_totals['total_amount']  # 总金额(含GST)
+    subsidy = team_totals['subsidy']  # 补贴
 
     # 计算逻辑：
     # 1. 保洁组总佣金 = 现金收入×70% + 转账收入×70% + 补贴
@@ -159,87 +158,73 @@ def monthly_review():
     st.set_page_config(page_title='ATM-Cleaning', page_icon='images/favicon.png')
     apply_global_styles()
 
-    # 动态设置 tab 样式
-    theme_color = get_theme_color()
-    st.markdown(f"""
-        <style>
-            .stTabs [data-baseweb="tab-list"] {{
-                gap: 2px;
-            }}
-            .stTabs [data-baseweb="tab"] {{
-                height: 50px;
-                background-color: #F0F2F6;
-                border-radius: 0px 0px 0px 0px;
-                padding-left: 15px;
-                padding-right: 15px;
-            }}
-            .stTabs [aria-selected="true"] {{
-                background-color: {theme_color} !important;
-                color: #FFFFFF !important;
-            }}
-        </style>""", unsafe_allow_html=True)
-
-    login_state, role = check_login_state()
-
-    if login_state is True and role == "admin":
-        navigation()
-
-        st.title("📊 月度结算")
-        st.divider()
-
-        # 年月选择
-        col1, col2 = st.columns(2)
-        with col1:
-            selected_year = st.selectbox(
-                "选择年份",
-                options=range(2024, datetime.now().year + 1),
-                index=datetime.now().year - 2024
-            )
-        with col2:
-            selected_month = st.selectbox(
-                "选择月份",
-                options=range(1, 13),
-                index=datetime.now().month - 1
-            )
-
-        # 获取所有在职保洁组
-        active_teams, error = get_active_clean_teams()
-
-        if error:
-            st.error(f"获取保洁组失败：{error}", icon="⚠️")
-            return
-
-        if not active_teams:
-            st.warning("当前没有在职的保洁组", icon="⚠️")
-            return
-
-        # 过滤掉"暂未派单"的保洁组
-        active_teams = [team for team in active_teams if team['team_name'] != '暂未派单']
-
-        if not active_teams:
-            st.warning("当前没有可显示的保洁组", icon="⚠️")
-            return
-
-        # 创建标签页
-        tabs = st.tabs([f"{team['team_name']}" for team in active_teams])
-
-        # 在每个标签页中显示对应保洁组的统计信息
-        for tab, team in zip(tabs, active_teams):
-            with tab:
-                show_team_monthly_stats(team, selected_year, selected_month)
+    require_login(roles=("admin",))
 
-    else:
-        error = st.error("您没有权限访问该页面！3秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        error = st.error("您没有权限访问该页面！2秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        st.error("您没有权限访问该页面！1秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        st.session_state["login_state"] = False
-        st.switch_page("pages/login_page.py")
+    navigation()
+
+    st.title("📊 月度结算")
+    st.divider()
+
+    # 年月选择
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_year = st.selectbox(
+            "选择年份",
+            options=range(2024, datetime.now().year + 1),
+            index=datetime.now().year - 2024
+        )
+    with col2:
+        selected_month = st.selectbox(
+            "选择月份",
+            options=range(1, 13),
+            index=datetime.now().month - 1
+        )
+
+    # 获取所有在职保洁组
+    active_teams, error = get_active_clean_teams()
+
+    if error:
+        st.error(f"获取保洁组失败：{error}", icon="⚠️")
+        return
+
+    if not active_teams:
+        st.warning("当前没有在职的保洁组", icon="⚠️")
+        return
+
+    # 过滤掉"暂未派单"的保洁组
+    active_teams = [team for team in active_teams if team['team_name'] != '暂未派单']
+
+    if not active_teams:
+        st.warning("当前没有可显示的保洁组", icon="⚠️")
+        return
+
+    # 获取所选月份的工单数据（查询结果在会话间共享，工单或保洁组变更前切换保洁组不会再查询数据库）
+    orders, totals, error = get_all_teams_monthly_orders(selected_year, selected_month)
+
+    if error:
+        st.error(f"获取工单统计失败：{error}", icon="⚠️")
+        return
+
+    # 选择保洁组，只计算和渲染当前选中的保洁组
+    team_names = [team['team_name'] for team in active_teams]
+    if st.session_state.get('monthly_review_team') not in team_names:
+        st.session_state.monthly_review_team = team_names[0]
+
+    selected_team_name = st.segmented_control(
+        "选择保洁组",
+        options=team_names,
+        key='monthly_review_team',
+        label_visibility="collapsed"
+    )
+    # 再次点击已选中的选项会取消选择，此时保持显示第一个保洁组
+    selected_team_name = selected_team_name or team_names[0]
+    team = next(team for team in active_teams if team['team_name'] == selected_team_name)
+
+    team_orders = orders[orders['team_name'] == selected_team_name]
+    team_totals = totals.loc[selected_team_name] if selected_team_name in totals.index else None
+    show_team_monthly_stats(team, team_orders, team_totals, selected_year, selected_month)
 
 
 if __name__ == "__main__":
-    monthly_review()
+    with page_timer():
+        monthly_review()
@@ -7,11 +7,18 @@ Description:
 @Time     ：2025/2/15 上午11:44
 @Contact  ：king.songtao@gmail.com
 """
-import time
+import copy
 import streamlit as st
 import pandas as pd
-from utils.db_operations_v2 import get_work_orders, get_work_orders_by_date_range, update_work_order, get_active_clean_teams, connect_db
-from utils.utils import navigation, check_login_state
+from utils.app_metrics import page_timer
+from utils.db_operations_v2 import (
+    connect_db, active_clean_teams_query, work_order_totals_query, work_order_filter_options_query,
+    work_orders_page_query, work_order_changes_queries, build_work_order_changes, apply_work_order_changes,
+    update_work_orders_bulk, BULK_UPDATE_FIELDS
+)
+from utils.data_context import DataContext
+from configs.settings import BaseConfig
+from utils.utils import navigation, require_login, notify
 from utils.styles import apply_global_styles
 
 
@@ -32,13 +39,12 @@ def show_error_dialog(error_msg):
         st.rerun()
 
 
-def show_filters(df=None):
+def show_filters(filter_options):
     """显示筛选条件"""
     col1, col2, col3 = st.columns(3)
 
     with col1:
         options = ["year", "quarter", "month", "week", "day"]
-        default_index = options.index('month')
 
         # 如果没有时间范围状态，设置默认值
         if 'time_range' not in st.session_state:
@@ -58,36 +64,28 @@ def show_filters(df=None):
         )
 
     with col2:
-        cleaner_options = []
-        if df is not None and not df.empty:
-            cleaner_options = sorted([
-                cleaner for cleaner in df['assigned_cleaner'].unique()
-                if cleaner != '暂未派单' and pd.notna(cleaner)
-            ])
-
         # 从 session_state 获取当前的筛选值，如果不存在则为空列表
         current_cleaner_filter = st.session_state.get('cleaner_filter', [])
 
-        cleaner_filter = st.multiselect(
+        # 保留已选中但当前范围内没有工单的选项
+        cleaner_options = sorted(set(filter_options['cleaners']) | set(current_cleaner_filter))
+
+        st.multiselect(
             "保洁小组",
             options=cleaner_options,
-            default=current_cleaner_filter,
             key='cleaner_filter',
             placeholder="请选择..."
         )
 
     with col3:
-        creator_options = []
-        if df is not None and not df.empty:
-            creator_options = sorted(df['created_by'].unique().tolist())
-
         # 从 session_state 获取当前的筛选值，如果不存在则为空列表
         current_creator_filter = st.session_state.get('creator_filter', [])
 
-        creator_filter = st.multiselect(
+        creator_options = sorted(set(filter_options['creators']) | set(current_creator_filter))
+
+        st.multiselect(
             "创建人",
             options=creator_options,
-            default=current_creator_filter,
             key='creator_filter',
             placeholder="请选择..."
         )
@@ -111,22 +109,16 @@ def show_filters(df=None):
     return time_range
 
 
-def show_statistics(filtered_df):
-    """显示统计信息"""
-    # 检查DataFrame是否为空
-    if filtered_df.empty:
-        total_income1 = 0
-        total_income2 = 0
-        total_subsidy = 0
-        total_order_amount = 0
-        total_amount = 0
-    else:
-        # 计算统计信息 - 使用原始的filtered_df进行计算
-        total_income1 = pd.to_numeric(filtered_df['income1'], errors='coerce').fillna(0).sum()
-        total_income2 = pd.to_numeric(filtered_df['income2'], errors='coerce').fillna(0).sum()
-        total_subsidy = pd.to_numeric(filtered_df['subsidy'], errors='coerce').fillna(0).sum()
-        total_order_amount = pd.to_numeric(filtered_df['order_amount'], errors='coerce').fillna(0).sum()
-        total_amount = pd.to_numeric(filtered_df['total_amount'], errors='coerce').fillna(0).sum()
+def show_statistics(totals):
+    """显示统计信息
+
+    Args:
+        totals: get_work_order_totals 返回的汇总结果，获取失败时为 None
+    """
+    totals = totals or {}
+    total_income1 = totals.get('income1', 0)
+    total_income2 = totals.get('income2', 0)
+    total_subsidy = totals.get('subsidy', 0)
 
     col1, col2, col3 = st.columns(3)
 
@@ -152,55 +144,168 @@ def show_statistics(filtered_df):
         )
 
 
-def show_work_orders_table(df, all_cleaner_options):
-    """显示工单详情表格"""
-    conn = connect_db()
-    if not conn:
-        st.error("数据库连接失败")
-        return df
+def plan_work_orders_page(data, time_range, cleaner_filter, creator_filter):
+    """登记获取当前工单页所需的查询，筛选条件变化时回到第一页
 
-    # 初始化更新锁
-    if 'update_in_progress' not in st.session_state:
-        st.session_state.update_in_progress = False
+    已加载的工单页保存在会话中，之后的重新运行只登记水位线之后的增量变更查询，
+    否则登记当前水位线和整页查询。
 
-    # 检查是否需要显示成功提示
-    if st.session_state.get('show_success_toast', False):
-        st.toast('数据更新成功！', icon='✅')
-        # 清除提示状态
-        st.session_state.show_success_toast = False
+    Args:
+        data: 本次运行的数据上下文
+        time_range: 时间范围
+        cleaner_filter: 保洁组筛选列表
+        creator_filter: 创建人筛选列表
 
-    filtered_df = df.copy()
+    Returns:
+        dict: 交给 load_work_orders_page 的加载计划
+    """
 
-    # 将所有的 NaN 和 None 值替换为空字符串
-    filtered_df = filtered_df.fillna('')
+    page_filters = (time_range, tuple(cleaner_filter), tuple(creator_filter))
+    if st.session_state.get('work_orders_page_filters') != page_filters:
+        st.session_state.work_orders_page_filters = page_filters
+        st.session_state.work_orders_page_cursor = None
+        st.session_state.work_orders_page_backward = False
+        st.session_state.work_orders_page_number = 1
 
-    # 处理日期排序：保持work_date为日期类型，将空值替换为NaT
-    filtered_df['work_date'] = pd.to_datetime(filtered_df['work_date'], errors='coerce').dt.date
+    page_key = (page_filters, st.session_state.work_orders_page_cursor, st.session_state.work_orders_page_backward)
+    loaded = st.session_state.get('work_orders_page_data')
+    since = loaded['watermark'] if loaded and loaded['key'] == page_key else None
 
-    # 按日期升序排序，将NaT值排在最后
-    filtered_df = filtered_df.sort_values(
-        by='work_date',
-        ascending=True,
-        na_position='last'
-    )
+    plan = {'since': since, 'filters': (time_range, cleaner_filter, creator_filter), 'changes': []}
+    for name, spec in work_order_changes_queries(since, time_range, cleaner_filter, creator_filter).items():
+        data.add(f'changes_{name}', spec)
+        plan['changes'].append(name)
 
-    # 获取保洁组选项
-    cleaner_options = sorted([
-        cleaner for cleaner in filtered_df['assigned_cleaner'].unique()
-        if cleaner != '暂未派单' and pd.notna(cleaner) and cleaner != ''
-    ])
+    if since is None:
+        add_work_orders_page_query(data, plan)
 
-    # 应用过滤器
-    cleaner_filter = st.session_state.get('cleaner_filter', [])
-    if cleaner_filter:
-        filtered_df = filtered_df[filtered_df['assigned_cleaner'].isin(cleaner_filter)]
+    return plan
 
-    creator_filter = st.session_state.get('creator_filter', [])
-    if creator_filter:
-        filtered_df = filtered_df[filtered_df['created_by'].isin(creator_filter)]
 
-    # 重置索引，以确保索引连续
-    filtered_df = filtered_df.reset_index(drop=True)
+def add_work_orders_page_query(data, plan):
+    """按当前分页游标登记整页查询"""
+    time_range, cleaner_filter, creator_filter = plan['filters']
+    data.add('page', work_orders_page_query(
+        time_range,
+        cursor=st.session_state.work_orders_page_cursor,
+        backward=st.session_state.work_orders_page_backward,
+        cleaners=cleaner_filter,
+        creators=creator_filter
+    ))
+
+
+def load_work_orders_page(data, plan, results):
+    """按加载计划得到当前工单页
+
+    有已加载的工单页时将增量变更合并到该页，增量无法合并时才重新加载整页。
+
+    Args:
+        data: 本次运行的数据上下文
+        plan: plan_work_orders_page 返回的加载计划
+        results: 数据上下文的查询结果
+
+    Returns:
+        tuple: (工单页, 错误信息)
+    """
+    changes = build_work_order_changes(plan['since'], {name: results[f'changes_{name}'] for name in plan['changes']})
+
+    if plan['since'] is not None:
+        loaded = st.session_state.work_orders_page_data
+        page = apply_work_order_changes(loaded['page'], changes) if changes['complete'] else None
+        if page is not None:
+            loaded['page'] = page
+            loaded['watermark'] = changes['watermark']
+            return page, None
+
+        add_work_orders_page_query(data, plan)
+        results, error = data.fetch()
+        if error:
+            return None, error
+
+    page = results['page']
+
+    # 当前页的数据已被删除或移出范围时，回到第一页
+    if page['orders'].empty and st.session_state.work_orders_page_cursor is not None:
+        st.session_state.work_orders_page_cursor = None
+        st.session_state.work_orders_page_backward = False
+        st.session_state.work_orders_page_number = 1
+        add_work_orders_page_query(data, plan)
+        results, error = data.fetch()
+        if error:
+            return None, error
+        page = results['page']
+
+    st.session_state.work_orders_page_data = {
+        'key': (
+            st.session_state.work_orders_page_filters,
+            st.session_state.work_orders_page_cursor,
+            st.session_state.work_orders_page_backward
+        ),
+        'page': page,
+        'watermark': changes['watermark']
+    }
+
+    return page, None
+
+
+def go_to_work_orders_page(cursor, backward, step):
+    """翻页按钮回调，记录目标页的游标"""
+    st.session_state.work_orders_page_cursor = cursor
+    st.session_state.work_orders_page_backward = backward
+    st.session_state.work_orders_page_number = max(1, st.session_state.work_orders_page_number + step)
+
+
+def show_pagination(page, total_count):
+    """显示分页控件"""
+    page_size = BaseConfig().WORK_ORDER_PAGE_SIZE
+    total_pages = max(1, -(-total_count // page_size))
+
+    # 回到第一页时校正页码
+    if page['prev_cursor'] is None:
+        st.session_state.work_orders_page_number = 1
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button(
+            "⬅️ 上一页",
+            key="work_orders_prev_page",
+            use_container_width=True,
+            disabled=page['prev_cursor'] is None,
+            on_click=go_to_work_orders_page,
+            args=(page['prev_cursor'], True, -1)
+        )
+    with col2:
+        st.markdown(
+            f"<div style='text-align: center; padding-top: 0.5rem;'>"
+            f"第 {st.session_state.work_orders_page_number} / {total_pages} 页，共 {total_count} 条工单"
+            f"</div>",
+            unsafe_allow_html=True
+        )
+    with col3:
+        st.button(
+            "下一页 ➡️",
+            key="work_orders_next_page",
+            use_container_width=True,
+            disabled=page['next_cursor'] is None,
+            on_click=go_to_work_orders_page,
+            args=(page['next_cursor'], False, 1)
+        )
+
+
+def show_work_orders_table(page, all_cleaner_options):
+    """显示工单详情表格"""
+    # 初始化更新锁
+    if 'update_in_progress' not in st.session_state:
+        st.session_state.update_in_progress = False
+
+    # 分页查询已按排序键排好序并应用了筛选条件
+    filtered_df = page['orders'].copy()
+
+    # 将所有的 NaN 和 None 值替换为空字符串
+    filtered_df = filtered_df.fillna('')
+
+    # 保持work_date为日期类型，将空值替换为NaT
+    filtered_df['work_date'] = pd.to_datetime(filtered_df['work_date'], errors='coerce').dt.date
 
     display_df = filtered_df.copy()
 
@@ -266,7 +371,7 @@ def show_work_orders_table(df, all_cleaner_options):
     invoice_status_options = ['未开票', '已开票', '不开票']
 
     # 使用传入的 cleaner_options
-    edited_df = st.data_editor(
+    st.data_editor(
         display_df,
         key='work_orders_editor',
         use_container_width=True,
@@ -350,73 +455,57 @@ def show_work_orders_table(df, all_cleaner_options):
         }
     )
 
-    # 处理数据更新
-    if st.session_state.get('show_work_orders_table', None) != edited_df.to_dict():
+    # 处理数据更新：只读取表格组件记录的修改增量，不再保留整表副本逐行对比
+    edited_rows = st.session_state.get('work_orders_editor', {}).get('edited_rows', {})
+    if edited_rows and edited_rows != st.session_state.get('work_orders_submitted_edits'):
         if not st.session_state.update_in_progress:
             try:
                 st.session_state.update_in_progress = True
-                st.session_state['show_work_orders_table'] = edited_df.to_dict()
-
-                # 获取原始数据用于对比
-                original_df = display_df.copy()
-
-                # 比较并处理修改过的行
-                for index, row in edited_df.iterrows():
-                    original_row = original_df.iloc[index]
-                    if not row.equals(original_row):
-                        # 准备更新数据
-                        update_data = {
-                            'id': filtered_df.iloc[index]['id'],
-                            'work_date': row['日期'] if pd.notna(row['日期']) else None,
-                            'work_time': row['时间'],
-                            'work_address': row['地址'],
-                            'assigned_cleaner': row['保洁组'],
-                            'source': row['来源'],
-                            'remarks': row['备注']
-                        }
-
-                        # 处理金额数据
-                        for field, column in [
-                            ('income1', '收入1'),
-                            ('income2', '收入2'),
-                            ('subsidy', '补贴')
-                        ]:
-                            value = row[column]
-                            if isinstance(value, str):
-                                # 去除货币符号和逗号，转换为浮点数
-                                value = float(value.replace('$', '').replace(',', '')) if value else 0
-                            update_data[field] = value
-
-                        # 调用更新函数
-                        success, error = update_work_order(update_data)
-
-                        if success:
-                            # 获取最新的金额数据
-                            latest_data = conn.query(
-                                """
-                                SELECT order_amount, total_amount 
-                                FROM work_orders 
-                                WHERE id = :id
-                                """,
-                                params={'id': update_data['id']},
-                                ttl=0
-                            ).iloc[0]
-
-                            # 更新显示的金额
-                            edited_df.at[index, '总金额'] = f"${latest_data['total_amount']:.2f}"
-
-                            st.session_state.show_success_toast = True
-                            st.rerun()
-                        else:
-                            st.error(f"更新失败：{error}")
-                            time.sleep(1)
+                # 记录已提交的增量，避免保存失败后每次重新运行都重复提交
+                st.session_state.work_orders_submitted_edits = copy.deepcopy(edited_rows)
+
+                column_fields = {label: field for field, label in column_labels.items()}
+
+                # 以当前页的原始数据为基础，叠加被修改的单元格
+                changes = []
+                for index, edited_cells in edited_rows.items():
+                    original_row = filtered_df.iloc[int(index)]
+                    update_data = {'id': original_row['id']}
+                    for field in BULK_UPDATE_FIELDS:
+                        update_data[field] = original_row[field]
+                    for column, value in edited_cells.items():
+                        update_data[column_fields[column]] = value
+
+                    if update_data['work_date'] == '' or pd.isna(update_data['work_date']):
+                        update_data['work_date'] = None
+                    update_data['invoice_status'] = update_data['invoice_status'] or None
+
+                    # 处理金额数据
+                    for field in ['income1', 'income2', 'subsidy']:
+                        value = update_data[field]
+                        if isinstance(value, str):
+                            # 去除货币符号和逗号，转换为浮点数
+                            value = float(value.replace('$', '').replace(',', '')) if value else 0
+                        elif pd.isna(value):
+                            value = None
+                        update_data[field] = value
+
+                    changes.append(update_data)
+
+                if changes:
+                    success, error = update_work_orders_bulk(changes)
+
+                    if success:
+                        # 重新运行后会从数据库读取最新的金额
+                        notify('数据更新成功！', icon='✅')
+                        st.rerun()
+                    else:
+                        st.error(f"更新失败：{error}")
 
             except ValueError as e:
                 st.error(f"数据格式错误：{str(e)}")
-                time.sleep(1)
             except Exception as e:
                 st.error(f"更新失败：{str(e)}")
-                time.sleep(1)
             finally:
                 st.session_state.update_in_progress = False
 
@@ -427,70 +516,56 @@ def work_order_statistics():
     """工单统计主页面"""
     st.set_page_config(page_title='ATM-Cleaning', page_icon='images/favicon.png', layout='wide')
     apply_global_styles()
-    login_state, role = check_login_state()
-
-    if login_state:
-        navigation()
-        st.title("📊 工单管理")
-        st.divider()
-
-        # 获取初始数据
-        default_time_range = st.session_state.get('time_range', 'month')
-        orders_df, error = get_work_orders(default_time_range)
-
-        # 获取活跃的保洁组
-        teams, teams_error = get_active_clean_teams()
-        if teams_error:
-            st.error(f"获取保洁组信息失败：{teams_error}")
-            return
+    require_login()
 
-        # 提取保洁组名称列表
-        all_cleaner_options = [team['team_name'] for team in teams]
+    navigation()
+    st.title("📊 工单管理")
+    st.divider()
 
-        if error:
-            st.error(f"获取数据失败：{error}")
-            return
-
-        # 检查是否有数据需要显示
-        if orders_df is not None and not orders_df.empty:
-            # 显示统计信息
-            show_statistics(orders_df)
-            st.divider()
-        else:
-            # 显示空的统计信息
-            show_statistics(pd.DataFrame())
-            st.divider()
-
-        # 显示筛选条件
-        selected_time_range = show_filters(orders_df)
-
-        # 只有当时间范围发生变化时才重新获取数据
-        if selected_time_range != default_time_range:
-            orders_df, error = get_work_orders(selected_time_range)
-            if error:
-                st.error(f"获取数据失败：{error}")
-                return
-
-        # 检查是否有数据需要显示
-        if orders_df is not None and not orders_df.empty:
-            st.info("您可以直接在下面的表格中修改数据", icon="ℹ️")
-
-            # 显示工单表格
-            filtered_df = show_work_orders_table(orders_df, all_cleaner_options)
-        else:
-            st.info("暂无工单数据")
+    # 筛选条件保存在组件状态中，统计和表格均按筛选条件在数据库中查询
+    time_range = st.session_state.get('time_range', 'month')
+    cleaner_filter = st.session_state.get('cleaner_filter', [])
+    creator_filter = st.session_state.get('creator_filter', [])
 
+    # 本次运行需要的保洁组、统计、筛选选项和工单页在同一个连接、同一个快照中一次获取
+    data = DataContext(connect_db(read_only=True))
+    data.add('teams', active_clean_teams_query())
+    data.add('totals', work_order_totals_query(time_range, cleaner_filter, creator_filter))
+    data.add('filter_options', work_order_filter_options_query(time_range))
+    page_plan = plan_work_orders_page(data, time_range, cleaner_filter, creator_filter)
+
+    results, error = data.fetch()
+    if error:
+        st.error(f"获取数据失败：{error}")
+        return
+
+    # 提取保洁组名称列表
+    all_cleaner_options = [team['team_name'] for team in results['teams']]
+
+    # 显示统计信息
+    totals = results['totals']
+    show_statistics(totals)
+    st.divider()
+
+    # 显示筛选条件
+    show_filters(results['filter_options'])
+
+    page, page_error = load_work_orders_page(data, page_plan, results)
+    if page_error:
+        st.error(f"获取数据失败：{page_error}")
+        return
+
+    # 检查是否有数据需要显示
+    if not page['orders'].empty:
+        st.info("您可以直接在下面的表格中修改数据", icon="ℹ️")
+
+        # 显示当前页的工单表格
+        filtered_df = show_work_orders_table(page, all_cleaner_options)
+        show_pagination(page, totals['order_count'])
     else:
-        error = st.error("您还没有登录！3秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        error = st.error("您还没有登录！2秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        st.error("您还没有登录！1秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        st.switch_page("app.py")
+        st.info("暂无工单数据")
 
 
 if __name__ == "__main__":
-    work_order_statistics()
+    with page_timer():
+        work_order_statistics()
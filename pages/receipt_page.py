@@ -7,12 +7,13 @@ Description:
 @Time     ：2024/12/27 上午12:55
 @Contact  ：king.songtao@gmail.com
 """
-import time
 import asyncio
 from datetime import date, datetime
 import streamlit as st
 from docx import Document
-from utils.utils import check_login_state, generate_receipt, formate_date, navigation, clear_form_state
+from utils.app_metrics import page_timer
+from utils.tracing import span
+from utils.utils import require_login, generate_receipt, formate_date, navigation, clear_form_state
 from utils.validator import LLMAddressValidator, get_validator
 from utils.styles import apply_global_styles
 
@@ -397,17 +398,7 @@ async def receipt_page():  # 继续 receipt_page 函数
         # 清除session_state中的工单信息
         del st.session_state.receipt_order_info
 
-    login_state, role = check_login_state()
-
-    if not login_state:
-        st.title("ATM员工管理控制台")
-        st.divider()
-        for i in range(3, 0, -1):
-            error = st.error(f"对不起！您未登录，请先登录!{i}秒后跳转至登录页...", icon="❌")
-            time.sleep(1)
-            if i > 1:
-                error.empty()
-        st.switch_page("pages/login_page.py")
+    role = require_login()
 
     navigation()
     st.title("🧾收据自动化生成")
@@ -467,6 +458,9 @@ async def receipt_page():  # 继续 receipt_page 函数
             st.error("发票信息有缺失！请填写完整信息！", icon="⚠️")
             return
 
+        with span('docx.load_template'):
+            output_doc = Document("templates/Recipte单项.docx")
+
         # 保存表单状态
         current_form_data = {
             "selected_template": "手动版（手动选择excluded中的内容）",
@@ -483,7 +477,7 @@ async def receipt_page():  # 继续 receipt_page 函数
             "custom_excluded_enabled": custom_excluded_enabled,
             "manual_excluded_selection": manual_excluded_selection,
             "custom_excluded_content": custom_excluded_items,
-            "output_doc": Document("templates/Recipte单项.docx"),
+            "output_doc": output_doc,
             "receipt_file_name": f"Receipt.{address}.docx",
         }
 
@@ -530,4 +524,5 @@ async def receipt_page():  # 继续 receipt_page 函数
 
 
 if __name__ == '__main__':
-    asyncio.run(receipt_page())
+    with page_timer():
+        asyncio.run(receipt_page())
@@ -7,15 +7,15 @@ Description: 员工和保洁组管理页面
 @Time     ：2024/12/27 下午3:26
 @Contact  ：king.songtao@gmail.com
 """
-import time
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+from utils.app_metrics import page_timer
 from utils.db_operations_v2 import (
     get_all_staff_acc, get_all_clean_teams, create_clean_team,
     get_active_clean_teams, get_team_monthly_orders
 )
-from utils.utils import check_login_state, navigation, get_theme_color
+from utils.utils import require_login, notify, navigation, get_theme_color
 from utils.styles import apply_global_styles
 
 
@@ -62,8 +62,7 @@ def show_clean_team_creation_dialog():
             )
 
             if success:
-                st.success("保洁组创建成功！", icon="✅")
-                time.sleep(1)
+                notify("保洁组创建成功！", icon="✅")
                 st.rerun()
             else:
                 st.error(f"保洁组创建失败：{error}", icon="⚠️")
@@ -185,84 +184,73 @@ def staff_acc():
                 }}
             </style>""", unsafe_allow_html=True)
 
-    login_state, role = check_login_state()
+    require_login(roles=("admin",))
 
-    if login_state is True and role == "admin":
-        navigation()
+    navigation()
 
-        st.title("📊 人员管理")
-        st.divider()
+    st.title("📊 人员管理")
+    st.divider()
 
-        # 创建三个标签页：员工管理、保洁组管理和月度结算
-        tab1, tab2 = st.tabs(["👥 客服组管理", "🧹 保洁组管理"])
+    # 创建三个标签页：员工管理、保洁组管理和月度结算
+    tab1, tab2 = st.tabs(["👥 客服组管理", "🧹 保洁组管理"])
 
-        with tab1:
-            staff_acc_data, error_message = get_all_staff_acc()
+    with tab1:
+        staff_acc_data, error_message = get_all_staff_acc()
 
-            # 列出所有员工账户信息
-            if error_message is None:
-                st.dataframe(
-                    staff_acc_data,
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.error(error_message, icon="⚠️")
+        # 列出所有员工账户信息
+        if error_message is None:
+            st.dataframe(
+                staff_acc_data,
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.error(error_message, icon="⚠️")
 
-            st.info("请选择您要进行的操作！", icon="ℹ️")
+        st.info("请选择您要进行的操作！", icon="ℹ️")
 
-            # 员工管理操作按钮
-            col1, col2, col3 = st.columns([1, 1, 1])
-            with col1:
-                if st.button("➕新建客服组", use_container_width=True, type="primary"):
-                    st.switch_page("pages/add_acc.py")
-            with col2:
-                if st.button("✏️修改客服组", use_container_width=True, type="primary"):
-                    st.switch_page("pages/modify_acc.py")
-            with col3:
-                if st.button("❌删除客服组", use_container_width=True, type="primary"):
-                    st.switch_page("pages/delete_acc.py")
+        # 员工管理操作按钮
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col1:
+            if st.button("➕新建客服组", use_container_width=True, type="primary"):
+                st.switch_page("pages/add_acc.py")
+        with col2:
+            if st.button("✏️修改客服组", use_container_width=True, type="primary"):
+                st.switch_page("pages/modify_acc.py")
+        with col3:
+            if st.button("❌删除客服组", use_container_width=True, type="primary"):
+                st.switch_page("pages/delete_acc.py")
 
-        # 在tab2中的相关代码需要这样修改：
-        with tab2:
-            # 获取保洁组数据
-            clean_teams_data, error_message = get_all_clean_teams()
+    # 在tab2中的相关代码需要这样修改：
+    with tab2:
+        # 获取保洁组数据
+        clean_teams_data, error_message = get_all_clean_teams()
 
-            if error_message is None:
-                # 使用更新后的显示函数显示保洁组信息
-                show_clean_teams_table(clean_teams_data)
+        if error_message is None:
+            # 使用更新后的显示函数显示保洁组信息
+            show_clean_teams_table(clean_teams_data)
 
-                st.info("请选择您要进行的操作！", icon="ℹ️")
+            st.info("请选择您要进行的操作！", icon="ℹ️")
 
-                # 保洁组管理操作
-                col1, col2, col3 = st.columns(3)
+            # 保洁组管理操作
+            col1, col2, col3 = st.columns(3)
 
-                with col1:
-                    if st.button("➕新建保洁组", use_container_width=True, type="primary"):
-                        show_clean_team_creation_dialog()
+            with col1:
+                if st.button("➕新建保洁组", use_container_width=True, type="primary"):
+                    show_clean_team_creation_dialog()
 
-                with col2:
-                    if st.button("✏️修改保洁组", use_container_width=True, type="primary"):
-                        st.switch_page("pages/modify_clean_team.py")
+            with col2:
+                if st.button("✏️修改保洁组", use_container_width=True, type="primary"):
+                    st.switch_page("pages/modify_clean_team.py")
 
-                with col3:
-                    if st.button("❌删除保洁组", use_container_width=True, type="primary"):
-                        st.switch_page("pages/delete_clean_team.py")
+            with col3:
+                if st.button("❌删除保洁组", use_container_width=True, type="primary"):
+                    st.switch_page("pages/delete_clean_team.py")
 
-            else:
-                st.error(error_message, icon="⚠️")
-    else:
-        error = st.error("您没有权限访问该页面！3秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        error = st.error("您没有权限访问该页面！2秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        st.error("您没有权限访问该页面！1秒后跳转至登录页...", icon="⚠️")
-        time.sleep(1)
-        st.session_state["login_state"] = False
-        st.switch_page("pages/login_page.py")
+        else:
+            st.error(error_message, icon="⚠️")
 
 
 if __name__ == "__main__":
-    staff_acc()
+    with page_timer():
+        staff_acc()
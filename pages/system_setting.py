@@ -7,47 +7,64 @@ Description:
 @Time     ：2025/1/8 上午12:08
 @Contact  ：king.songtao@gmail.com
 """
-import time
-
 import streamlit as st
-from utils.utils import navigation, check_login_state
+from configs.settings import BaseConfig
+from utils.app_metrics import page_timer, page_render_stats, llm_call_stats, session_memory_stats
+from utils.utils import navigation, require_login, redirect, LOGIN_PAGE, logger
 from utils.db_operations_v2 import update_account, login_auth
+from utils.db_engine import get_pool_stats
+from utils.db_metrics import query_metrics
+from utils.query_cache import query_cache
+from utils.amount_calculator import invalidate_team_cache
+from utils.validator import get_validator
 from utils.styles import apply_global_styles
 
+# 运维面板中统计表格的列名
+STAT_COLUMNS = {
+    'page': '页面',
+    'function': '函数',
+    'call': '调用',
+    'calls': '调用次数',
+    'p50_ms': 'p50 (ms)',
+    'p95_ms': 'p95 (ms)',
+    'p99_ms': 'p99 (ms)',
+    'max_ms': '最大 (ms)',
+    'total_ms': '总耗时 (ms)',
+    'avg_rows': '平均行数',
+    'avg_round_trips': '平均往返次数',
+    'slow_calls': '慢查询次数',
+    'round_trips': '数据库往返次数',
+    'retries': '重试次数',
+    'failures': '失败次数',
+    'session': '会话',
+    'user': '用户',
+    'keys': '变量数',
+    'memory_mb': '内存 (MB)',
+    'updated_at': '最近运行'
+}
+
 
 def system_settings():
     st.set_page_config(page_title='ATM-Cleaning', page_icon='images/favicon.png')
     apply_global_styles()
-    login_state, role = check_login_state()
-
-    if login_state:
-        navigation()
-        st.title("⚙️系统设置")
+    role = require_login()
 
-        tab1, tab2, tab3, tab4 = st.tabs(["👤 个人信息", "🔑 修改密码", "🎨 界面设置", "🔧 系统配置"])
+    navigation()
+    st.title("⚙️系统设置")
 
-        with tab1:
-            personal_info_settings()
+    tab1, tab2, tab3, tab4 = st.tabs(["👤 个人信息", "🔑 修改密码", "🎨 界面设置", "🔧 系统配置"])
 
-        with tab2:
-            password_settings()
+    with tab1:
+        personal_info_settings()
 
-        with tab3:
-            appearance_settings()
+    with tab2:
+        password_settings()
 
-        with tab4:
-            system_config_settings()
+    with tab3:
+        appearance_settings()
 
-    else:
-        error = st.error("您还没有登录！3秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        error = st.error("您还没有登录！2秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        error.empty()
-        st.error("您还没有登录！1秒后跳转至登录页面...", icon="⚠️")
-        time.sleep(1)
-        st.switch_page("pages/login_page.py")
+    with tab4:
+        system_config_settings(role)
 
 
 def personal_info_settings():
@@ -106,10 +123,8 @@ def password_settings():
         # 更新密码
         success, error = update_account(username, st.session_state.name, new_password)
         if success:
-            st.success("密码修改成功！请重新登录...", icon="✅")
-            time.sleep(2)
             st.session_state.clear()
-            st.switch_page("pages/login_page.py")
+            redirect(LOGIN_PAGE, "密码修改成功！请重新登录。", icon="✅")
         else:
             st.error(f"密码修改失败：{error}", icon="⚠️")
 
@@ -202,16 +217,109 @@ def appearance_settings():
         st.switch_page("pages/orders_statistics.py")
 
 
-def system_config_settings():
+def _address_validator():
+    """与地址验证页面共用的验证器实例，未配置 API Key 时返回 None"""
+    try:
+        return get_validator(st.secrets["api_keys"]["openai_api_key"])
+    except (KeyError, FileNotFoundError):
+        return None
+
+
+def _show_stats_table(title, frame):
+    st.markdown(f"**{title}**")
+    if frame.empty:
+        st.caption("暂无数据")
+    else:
+        st.dataframe(frame.rename(columns=STAT_COLUMNS), use_container_width=True, hide_index=True)
+
+
+def show_operations_stats():
+    """运行状态：连接池、缓存命中率及页面、数据库、LLM 和会话内存统计"""
+    pool = get_pool_stats()
+    capacity = pool['pool_size'] + pool['max_overflow']
+    query_stats = query_cache.stats()
+    validator = _address_validator()
+    address_stats = validator.cache_stats() if validator else None
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("连接池使用", f"{pool['checked_out']}/{capacity}", help=(
+        f"常驻 {pool['pool_size']}，溢出 {pool['overflow']}/{pool['max_overflow']}，空闲 {pool['checked_in']}"
+    ))
+    col2.metric("获取连接等待", f"{pool['wait_avg'] * 1000:.1f} ms", help=(
+        f"最长 {pool['wait_max'] * 1000:.1f} ms，超时 {pool['wait_timeouts']} 次，共 {pool['wait_count']} 次"
+    ))
+    col3.metric("查询缓存命中率", f"{query_stats['hit_rate']:.0%}", help=(
+        f"命中 {query_stats['hits']}，未命中 {query_stats['misses']}，缓存 {query_stats['entries']} 条"
+    ))
+    col4.metric(
+        "地址缓存命中率", f"{address_stats['hit_rate']:.0%}" if address_stats else "-",
+        help=(f"命中 {address_stats['hits']}，未命中 {address_stats['misses']}，缓存 {address_stats['entries']} 条"
+              if address_stats else "未配置地址验证 API Key")
+    )
+
+    _show_stats_table("页面渲染耗时", page_render_stats.stats('page'))
+    _show_stats_table("数据库函数耗时", query_metrics.function_stats())
+    _show_stats_table("各页面数据库往返", query_metrics.page_stats())
+    _show_stats_table("LLM 调用", llm_call_stats.stats('call'))
+
+    sessions = session_memory_stats()
+    sessions['memory_mb'] = (sessions['bytes'] / 1024 / 1024).round(2)
+    _show_stats_table("会话内存", sessions.drop(columns=['bytes']))
+
+
+def cache_management():
+    """分别清空各项缓存或重置性能统计"""
+    username = st.session_state.get("logged_in_username")
+    validator = _address_validator()
+    col1, col2, col3, col4 = st.columns(4)
+
+    if col1.button("清空查询缓存", use_container_width=True, key="flush_query_cache"):
+        query_cache.clear()
+        logger.info(f"{username} 清空了查询缓存")
+        st.toast("查询缓存已清空！", icon="✅")
+
+    if col2.button("清空地址缓存", use_container_width=True, key="flush_address_cache", disabled=validator is None):
+        validator.clear_cache()
+        logger.info(f"{username} 清空了地址缓存")
+        st.toast("地址缓存已清空！", icon="✅")
+
+    if col3.button("清空保洁组缓存", use_container_width=True, key="flush_team_cache"):
+        invalidate_team_cache()
+        logger.info(f"{username} 清空了保洁组ABN状态缓存")
+        st.toast("保洁组缓存已清空！", icon="✅")
+
+    if col4.button("重置性能统计", use_container_width=True, key="reset_metrics"):
+        query_metrics.reset()
+        page_render_stats.reset()
+        llm_call_stats.reset()
+        logger.info(f"{username} 重置了性能统计")
+        st.toast("性能统计已重置！", icon="✅")
+
+
+def operations_panel():
+    """运维面板，仅管理员可见"""
+    # 先处理清空缓存的操作，下方的统计即为清空后的结果
+    st.subheader("🧹 缓存管理")
+    cache_management()
+
+    st.subheader("📊 运行状态")
+    interval = BaseConfig().APP_METRICS_SETTING['refresh_interval']
+    auto_refresh = st.toggle(f"每 {interval} 秒自动刷新", value=False, key="ops_auto_refresh")
+    st.fragment(show_operations_stats, run_every=interval if auto_refresh else None)()
+    st.divider()
+
+
+def system_config_settings(role):
+    if role == 'admin':
+        operations_panel()
+
     st.info("清除缓存功能将会清除掉所有浏览器缓存的数据，清除后需重新登录！", icon="ℹ️")
     clear_cache_confirm = st.checkbox("我确定想要清除缓存！我已知晓此操作不可逆！", value=False, key="clear_cache_confirm")
     clear_cache = st.button("清除缓存", use_container_width=True, type="primary")
 
     if clear_cache and clear_cache_confirm:
         st.session_state.clear()
-        st.success("缓存已清除！需要重新登录...")
-        time.sleep(2)
-        st.switch_page("app.py")
+        redirect(LOGIN_PAGE, "缓存已清除！需要重新登录。", icon="✅")
 
     elif clear_cache and not clear_cache_confirm:
         st.error("请勾选确认信息后进行提交！", icon="⚠️")
@@ -221,4 +329,5 @@ def system_config_settings():
 
 
 if __name__ == '__main__':
-    system_settings()
+    with page_timer():
+        system_settings()
@@ -0,0 +1,21 @@
+"""
+Description: 全量重建保洁组月度汇总表（team_month_rollup）
+
+    首次创建汇总表或数据不一致时，在项目根目录运行：python rebuild_rollup.py
+
+-*- Encoding: UTF-8 -*-
+@File     ：rebuild_rollup.py
+@Author   ：King Songtao
+@Time     ：2025/2/20 下午3:10
+@Contact  ：king.songtao@gmail.com
+"""
+import sys
+
+from utils.db_operations_v2 import rebuild_team_month_rollup
+
+if __name__ == '__main__':
+    success, error = rebuild_team_month_rollup()
+    if not success:
+        print(f"重建失败：{error}")
+        sys.exit(1)
+    print("重建完成")
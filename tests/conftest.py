@@ -0,0 +1,64 @@
+"""
+Description: 测试公共夹具
+
+    测试使用 SQLite 本地数据库（见 utils/sqlite_backend.py），不需要 MySQL 服务：
+    整个测试会话在临时目录中创建一个数据库，并用 benchmarks.generate_data 写入固定种子的模拟数据。
+
+    在项目根目录运行：python -m pytest
+
+-*- Encoding: UTF-8 -*-
+@File     ：conftest.py
+@Author   ：King Songtao
+@Time     ：2025/2/25 上午10:20
+@Contact  ：king.songtao@gmail.com
+"""
+import os
+
+import pytest
+from sqlalchemy import text
+
+from benchmarks.generate_data import generate_dataset
+from utils.amount_calculator import invalidate_team_cache
+from utils.db_engine import DATABASE_URL_ENV, get_connection
+from utils.query_cache import query_cache
+
+# 模拟数据规模：足够覆盖多个页、多个月份和有/无ABN的保洁组
+TEST_ORDERS = 600
+TEST_TEAMS = 8
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database(tmp_path_factory):
+    """整个测试会话共用的 SQLite 数据库"""
+    path = tmp_path_factory.mktemp('db') / 'atm_erp_test.sqlite'
+    previous = os.environ.get(DATABASE_URL_ENV)
+    os.environ[DATABASE_URL_ENV] = f"sqlite:///{path}"
+
+    generate_dataset(get_connection(), TEST_ORDERS, TEST_TEAMS, seed=0)
+    yield path
+
+    if previous is None:
+        os.environ.pop(DATABASE_URL_ENV, None)
+    else:
+        os.environ[DATABASE_URL_ENV] = previous
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """每个测试开始时清空进程内缓存，避免测试之间互相影响"""
+    query_cache.clear()
+    invalidate_team_cache()
+
+
+@pytest.fixture
+def conn(database):
+    return get_connection()
+
+
+@pytest.fixture
+def fetch_all(conn):
+    """执行查询并以字典列表返回结果"""
+    def fetch(sql, **params):
+        with conn.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(text(sql), params).mappings()]
+    return fetch
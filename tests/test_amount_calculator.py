@@ -0,0 +1,53 @@
+"""
+Description: 工单金额计算：逐行计算与批量计算的一致性
+
+-*- Encoding: UTF-8 -*-
+@File     ：test_amount_calculator.py
+@Author   ：King Songtao
+@Time     ：2025/2/25 上午11:05
+@Contact  ：king.songtao@gmail.com
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from utils.amount_calculator import UNASSIGNED_TEAM, calculate_total_amount, calculate_total_amounts, invalidate_team_cache
+
+
+@pytest.fixture
+def unassigned_marked_abn(conn):
+    """把“暂未派单”误标为有ABN，两种计算仍应按无ABN处理"""
+    with conn.engine.begin() as connection:
+        connection.execute(text("UPDATE clean_teams SET has_abn = 1 WHERE team_name = :name"), {'name': UNASSIGNED_TEAM})
+    invalidate_team_cache()
+    yield
+    with conn.engine.begin() as connection:
+        connection.execute(text("UPDATE clean_teams SET has_abn = 0 WHERE team_name = :name"), {'name': UNASSIGNED_TEAM})
+    invalidate_team_cache()
+
+
+def test_scalar_and_vectorized_agree(conn, fetch_all, unassigned_marked_abn):
+    """有ABN、无ABN、未派单、不存在和为空的保洁组混合时，两种计算逐行一致"""
+    teams = fetch_all("SELECT team_name, has_abn FROM clean_teams ORDER BY id")
+    abn_map = {team['team_name']: bool(team['has_abn']) for team in teams}
+    abn_team = next(name for name, has_abn in abn_map.items() if has_abn and name != UNASSIGNED_TEAM)
+    plain_team = next(name for name, has_abn in abn_map.items() if not has_abn)
+
+    orders = pd.DataFrame([
+        {'income1': 100, 'income2': 200, 'assigned_cleaner': abn_team},
+        {'income1': 100, 'income2': 200, 'assigned_cleaner': plain_team},
+        {'income1': 0, 'income2': 350.5, 'assigned_cleaner': UNASSIGNED_TEAM},
+        {'income1': 80, 'income2': 40, 'assigned_cleaner': '不存在的保洁组'},
+        {'income1': 60, 'income2': 90, 'assigned_cleaner': None},
+        {'income1': 70, 'income2': 30, 'assigned_cleaner': ''},
+        {'income1': None, 'income2': 120, 'assigned_cleaner': abn_team},
+        {'income1': 50, 'income2': None, 'assigned_cleaner': plain_team},
+    ])
+
+    order_amounts, total_amounts = calculate_total_amounts(orders, abn_map)
+
+    for i, order in enumerate(orders.to_dict('records')):
+        income1 = None if pd.isna(order['income1']) else order['income1']
+        income2 = None if pd.isna(order['income2']) else order['income2']
+        expected = calculate_total_amount(income1, income2, order['assigned_cleaner'], conn)
+        assert (order_amounts[i], total_amounts[i]) == pytest.approx(expected), order
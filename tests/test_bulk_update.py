@@ -0,0 +1,66 @@
+"""
+Description: 批量更新工单的金额计算
+
+-*- Encoding: UTF-8 -*-
+@File     ：test_bulk_update.py
+@Author   ：King Songtao
+@Time     ：2025/2/25 上午10:40
+@Contact  ：king.songtao@gmail.com
+"""
+import pytest
+
+from utils.amount_calculator import calculate_total_amount
+from utils.db_operations_v2 import BULK_UPDATE_FIELDS, update_work_orders_bulk
+
+
+def _team(fetch_all, has_abn):
+    return fetch_all(
+        "SELECT team_name FROM clean_teams WHERE has_abn = :has_abn AND team_name != '暂未派单' ORDER BY id LIMIT 1",
+        has_abn=has_abn
+    )[0]['team_name']
+
+
+def _order_of(fetch_all, team_name):
+    """取保洁组中一个有转账收入（会产生 GST 差异）的工单"""
+    return fetch_all(
+        f"SELECT id, {', '.join(BULK_UPDATE_FIELDS)} FROM work_orders "
+        "WHERE assigned_cleaner = :team_name AND income2 > 0 ORDER BY id LIMIT 1",
+        team_name=team_name
+    )[0]
+
+
+def _assert_amounts(conn, fetch_all, order_ids):
+    for order_id in order_ids:
+        order = fetch_all(
+            "SELECT income1, income2, assigned_cleaner, order_amount, total_amount FROM work_orders WHERE id = :id",
+            id=order_id
+        )[0]
+        expected = calculate_total_amount(
+            float(order['income1'] or 0), float(order['income2'] or 0), order['assigned_cleaner'], conn
+        )
+        assert (float(order['order_amount']), float(order['total_amount'])) == pytest.approx(expected), order_id
+
+
+def test_bulk_update_moves_orders_onto_and_off_abn_team(conn, fetch_all):
+    """同一次批量修改中，一个工单改派到有ABN的保洁组、另一个改派到无ABN的保洁组"""
+    abn_team, plain_team = _team(fetch_all, 1), _team(fetch_all, 0)
+    onto_abn, off_abn = _order_of(fetch_all, plain_team), _order_of(fetch_all, abn_team)
+    onto_abn['assigned_cleaner'], off_abn['assigned_cleaner'] = abn_team, plain_team
+
+    success, error = update_work_orders_bulk([onto_abn, off_abn])
+
+    assert success, error
+    _assert_amounts(conn, fetch_all, [onto_abn['id'], off_abn['id']])
+
+
+def test_bulk_update_recalculates_changed_income(conn, fetch_all):
+    """修改收入和取消派单时，金额按新值重新计算"""
+    changed = _order_of(fetch_all, _team(fetch_all, 1))
+    unassigned = _order_of(fetch_all, _team(fetch_all, 0))
+    changed['income1'], changed['income2'] = 120, 300
+    unassigned['assigned_cleaner'] = ''
+
+    success, error = update_work_orders_bulk([changed, unassigned])
+
+    assert success, error
+    _assert_amounts(conn, fetch_all, [changed['id'], unassigned['id']])
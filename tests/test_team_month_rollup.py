@@ -0,0 +1,135 @@
+"""
+Description: 保洁组月度汇总表：各类写入增量维护后与全量重建的结果一致
+
+-*- Encoding: UTF-8 -*-
+@File     ：test_team_month_rollup.py
+@Author   ：King Songtao
+@Time     ：2025/2/25 下午2:10
+@Contact  ：king.songtao@gmail.com
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from utils.db_operations_v2 import (
+    BULK_UPDATE_FIELDS, create_work_order, delete_work_order, rebuild_team_month_rollup,
+    update_clean_team, update_work_order, update_work_orders_bulk
+)
+
+
+def _rollup(fetch_all):
+    rows = fetch_all("""
+        SELECT year, month, team_name, income1, income2, subsidy, order_amount, total_amount, order_count
+        FROM team_month_rollup
+        ORDER BY year, month, team_name
+    """)
+    # 增量加减与重新求和的浮点误差不计
+    return [
+        {key: round(float(value), 2) if key not in ('year', 'month', 'team_name') else value for key, value in row.items()}
+        for row in rows
+    ]
+
+
+def _assert_matches_rebuild(fetch_all):
+    maintained = _rollup(fetch_all)
+    success, error = rebuild_team_month_rollup()
+    assert success, error
+    assert maintained == _rollup(fetch_all)
+
+
+def _teams(fetch_all):
+    """一个有ABN和一个无ABN的保洁组"""
+    rows = fetch_all("""
+        SELECT id, team_name, contact_number, has_abn, is_active, notes FROM clean_teams
+        WHERE team_name != '暂未派单' ORDER BY id
+    """)
+    return next(row for row in rows if row['has_abn']), next(row for row in rows if not row['has_abn'])
+
+
+def _orders(fetch_all, count, team_name=None):
+    condition = "assigned_cleaner = :team_name" if team_name else "work_date IS NOT NULL"
+    return fetch_all(
+        f"SELECT id, {', '.join(BULK_UPDATE_FIELDS)} FROM work_orders WHERE {condition} ORDER BY id LIMIT {count}",
+        team_name=team_name
+    )
+
+
+@pytest.fixture(autouse=True)
+def rollup_starts_consistent():
+    success, error = rebuild_team_month_rollup()
+    assert success, error
+
+
+def test_create(fetch_all):
+    abn_team, plain_team = _teams(fetch_all)
+    for team, work_date in [(abn_team, date.today()), (plain_team, date.today() - timedelta(days=40)), (None, None)]:
+        success, error = create_work_order(
+            order_date=date.today(), created_by='测试', source='测试', work_address='1 Test St, Melbourne VIC 3000',
+            income1=100, income2=230, work_date=work_date, work_time='上午 10:00' if work_date else None,
+            assigned_cleaner=team['team_name'] if team else '暂未派单', subsidy=15
+        )
+        assert success, error
+    _assert_matches_rebuild(fetch_all)
+
+
+def test_update(fetch_all):
+    abn_team, plain_team = _teams(fetch_all)
+    order = _orders(fetch_all, 1, plain_team['team_name'])[0]
+    # 同时改变月份、保洁组和收入
+    success, error = update_work_order({
+        'id': order['id'],
+        'work_date': order['work_date'] + timedelta(days=45) if order['work_date'] else date.today(),
+        'assigned_cleaner': abn_team['team_name'],
+        'income2': 480
+    })
+    assert success, error
+    # 只修改与汇总无关的字段
+    success, error = update_work_order({'id': order['id'], 'remarks': '只改备注'})
+    assert success, error
+    _assert_matches_rebuild(fetch_all)
+
+
+def test_bulk_update(fetch_all):
+    abn_team, plain_team = _teams(fetch_all)
+    changes = _orders(fetch_all, 4)
+    changes[0]['work_date'] = changes[0]['work_date'] - timedelta(days=60)
+    changes[1]['assigned_cleaner'] = abn_team['team_name']
+    changes[2]['assigned_cleaner'] = plain_team['team_name']
+    changes[2]['income1'], changes[2]['subsidy'] = 333, 20
+    changes[3]['work_date'] = None
+
+    success, error = update_work_orders_bulk(changes)
+    assert success, error
+    _assert_matches_rebuild(fetch_all)
+
+
+def test_delete(fetch_all):
+    for order in _orders(fetch_all, 2):
+        success, error = delete_work_order(order['id'])
+        assert success, error
+    _assert_matches_rebuild(fetch_all)
+
+
+def test_update_clean_team(fetch_all):
+    abn_team, plain_team = _teams(fetch_all)
+    # 改名并取消ABN，另一个保洁组改为有ABN，工单金额和汇总均需随之更新
+    success, error = update_clean_team(
+        abn_team['id'], abn_team['team_name'] + '（改名）', abn_team['contact_number'], False,
+        bool(abn_team['is_active']), abn_team['notes']
+    )
+    assert success, error
+    success, error = update_clean_team(
+        plain_team['id'], plain_team['team_name'], plain_team['contact_number'], True,
+        bool(plain_team['is_active']), plain_team['notes']
+    )
+    assert success, error
+    _assert_matches_rebuild(fetch_all)
+
+    # 恢复原来的名称和ABN状态，同样需要维护汇总
+    for team in (abn_team, plain_team):
+        success, error = update_clean_team(
+            team['id'], team['team_name'], team['contact_number'], bool(team['has_abn']),
+            bool(team['is_active']), team['notes']
+        )
+        assert success, error
+    _assert_matches_rebuild(fetch_all)
@@ -0,0 +1,70 @@
+"""
+Description: 工单列表 keyset 分页：双向翻页的结果与整个时间范围的完整排序一致
+
+-*- Encoding: UTF-8 -*-
+@File     ：test_work_order_pages.py
+@Author   ：King Songtao
+@Time     ：2025/2/25 上午11:30
+@Contact  ：king.songtao@gmail.com
+"""
+import pytest
+
+from utils.db_operations_v2 import get_time_range_bounds, get_work_orders_page
+
+# 较小的页，使测试数据可以分成多页并覆盖排序键相同、只以 id 区分的边界
+PAGE_SIZE = 7
+
+
+def _full_sort(fetch_all, time_range, cleaners=None):
+    """不分页、直接按完整排序键排序的工单 id"""
+    start_date, end_date = get_time_range_bounds(time_range)
+    params = {'start_date': start_date, 'end_date': end_date}
+    cleaner_filter = ''
+    if cleaners:
+        params.update({f'cleaner_{i}': cleaner for i, cleaner in enumerate(cleaners)})
+        cleaner_filter = f"AND assigned_cleaner IN ({', '.join(f':cleaner_{i}' for i in range(len(cleaners)))})"
+
+    rows = fetch_all(f"""
+        SELECT id FROM work_orders
+        WHERE ((work_date >= :start_date AND work_date < :end_date) OR work_date IS NULL) {cleaner_filter}
+        ORDER BY order_date DESC, work_date IS NULL, work_date, work_time IS NULL, work_time, id
+    """, **params)
+    return [row['id'] for row in rows]
+
+
+def _page(time_range, cleaners, cursor=None, backward=False):
+    page, error = get_work_orders_page(time_range, cursor, PAGE_SIZE, backward, cleaners)
+    assert error is None, error
+    assert len(page['orders']) <= PAGE_SIZE
+    return page
+
+
+def _busiest_team(fetch_all):
+    return fetch_all(
+        "SELECT assigned_cleaner FROM work_orders GROUP BY assigned_cleaner ORDER BY COUNT(*) DESC LIMIT 1"
+    )[0]['assigned_cleaner']
+
+
+@pytest.mark.parametrize('time_range', ['week', 'month', 'year'])
+@pytest.mark.parametrize('team_filter', [False, True])
+def test_pages_in_both_directions_match_full_sort(fetch_all, time_range, team_filter):
+    cleaners = [_busiest_team(fetch_all)] if team_filter else None
+    expected = _full_sort(fetch_all, time_range, cleaners)
+    assert len(expected) > PAGE_SIZE * 2, "测试数据不足以分成多页"
+
+    # 从第一页向后翻到最后一页
+    forward_pages = [_page(time_range, cleaners)]
+    while forward_pages[-1]['next_cursor'] is not None:
+        forward_pages.append(_page(time_range, cleaners, forward_pages[-1]['next_cursor']))
+    assert forward_pages[0]['prev_cursor'] is None
+    assert [order_id for page in forward_pages for order_id in page['orders']['id']] == expected
+
+    # 从最后一页向前翻回第一页，每一页与向后翻页时的同一页一致
+    backward_pages = [forward_pages[-1]]
+    while backward_pages[-1]['prev_cursor'] is not None:
+        backward_pages.append(_page(time_range, cleaners, backward_pages[-1]['prev_cursor'], backward=True))
+    backward_pages.reverse()
+    assert [order_id for page in backward_pages for order_id in page['orders']['id']] == expected
+    assert [list(page['orders']['id']) for page in backward_pages] == [
+        list(page['orders']['id']) for page in forward_pages
+    ]
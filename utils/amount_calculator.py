@@ -8,27 +8,82 @@ Description:
 @Contact  ：king.songtao@gmail.com
 """
 
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from configs.settings import BaseConfig
+from utils.db_engine import read_sql
+
+# 未派单工单关联的保洁组，始终按无ABN计算
+UNASSIGNED_TEAM = "暂未派单"
+
+# 进程内共享的保洁组状态缓存：{保洁组名称: {'has_abn': bool, 'is_active': bool}}
+_team_cache = {}
+_team_cache_expires_at = 0.0
+_team_cache_lock = threading.Lock()
+
+
+def invalidate_team_cache():
+    """清除保洁组状态缓存，保洁组信息发生变化后调用"""
+    global _team_cache_expires_at
+    with _team_cache_lock:
+        _team_cache.clear()
+        _team_cache_expires_at = 0.0
+
+
+def _ensure_team_cache(conn):
+    """缓存过期或被清除时，一次性重新加载所有保洁组状态（需持有 _team_cache_lock）"""
+    global _team_cache_expires_at
+    if time.monotonic() < _team_cache_expires_at:
+        return
+
+    result = read_sql(conn, "SELECT team_name, has_abn, is_active FROM clean_teams")
+    _team_cache.clear()
+    for team in result.to_dict('records'):
+        _team_cache[team['team_name']] = {
+            'has_abn': bool(team['has_abn']),
+            'is_active': bool(team['is_active'])
+        }
+    _team_cache_expires_at = time.monotonic() + BaseConfig().TEAM_CACHE_TTL
+
+
+def get_team_status(assigned_cleaner: str, conn) -> dict:
+    """获取保洁组的ABN和在职状态，缓存未过期时不访问数据库
+
+    Args:
+        assigned_cleaner: 保洁组名称
+        conn: 数据库连接
+
+    Returns:
+        dict: {'has_abn': bool, 'is_active': bool}，保洁组不存在时返回 None
+    """
+    with _team_cache_lock:
+        _ensure_team_cache(conn)
+        return _team_cache.get(assigned_cleaner)
+
 
 def calculate_total_amount(income1: float, income2: float, assigned_cleaner: str, conn) -> tuple[float, float]:
     """计算工单总金额
 
     Args:
-        income1: 现金收入
-        income2: 转账收入
-        assigned_cleaner: 保洁组名称
+        income1: 现金收入，为空时按 0 计算
+        income2: 转账收入，为空时按 0 计算
+        assigned_cleaner: 保洁组名称，未派单、为空或不存在时按无ABN计算
         conn: 数据库连接
 
     Returns:
         tuple: (订单金额, 总金额(含GST))
     """
-    # 检查保洁组的ABN状态
-    if assigned_cleaner and assigned_cleaner != "暂未派单":
-        result = conn.query(
-            "SELECT has_abn FROM clean_teams WHERE team_name = :team_name",
-            params={'team_name': assigned_cleaner},
-            ttl=0
-        )
-        has_abn = bool(result.iloc[0]['has_abn']) if not result.empty else False
+    income1 = float(income1 or 0)
+    income2 = float(income2 or 0)
+
+    # 检查保洁组的ABN状态（读取进程内缓存）
+    if assigned_cleaner and assigned_cleaner != UNASSIGNED_TEAM:
+        team_status = get_team_status(assigned_cleaner, conn)
+        has_abn = team_status['has_abn'] if team_status else False
     else:
         has_abn = False
 
@@ -40,3 +95,69 @@ def calculate_total_amount(income1: float, income2: float, assigned_cleaner: str
     total_amount = order_amount if has_abn else income1 + (income2 * 1.1)
 
     return order_amount, total_amount
+
+
+def calculate_total_amounts(orders, abn_map: dict) -> tuple[np.ndarray, np.ndarray]:
+    """批量计算工单金额，规则与 calculate_total_amount 一致
+
+    一次向量化计算所有工单，不逐行查询数据库，适用于重算、导入和预览大量工单。
+
+    Args:
+        orders: 包含 income1、income2、assigned_cleaner 列的 DataFrame，
+            或以这三个名称为键、值为数组的字典
+        abn_map: 保洁组名称到ABN状态的映射；与 calculate_total_amount 一致，
+            未派单、为空或未出现在映射中的保洁组按无ABN处理
+
+    Returns:
+        tuple: (订单金额数组, 总金额(含GST)数组)
+    """
+    income1 = pd.to_numeric(pd.Series(orders['income1']), errors='coerce').fillna(0).to_numpy(dtype=float)
+    income2 = pd.to_numeric(pd.Series(orders['income2']), errors='coerce').fillna(0).to_numpy(dtype=float)
+    cleaners = pd.Series(orders['assigned_cleaner'], dtype=object)
+    has_abn = (cleaners.ne(UNASSIGNED_TEAM) & cleaners.map(abn_map).eq(True)).to_numpy()
+
+    # 计算订单金额（不含GST）
+    order_amounts = income1 + income2
+
+    # 如果保洁组有ABN，则不计算GST
+    total_amounts = np.where(has_abn, order_amounts, income1 + income2 * 1.1)
+
+    return order_amounts, total_amounts
+
+
+def order_amount_sql(income1: str, income2: str) -> str:
+    """生成在数据库中计算订单金额（不含GST）的SQL表达式
+
+    Args:
+        income1: 现金收入的SQL表达式（列名或绑定参数）
+        income2: 转账收入的SQL表达式（列名或绑定参数）
+
+    Returns:
+        str: SQL表达式
+    """
+    return f"COALESCE({income1}, 0) + COALESCE({income2}, 0)"
+
+
+def total_amount_sql(income1: str, income2: str, assigned_cleaner: str) -> str:
+    """生成在数据库中计算总金额（含GST）的SQL表达式，规则与 calculate_total_amount 一致
+
+    assigned_cleaner 位于查询 clean_teams 的相关子查询中，其中引用的列需带表名（如 work_orders.id），
+    否则会被解析为 clean_teams 的同名列。
+
+    Args:
+        income1: 现金收入的SQL表达式（列名或绑定参数）
+        income2: 转账收入的SQL表达式（列名或绑定参数）
+        assigned_cleaner: 保洁组名称的SQL表达式（带表名的列或绑定参数）
+
+    Returns:
+        str: SQL表达式
+    """
+    # 如果保洁组有ABN，则不计算GST
+    return f"""CASE
+        WHEN EXISTS (
+            SELECT 1 FROM clean_teams abn_team
+            WHERE abn_team.team_name = {assigned_cleaner} AND abn_team.has_abn = 1
+            AND abn_team.team_name != '{UNASSIGNED_TEAM}'
+        ) THEN COALESCE({income1}, 0) + COALESCE({income2}, 0)
+        ELSE COALESCE({income1}, 0) + COALESCE({income2}, 0) * 1.1
+    END"""
@@ -0,0 +1,188 @@
+"""
+Description: 页面渲染、LLM 调用和会话内存统计
+
+    与 db_metrics 的数据访问统计一起显示在系统设置的运维面板中：
+        page_timer: 包裹页面入口，记录每个页面的渲染耗时，并记录当前会话 session_state 的内存占用
+        record_llm_call: 记录一次 LLM 调用的耗时、重试次数和是否成功
+
+-*- Encoding: UTF-8 -*-
+@File     ：app_metrics.py
+@Author   ：King Songtao
+@Time     ：2025/2/24 上午11:15
+@Contact  ：king.songtao@gmail.com
+"""
+import sys
+import threading
+import time
+import types
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from configs.settings import *
+from utils.db_metrics import current_page
+from utils.tracing import start_trace
+
+
+class LatencyStats:
+    """按名称汇总的耗时统计（进程内共享，线程安全）"""
+
+    def __init__(self, sample_size: int):
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, name: str, elapsed_ms: float, **counters):
+        """记录一次耗时，counters 为需要累加的计数，如 retries=1"""
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = {
+                    'calls': 0, 'max_ms': 0.0, 'counters': {}, 'samples': deque(maxlen=self.sample_size)
+                }
+            series['calls'] += 1
+            series['max_ms'] = max(series['max_ms'], elapsed_ms)
+            series['samples'].append(elapsed_ms)
+            for counter, value in counters.items():
+                series['counters'][counter] = series['counters'].get(counter, 0) + value
+
+    def stats(self, key: str = 'name') -> pd.DataFrame:
+        """每个名称一行：调用次数、p50/p95/p99/最大耗时（毫秒）及各计数的合计
+
+        Args:
+            key: 名称列的列名
+        """
+        with self._lock:
+            rows = []
+            for name, series in self._series.items():
+                p50, p95, p99 = np.percentile(np.array(series['samples']), [50, 95, 99])
+                rows.append({
+                    key: name,
+                    'calls': series['calls'],
+                    'p50_ms': round(float(p50), 1),
+                    'p95_ms': round(float(p95), 1),
+                    'p99_ms': round(float(p99), 1),
+                    'max_ms': round(series['max_ms'], 1),
+                    **series['counters']
+                })
+        frame = pd.DataFrame(rows)
+        return frame.sort_values('p95_ms', ascending=False, ignore_index=True) if rows else frame
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self._series.clear()
+
+
+_settings = BaseConfig().APP_METRICS_SETTING
+page_render_stats = LatencyStats(_settings['sample_size'])
+llm_call_stats = LatencyStats(_settings['sample_size'])
+
+# estimate_size 递归计算的最大层数
+ESTIMATE_MAX_DEPTH = 8
+
+# 各会话最近一次运行页面后的 session_state 内存占用，以会话 ID 为键
+_session_memory = {}
+_session_memory_lock = threading.Lock()
+
+
+def estimate_size(obj, seen=None, depth=0) -> int:
+    """估算对象占用的内存（字节）
+
+    递归计算容器和对象属性（最多 ESTIMATE_MAX_DEPTH 层），DataFrame 按 memory_usage 计算，
+    模块、类和函数只计算自身。
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+
+    size = sys.getsizeof(obj)
+    if depth >= ESTIMATE_MAX_DEPTH or isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return size
+    if isinstance(obj, dict):
+        size += sum(
+            estimate_size(key, seen, depth + 1) + estimate_size(value, seen, depth + 1) for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(estimate_size(item, seen, depth + 1) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += estimate_size(vars(obj), seen, depth + 1)
+    return size
+
+
+def _record_session_memory(page):
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return
+    try:
+        state = {key: st.session_state[key] for key in st.session_state.keys()}
+        size = estimate_size(state)
+    except Exception as e:
+        logger.warning(f"统计会话内存失败：{e}")
+        return
+
+    with _session_memory_lock:
+        _session_memory[ctx.session_id] = {
+            'user': st.session_state.get('logged_in_username'),
+            'page': page,
+            'keys': len(state),
+            'bytes': size,
+            'updated_at': datetime.now()
+        }
+
+
+@contextmanager
+def page_timer():
+    """记录页面本次运行的渲染耗时和会话内存占用，并开启本次运行的链路追踪
+
+    跳转页面、st.stop() 等中断的运行不计入渲染耗时。
+    """
+    page = current_page()
+    ctx = get_script_run_ctx(suppress_warning=True)
+    start = time.perf_counter()
+    completed = False
+    try:
+        with start_trace(
+                f"page.{page or 'unknown'}", page=page, user=st.session_state.get('logged_in_username'),
+                session=ctx.session_id if ctx else None
+        ):
+            yield
+        completed = True
+    finally:
+        if completed:
+            page_render_stats.record(page or '（未知页面）', (time.perf_counter() - start) * 1000)
+        _record_session_memory(page)
+
+
+def record_llm_call(name: str, elapsed_ms: float, retries: int = 0, success: bool = True):
+    """记录一次 LLM 调用
+
+    Args:
+        name: 调用名称，如函数名
+        elapsed_ms: 包含重试在内的总耗时（毫秒）
+        retries: 重试次数
+        success: 最终是否成功
+    """
+    llm_call_stats.record(name, elapsed_ms, retries=retries, failures=int(not success))
+
+
+def session_memory_stats() -> pd.DataFrame:
+    """各活跃会话的内存占用，按占用降序排列，超过 session_stale_after 未运行页面的会话会被移除"""
+    stale_before = datetime.now() - timedelta(seconds=BaseConfig().APP_METRICS_SETTING['session_stale_after'])
+    with _session_memory_lock:
+        for session_id in [key for key, value in _session_memory.items() if value['updated_at'] < stale_before]:
+            del _session_memory[session_id]
+        rows = [{'session': session_id[:8], **value} for session_id, value in _session_memory.items()]
+
+    frame = pd.DataFrame(rows, columns=['session', 'user', 'page', 'keys', 'bytes', 'updated_at'])
+    return frame.sort_values('bytes', ascending=False, ignore_index=True)
@@ -0,0 +1,132 @@
+"""
+Description: 单次页面运行的数据上下文
+
+    页面入口创建 DataContext，登记本次运行需要的全部查询后调用 fetch()。
+    命中共享缓存的查询直接返回，其余查询在同一个连接、同一个一致性快照中执行，
+    使用 mysqlclient 驱动时合并为一次多语句往返。
+
+-*- Encoding: UTF-8 -*-
+@File     ：data_context.py
+@Author   ：King Songtao
+@Time     ：2025/2/22 上午10:05
+@Contact  ：king.songtao@gmail.com
+"""
+from collections import namedtuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from configs.settings import *
+from utils.db_engine import run_read
+from utils.db_metrics import instrumented, record_round_trip
+from utils.query_cache import query_cache
+from utils.sql_dialect import begin_read_snapshot
+
+# 一条待执行的查询：
+#   sql: 查询语句
+#   params: 查询参数
+#   tables: 查询所依赖的表，为空时不使用共享缓存
+#   transform: 对查询结果 DataFrame 的后处理，为 None 时直接返回 DataFrame
+QuerySpec = namedtuple('QuerySpec', ['sql', 'params', 'tables', 'transform'], defaults=[None, (), None])
+
+
+class DataContext:
+    """单次页面运行的数据上下文，收集页面需要的查询并批量执行"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._specs = {}
+        self._results = {}
+
+    def add(self, name: str, spec: QuerySpec):
+        """登记一条查询，结果在 fetch() 后以 name 获取"""
+        self._specs[name] = spec
+        self._results.pop(name, None)
+        return self
+
+    @instrumented
+    def fetch(self):
+        """执行所有已登记但尚未执行的查询
+
+        可以多次调用，每次只执行新登记的查询。
+
+        Returns:
+            tuple: (所有已执行查询的结果字典, 错误信息)
+        """
+        try:
+            pending = {name: spec for name, spec in self._specs.items() if name not in self._results}
+            frames = {}
+            misses = {}
+
+            for name, spec in pending.items():
+                if not spec.tables:
+                    misses[name] = None
+                    continue
+                key = query_cache.make_key(spec.sql, spec.params)
+                snapshot = query_cache.snapshot(spec.tables)
+                cached = query_cache.get(key, snapshot)
+                if cached is not None:
+                    frames[name] = cached.copy()
+                else:
+                    misses[name] = (key, snapshot)
+
+            if misses:
+                specs = [pending[name] for name in misses]
+                tables = {table for spec in specs for table in spec.tables}
+                results = run_read(self.conn, lambda conn: self._execute(conn, specs), tables)
+                for (name, cache_entry), result in zip(misses.items(), results):
+                    if cache_entry is not None:
+                        query_cache.set(*cache_entry, result)
+                        result = result.copy()
+                    frames[name] = result
+
+            for name, spec in pending.items():
+                self._results[name] = spec.transform(frames[name]) if spec.transform else frames[name]
+
+            return dict(self._results), None
+        except Exception as e:
+            logger.error(f"批量获取页面数据失败：{e}")
+            return None, str(e)
+
+    @classmethod
+    def _execute(cls, conn, specs):
+        """在同一个连接和一致性快照中执行查询，返回与 specs 顺序一致的结果"""
+        with conn.engine.connect() as connection:
+            begin_statement = begin_read_snapshot(connection.dialect.name)
+            if begin_statement:
+                connection.exec_driver_sql(begin_statement)
+
+            if connection.dialect.driver == 'mysqldb' and len(specs) > 1:
+                results = cls._execute_multi_statement(connection, specs)
+            else:
+                results = [pd.read_sql(text(spec.sql), connection, params=spec.params) for spec in specs]
+
+            connection.rollback()
+            return results
+
+    @staticmethod
+    def _execute_multi_statement(connection, specs):
+        """将多条查询合并为一次多语句往返（mysqlclient 默认开启 MULTI_STATEMENTS）"""
+        statements = [
+            str(text(spec.sql).bindparams(**(spec.params or {})).compile(
+                dialect=connection.dialect,
+                compile_kwargs={'literal_binds': True}
+            ))
+            for spec in specs
+        ]
+
+        cursor = connection.connection.cursor()
+        try:
+            # 参数已渲染为字面量，传入空字典使驱动把编译时转义的 %% 还原为 %
+            # 驱动游标不经过 SQLAlchemy 的执行事件，需显式记录这次往返
+            record_round_trip()
+            cursor.execute(";\n".join(statements), {})
+            results = []
+            while True:
+                columns = [column[0] for column in cursor.description]
+                results.append(pd.DataFrame.from_records(list(cursor.fetchall()), columns=columns, coerce_float=True))
+                if not cursor.nextset():
+                    break
+            return results
+        finally:
+            cursor.close()
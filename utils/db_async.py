@@ -0,0 +1,167 @@
+"""
+Description: 异步数据库访问
+
+    基于 SQLAlchemy asyncio 扩展和 aiomysql 驱动，供通过 asyncio.run 运行的页面
+    与地址验证等异步任务一起用 asyncio.gather 并发查询。
+
+    Streamlit 每次运行页面都会由 asyncio.run 创建新的事件循环，而异步连接只能在创建它的
+    事件循环中使用，因此异步引擎运行在常驻的后台事件循环线程中，连接池可在多次运行间复用，
+    页面中的协程只等待查询结果，不会阻塞自身的事件循环。
+
+    只读副本的路由与同步读取一致（见 db_engine.read_connection_name），每个连接各有一个异步引擎，
+    副本出错时标记副本不可用并改用主库。
+
+-*- Encoding: UTF-8 -*-
+@File     ：db_async.py
+@Author   ：King Songtao
+@Time     ：2025/2/22 下午2:40
+@Contact  ：king.songtao@gmail.com
+"""
+import asyncio
+import threading
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from configs.settings import *
+from utils import sqlite_backend
+from utils.db_engine import (
+    connection_url, get_connection, is_transient_error, mark_replica_down, read_connection_name, retry_delay
+)
+from utils.db_metrics import attributed_to, round_trip_attribution, track_round_trips
+from utils.query_cache import query_cache
+from utils.tracing import span
+
+# 各数据库对应的异步驱动
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite'}
+
+_loop = None
+# 各连接的异步引擎：{secrets 中的连接名称: 引擎}
+_engines = {}
+_lock = threading.Lock()
+
+
+def _get_loop():
+    """获取常驻的后台事件循环，首次调用时启动"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='db-async-loop', daemon=True).start()
+        return _loop
+
+
+def _get_async_url(connection_name='mysql'):
+    """由 secrets 中的连接配置生成异步驱动的连接地址"""
+    url = connection_url(connection_name)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"数据库 {backend} 暂不支持异步访问")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def _get_engine(connection_name='mysql'):
+    """获取连接对应的异步引擎，连接池配置与同步引擎一致"""
+    with _lock:
+        engine = _engines.get(connection_name)
+        if engine is None:
+            config = BaseConfig()
+            timeouts = config.DATABASE_TIMEOUT_SETTING
+            url = _get_async_url(connection_name)
+
+            if url.get_backend_name() == 'sqlite':
+                # 由同步连接创建本地数据库中缺少的表
+                get_connection(connection_name)
+                connect_args = sqlite_backend.connect_args()
+            else:
+                connect_args = {
+                    'connect_timeout': timeouts['connect_timeout'],
+                    'init_command': f"SET SESSION max_execution_time = {int(timeouts['max_execution_time'])}"
+                }
+
+            engine = create_async_engine(
+                url, poolclass=AsyncAdaptedQueuePool, connect_args=connect_args, **config.DATABASE_POOL_SETTING
+            )
+            track_round_trips(engine.sync_engine)
+            _engines[connection_name] = engine
+        return engine
+
+
+async def _read_sql_with_retry(sql, params, attribution, connection_name):
+    """在后台事件循环中执行查询，遇到瞬时错误时按指数退避重试，往返次数计入发起方的页面"""
+    attempts = max(1, BaseConfig().DATABASE_RETRY_SETTING['attempts'])
+
+    for attempt in range(1, attempts + 1):
+        try:
+            async with _get_engine(connection_name).connect() as connection:
+                with attributed_to(attribution):
+                    result = await connection.execute(text(sql), params or {})
+                return pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()), coerce_float=True)
+        except Exception as e:
+            if attempt == attempts or not is_transient_error(e):
+                raise
+            delay = retry_delay(attempt)
+            logger.warning(f"数据库瞬时错误，{delay:.2f}秒后进行第{attempt}次重试：{e}")
+            await asyncio.sleep(delay)
+
+
+async def _read_sql(sql, params, attribution, connection_name):
+    """在 connection_name 对应的库中执行查询，副本出错时标记副本不可用并改用主库执行，与 run_read 一致"""
+    if connection_name == 'mysql':
+        return await _read_sql_with_retry(sql, params, attribution, connection_name)
+
+    try:
+        return await _read_sql_with_retry(sql, params, attribution, connection_name)
+    except OperationalError as e:
+        mark_replica_down(e)
+        return await _read_sql_with_retry(sql, params, attribution, 'mysql')
+
+
+async def read_sql_async(sql, params=None, tables=()) -> pd.DataFrame:
+    """异步执行查询，不阻塞调用方的事件循环
+
+    Args:
+        sql: 查询语句
+        params: 查询参数
+        tables: 查询读取的表，用于副本路由，见 db_engine.read_connection_name
+
+    Returns:
+        DataFrame: 查询结果
+    """
+    # 路由和往返次数归属需在发起查询的页面线程中确定
+    connection_name = read_connection_name(tables)
+    future = asyncio.run_coroutine_threadsafe(
+        _read_sql(sql, params, round_trip_attribution(), connection_name), _get_loop()
+    )
+    return await asyncio.wrap_future(future)
+
+
+async def fetch_query_async(spec):
+    """异步执行 QuerySpec 并返回后处理后的结果，spec.tables 不为空时使用共享缓存
+
+    Args:
+        spec: db_operations_v2 中的查询构建函数返回的 QuerySpec
+
+    Returns:
+        查询结果，见对应的查询构建函数
+    """
+    with span('db.fetch_query_async', tables=list(spec.tables)) as current:
+        cached = False
+        if spec.tables:
+            key = query_cache.make_key(spec.sql, spec.params)
+            snapshot = query_cache.snapshot(spec.tables)
+            result = query_cache.get(key, snapshot)
+            cached = result is not None
+            if result is None:
+                result = await read_sql_async(spec.sql, spec.params, spec.tables)
+                query_cache.set(key, snapshot, result)
+            result = result.copy()
+        else:
+            result = await read_sql_async(spec.sql, spec.params, spec.tables)
+
+        if current is not None:
+            current.attributes.update(rows=len(result), cached=cached)
+        return spec.transform(result) if spec.transform else result
@@ -0,0 +1,414 @@
+"""
+Description: 数据库连接池管理
+
+    统一创建带连接池配置的数据库连接，提供瞬时错误的退避重试、
+    事务执行、只读副本路由以及连接池统计信息。
+
+    配置了只读副本时，只读查询通过 get_read_connection() 发往副本，写入始终使用主库。
+    以下情况读取改回主库：当前会话刚写入过数据、本进程刚写入过查询涉及的表、
+    副本复制延迟过大或无法连接。
+
+    连接地址为 SQLite 文件时使用本地数据库，见 sqlite_backend.py。
+
+-*- Encoding: UTF-8 -*-
+@File     ：db_engine.py
+@Author   ：King Songtao
+@Time     ：2025/2/21 下午3:12
+@Contact  ：king.songtao@gmail.com
+"""
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError, TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from configs.settings import *
+from utils import sqlite_backend
+from utils.db_metrics import track_round_trips
+from utils.query_cache import query_cache
+from utils.sql_dialect import begin_write
+
+# 设置该环境变量后，主库使用其中的连接地址代替 secrets 中的配置，供基准测试等命令行脚本使用
+DATABASE_URL_ENV = 'ATM_DATABASE_URL'
+
+# 视为瞬时错误的 MySQL 错误码：锁等待超时、死锁、服务器断开、查询中连接丢失
+TRANSIENT_MYSQL_ERRORS = {1205, 1213, 2006, 2013}
+
+# 获取连接的等待时间统计
+_pool_wait_stats = {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0}
+_pool_wait_lock = threading.Lock()
+
+# 只读副本状态：checked_until 之前无需再检查复制延迟，down_until 之前不使用副本
+_replica_state = {'checked_until': 0.0, 'down_until': 0.0}
+_replica_lock = threading.Lock()
+
+
+class TimedQueuePool(QueuePool):
+    """记录每次获取连接等待时间的连接池"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with _pool_wait_lock:
+                _pool_wait_stats['count'] += 1
+                _pool_wait_stats['total'] += waited
+                _pool_wait_stats['max'] = max(_pool_wait_stats['max'], waited)
+                if timed_out:
+                    _pool_wait_stats['timeouts'] += 1
+
+
+def connection_url(connection_name='mysql') -> URL:
+    """由 secrets 中的连接配置生成连接地址
+
+    Args:
+        connection_name: secrets 中的连接名称
+
+    Returns:
+        URL: 连接地址
+    """
+    if connection_name == 'mysql' and os.environ.get(DATABASE_URL_ENV):
+        return make_url(os.environ[DATABASE_URL_ENV])
+
+    secrets = st.secrets['connections'][connection_name]
+    if 'url' in secrets:
+        return make_url(secrets['url'])
+    return URL.create(
+        drivername=secrets['dialect'] + (f"+{secrets['driver']}" if 'driver' in secrets else ''),
+        username=secrets.get('username'),
+        password=secrets.get('password'),
+        host=secrets.get('host'),
+        port=int(secrets['port']) if 'port' in secrets else None,
+        database=secrets.get('database'),
+        query=secrets.get('query', {})
+    )
+
+
+def backend_name(connection_name='mysql') -> str:
+    """连接使用的数据库类型，与 SQLAlchemy 的方言名称一致，如 'mysql'、'sqlite'"""
+    return connection_url(connection_name).get_backend_name()
+
+
+def get_connection(connection_name='mysql'):
+    """获取带连接池配置的数据库连接
+
+    连接由 st.connection 按参数缓存，整个进程共享同一个连接池。
+
+    Args:
+        connection_name: secrets 中的连接名称，默认为主库
+
+    Returns:
+        SQLConnection: 数据库连接，创建失败时抛出异常
+    """
+    config = BaseConfig()
+    timeouts = config.DATABASE_TIMEOUT_SETTING
+    is_sqlite = backend_name(connection_name) == 'sqlite'
+
+    if is_sqlite:
+        connect_args = sqlite_backend.connect_args()
+    else:
+        connect_args = {
+            'connect_timeout': timeouts['connect_timeout'],
+            'read_timeout': timeouts['read_timeout'],
+            'write_timeout': timeouts['write_timeout'],
+            'init_command': f"SET SESSION max_execution_time = {int(timeouts['max_execution_time'])}"
+        }
+
+    # 通过环境变量指定的连接地址优先于 secrets 中的配置
+    url = {'url': os.environ[DATABASE_URL_ENV]} if connection_name == 'mysql' and os.environ.get(DATABASE_URL_ENV) else {}
+
+    conn = st.connection(
+        connection_name,
+        type='sql',
+        poolclass=TimedQueuePool,
+        connect_args=connect_args,
+        **url,
+        **config.DATABASE_POOL_SETTING
+    )
+    if is_sqlite:
+        sqlite_backend.prepare_engine(conn.engine)
+    track_round_trips(conn.engine)
+    return conn
+
+
+def replica_configured() -> bool:
+    """secrets 中是否配置了只读副本连接"""
+    name = BaseConfig().DATABASE_REPLICA_SETTING['connection']
+    try:
+        return name in st.secrets.get('connections', {})
+    except FileNotFoundError:
+        # 没有 secrets 文件（如通过环境变量指定连接地址运行命令行脚本）
+        return False
+
+
+def is_replica(conn) -> bool:
+    """判断连接是否为只读副本连接"""
+    return getattr(conn, '_connection_name', None) == BaseConfig().DATABASE_REPLICA_SETTING['connection']
+
+
+def _replica_lag(conn):
+    """查询副本的复制延迟（秒），未在复制或复制中断时返回 None"""
+    with conn.engine.connect() as connection:
+        if connection.dialect.name != 'mysql':
+            # 非 MySQL 副本没有复制状态，只检查能否连接
+            connection.exec_driver_sql("SELECT 1")
+            return 0
+
+        try:
+            status = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        except ProgrammingError:
+            # MySQL 8.0.22 之前的版本
+            status = connection.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+
+    if status is None:
+        return None
+    return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+
+def mark_replica_down(reason):
+    """在 retry_after 秒内停止使用副本"""
+    retry_after = BaseConfig().DATABASE_REPLICA_SETTING['retry_after']
+    with _replica_lock:
+        _replica_state['down_until'] = time.monotonic() + retry_after
+        _replica_state['checked_until'] = 0.0
+    logger.warning(f"只读副本不可用，{retry_after}秒内改用主库：{reason}")
+
+
+def _replica_available(conn) -> bool:
+    """副本可以连接且复制延迟不超过 max_lag 时返回 True，检查结果在 check_interval 秒内复用"""
+    setting = BaseConfig().DATABASE_REPLICA_SETTING
+    now = time.monotonic()
+    with _replica_lock:
+        if now < _replica_state['down_until']:
+            return False
+        if now < _replica_state['checked_until']:
+            return True
+
+    try:
+        lag = _replica_lag(conn)
+    except Exception as e:
+        mark_replica_down(e)
+        return False
+
+    if lag is None or lag > setting['max_lag']:
+        mark_replica_down(f"复制延迟为 {lag} 秒" if lag is not None else "复制未运行")
+        return False
+
+    with _replica_lock:
+        _replica_state['checked_until'] = now + setting['check_interval']
+    return True
+
+
+def mark_session_write():
+    """记录当前会话的写入时间，之后 max_lag 秒内该会话的读取使用主库"""
+    try:
+        st.session_state['db_last_write_at'] = time.monotonic()
+    except Exception:
+        # 不在 Streamlit 会话中运行（如命令行脚本）
+        pass
+
+
+def _session_recently_wrote() -> bool:
+    """当前会话是否在 max_lag 秒内写入过数据"""
+    try:
+        last_write_at = st.session_state.get('db_last_write_at')
+    except Exception:
+        return False
+    max_lag = BaseConfig().DATABASE_REPLICA_SETTING['max_lag']
+    return last_write_at is not None and time.monotonic() - last_write_at < max_lag
+
+
+def get_read_connection():
+    """获取只读查询使用的连接
+
+    配置了副本、副本可用且当前会话最近没有写入时返回副本连接，否则返回主库连接。
+
+    Returns:
+        SQLConnection: 数据库连接
+    """
+    if not replica_configured() or _session_recently_wrote():
+        return get_connection()
+
+    try:
+        replica = get_connection(BaseConfig().DATABASE_REPLICA_SETTING['connection'])
+    except Exception as e:
+        mark_replica_down(e)
+        return get_connection()
+
+    return replica if _replica_available(replica) else get_connection()
+
+
+def _written_recently(tables) -> bool:
+    """本进程是否在 max_lag 秒内写入过 tables 中的表，副本可能尚未同步这些写入"""
+    return query_cache.written_within(tables, BaseConfig().DATABASE_REPLICA_SETTING['max_lag'])
+
+
+def read_connection_name(tables=()) -> str:
+    """只读查询应使用的连接名称，路由规则与 get_read_connection 和 run_read 一致
+
+    供不通过同步连接执行的读取（如异步查询）使用，需在发起查询的页面线程中调用，以便读取会话的写入时间。
+
+    Args:
+        tables: 查询读取的表
+
+    Returns:
+        str: secrets 中的连接名称，副本或主库
+    """
+    conn = get_read_connection()
+    if is_replica(conn) and not _written_recently(tables):
+        return BaseConfig().DATABASE_REPLICA_SETTING['connection']
+    return 'mysql'
+
+
+def is_transient_error(error) -> bool:
+    """判断数据库错误是否为可重试的瞬时错误"""
+    if not isinstance(error, DBAPIError):
+        return False
+    orig = getattr(error, 'orig', None)
+    code = getattr(orig, 'errno', None)
+    if code is None and orig is not None and orig.args and isinstance(orig.args[0], int):
+        code = orig.args[0]
+    return code in TRANSIENT_MYSQL_ERRORS
+
+
+def retry_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间（秒）：指数退避并加入随机抖动，避免发生死锁的多个会话同时重试"""
+    backoff = BaseConfig().DATABASE_RETRY_SETTING['backoff']
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+def run_with_retry(operation, retryable=is_transient_error):
+    """执行数据库操作，遇到瞬时错误时按指数退避重试
+
+    Args:
+        operation: 无参数的数据库操作
+        retryable: 判断错误是否可以重试的函数
+
+    Returns:
+        operation 的返回值，重试次数用尽或错误不可重试时抛出最后一次的异常
+    """
+    attempts = max(1, BaseConfig().DATABASE_RETRY_SETTING['attempts'])
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except Exception as e:
+            if attempt == attempts or not retryable(e):
+                raise
+            delay = retry_delay(attempt)
+            logger.warning(f"数据库瞬时错误，{delay:.2f}秒后进行第{attempt}次重试：{e}")
+            time.sleep(delay)
+
+
+def run_read(conn, operation, tables=()):
+    """执行只读操作 operation(conn)，遇到瞬时错误时按指数退避重试
+
+    conn 为副本连接时：本进程在 max_lag 秒内写入过 tables 中的表则改用主库，
+    避免读到并缓存副本尚未同步的旧数据；副本连接出错时标记副本不可用并改用主库执行。
+
+    Args:
+        conn: 数据库连接
+        operation: 接收连接的只读操作
+        tables: 操作读取的表
+
+    Returns:
+        operation 的返回值
+    """
+    if is_replica(conn) and _written_recently(tables):
+        conn = get_connection()
+
+    if not is_replica(conn):
+        return run_with_retry(lambda: operation(conn))
+
+    try:
+        return run_with_retry(lambda: operation(conn))
+    except OperationalError as e:
+        mark_replica_down(e)
+        primary = get_connection()
+        return run_with_retry(lambda: operation(primary))
+
+
+def read_sql(conn, sql, params=None, tables=()) -> pd.DataFrame:
+    """从连接池取出连接执行查询，查询结束后立即归还连接
+
+    Args:
+        conn: 数据库连接
+        sql: 查询语句
+        params: 查询参数
+        tables: 查询读取的表，用于副本路由，见 run_read
+
+    Returns:
+        DataFrame: 查询结果
+    """
+    def query(conn):
+        with conn.engine.connect() as connection:
+            return pd.read_sql(text(sql), connection, params=params)
+
+    return run_read(conn, query, tables)
+
+
+def run_in_transaction(conn, work):
+    """在一个事务中执行 work(session) 并提交
+
+    死锁、锁等待超时或连接断开导致事务回滚时整体重试；
+    提交阶段出现的错误不重试，避免在提交结果未知时重复写入。
+
+    Args:
+        conn: 数据库连接
+        work: 接收 session 的函数，不需要自行提交
+
+    Returns:
+        work 的返回值
+    """
+    committing = False
+
+    def transaction():
+        nonlocal committing
+        committing = False
+        with conn.session as session:
+            begin_statement = begin_write(session.get_bind().dialect.name)
+            if begin_statement:
+                session.execute(text(begin_statement))
+            result = work(session)
+            committing = True
+            session.commit()
+            return result
+
+    result = run_with_retry(transaction, lambda e: not committing and is_transient_error(e))
+    mark_session_write()
+    return result
+
+
+def get_pool_stats() -> dict:
+    """获取连接池统计信息，用于根据并发会话数调整连接池大小
+
+    Returns:
+        dict: 连接池大小、已取出/空闲连接数、当前溢出连接数及获取连接的等待时间统计
+    """
+    pool = get_connection().engine.pool
+    with _pool_wait_lock:
+        wait_stats = dict(_pool_wait_stats)
+
+    return {
+        'pool_size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(0, pool.overflow()),
+        'max_overflow': BaseConfig().DATABASE_POOL_SETTING['max_overflow'],
+        'wait_count': wait_stats['count'],
+        'wait_avg': wait_stats['total'] / wait_stats['count'] if wait_stats['count'] else 0.0,
+        'wait_max': wait_stats['max'],
+        'wait_timeouts': wait_stats['timeouts']
+    }
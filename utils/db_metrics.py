@@ -0,0 +1,242 @@
+"""
+Description: 数据访问函数的耗时统计
+
+    用 instrumented 装饰数据访问函数后，每次调用记录耗时、返回的行数以及数据库往返次数，
+    在进程内按函数汇总 p50/p95/p99 耗时，并按页面汇总往返次数，用于找出拖慢 MySQL 的函数和页面。
+    单次调用超过 BaseConfig.DATABASE_METRICS_SETTING['slow_query_ms'] 时记录慢查询日志。
+
+    往返次数由 get_connection 和异步引擎上注册的 before_cursor_execute 事件计数，
+    每次向数据库发送语句计一次，嵌套调用时同时计入外层函数；直接使用驱动游标时需调用 record_round_trip。
+
+-*- Encoding: UTF-8 -*-
+@File     ：db_metrics.py
+@Author   ：King Songtao
+@Time     ：2025/2/24 上午9:40
+@Contact  ：king.songtao@gmail.com
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from configs.settings import *
+from utils.tracing import span
+
+# 当前线程中正在执行的被统计函数（由外到内），用于计入数据库往返次数
+_active_calls = contextvars.ContextVar('db_metrics_active_calls', default=())
+
+# 在其他线程中执行的查询（如后台事件循环中的异步查询）的往返次数归属：(进行中的调用, 页面)
+_attribution = contextvars.ContextVar('db_metrics_attribution', default=None)
+
+
+class _CallState:
+    """一次调用过程中累计的数据库往返次数"""
+    __slots__ = ('round_trips',)
+
+    def __init__(self):
+        self.round_trips = 0
+
+
+def count_rows(result) -> int:
+    """统计数据访问函数返回结果中的行数
+
+    支持 DataFrame、列表、(结果, ...) 元组以及包含它们的字典（如分页结果和 DataContext 的结果）。
+    """
+    if isinstance(result, tuple):
+        result = result[0] if result else None
+    if isinstance(result, (pd.DataFrame, list)):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(count_rows(value) for value in result.values())
+    return 0
+
+
+def current_page():
+    """当前 Streamlit 页面的脚本名，不在页面中运行（如命令行脚本、后台线程）时返回 None"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+    try:
+        page = ctx.pages_manager.get_pages().get(ctx.page_script_hash)
+    except Exception:
+        return None
+    return Path(page['script_path']).stem if page else None
+
+
+class QueryMetrics:
+    """按函数和页面汇总的数据访问统计（进程内共享，线程安全）"""
+
+    def __init__(self, sample_size: int):
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._functions = {}
+        self._pages = {}
+
+    def _page(self, page):
+        return self._pages.setdefault(page or '（非页面）', {'calls': 0, 'round_trips': 0, 'total_ms': 0.0})
+
+    def record(self, name: str, elapsed_ms: float, rows: int, round_trips: int, slow: bool, page=None):
+        """记录一次函数调用"""
+        with self._lock:
+            stats = self._functions.get(name)
+            if stats is None:
+                stats = self._functions[name] = {
+                    'calls': 0, 'rows': 0, 'round_trips': 0, 'slow_calls': 0, 'total_ms': 0.0,
+                    'max_ms': 0.0, 'samples': deque(maxlen=self.sample_size)
+                }
+            stats['calls'] += 1
+            stats['rows'] += rows
+            stats['round_trips'] += round_trips
+            stats['slow_calls'] += int(slow)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['samples'].append(elapsed_ms)
+
+            page_stats = self._page(page)
+            page_stats['calls'] += 1
+            page_stats['total_ms'] += elapsed_ms
+
+    def record_round_trip(self, page=None):
+        """记录页面的一次数据库往返，包括未被统计的函数发出的语句"""
+        with self._lock:
+            self._page(page)['round_trips'] += 1
+
+    def function_stats(self) -> pd.DataFrame:
+        """按函数汇总的统计，按总耗时降序排列
+
+        Returns:
+            DataFrame: 每个函数一行，包括调用次数、p50/p95/p99/最大耗时（毫秒）、
+                平均返回行数、平均往返次数和慢查询次数
+        """
+        with self._lock:
+            rows = []
+            for name, stats in self._functions.items():
+                samples = np.array(stats['samples'])
+                p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+                rows.append({
+                    'function': name,
+                    'calls': stats['calls'],
+                    'p50_ms': round(float(p50), 1),
+                    'p95_ms': round(float(p95), 1),
+                    'p99_ms': round(float(p99), 1),
+                    'max_ms': round(stats['max_ms'], 1),
+                    'total_ms': round(stats['total_ms'], 1),
+                    'avg_rows': round(stats['rows'] / stats['calls'], 1),
+                    'avg_round_trips': round(stats['round_trips'] / stats['calls'], 2),
+                    'slow_calls': stats['slow_calls']
+                })
+
+        columns = ['function', 'calls', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'total_ms',
+                   'avg_rows', 'avg_round_trips', 'slow_calls']
+        return pd.DataFrame(rows, columns=columns).sort_values('total_ms', ascending=False, ignore_index=True)
+
+    def page_stats(self) -> pd.DataFrame:
+        """按页面汇总的统计，按往返次数降序排列
+
+        Returns:
+            DataFrame: 每个页面一行，包括被统计函数的调用次数、总耗时（毫秒）和数据库往返次数
+        """
+        with self._lock:
+            rows = [{'page': page, **stats} for page, stats in self._pages.items()]
+        frame = pd.DataFrame(rows, columns=['page', 'calls', 'round_trips', 'total_ms'])
+        frame['total_ms'] = frame['total_ms'].round(1)
+        return frame.sort_values('round_trips', ascending=False, ignore_index=True)
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self._functions.clear()
+            self._pages.clear()
+
+
+query_metrics = QueryMetrics(BaseConfig().DATABASE_METRICS_SETTING['sample_size'])
+
+
+def instrumented(func):
+    """统计数据访问函数的耗时、返回行数和数据库往返次数
+
+    Args:
+        func: 被装饰的函数，统计名称为其 __qualname__
+    """
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        state = _CallState()
+        token = _active_calls.set(_active_calls.get() + (state,))
+        start = time.perf_counter()
+        result = None
+        try:
+            with span(f'db.{name}') as current:
+                result = func(*args, **kwargs)
+                if current is not None:
+                    current.attributes.update(rows=count_rows(result), round_trips=state.round_trips)
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _active_calls.reset(token)
+
+            rows = count_rows(result)
+            slow = elapsed_ms >= BaseConfig().DATABASE_METRICS_SETTING['slow_query_ms']
+            page = current_page()
+            query_metrics.record(name, elapsed_ms, rows, state.round_trips, slow, page)
+            if slow:
+                logger.warning(
+                    f"慢查询：{name} 耗时 {elapsed_ms:.0f} ms，返回 {rows} 行，"
+                    f"数据库往返 {state.round_trips} 次，页面：{page or '无'}"
+                )
+
+    return wrapper
+
+
+def round_trip_attribution():
+    """当前的往返次数归属，传给在其他线程中执行的查询
+
+    Returns:
+        tuple: (进行中的调用, 当前页面)
+    """
+    return _active_calls.get(), current_page()
+
+
+@contextmanager
+def attributed_to(attribution):
+    """在其他线程中执行查询时，往返次数计入发起方的调用和页面
+
+    Args:
+        attribution: 发起方 round_trip_attribution 的返回值
+    """
+    token = _attribution.set(attribution)
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def record_round_trip():
+    """记录一次数据库往返，计入进行中的被统计函数和当前页面"""
+    calls, page = _attribution.get() or round_trip_attribution()
+    for state in calls:
+        state.round_trips += 1
+    query_metrics.record_round_trip(page)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_round_trip()
+
+
+def track_round_trips(engine):
+    """在引擎上注册往返次数计数，同一个引擎只注册一次
+
+    Args:
+        engine: SQLAlchemy 引擎
+    """
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
@@ -9,23 +9,142 @@ Description:
 """
 import pandas as pd
 import streamlit as st
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from sqlalchemy import text
 from configs.settings import *
-from utils.amount_calculator import calculate_total_amount
+from utils.amount_calculator import order_amount_sql, total_amount_sql, invalidate_team_cache
+from utils.query_cache import query_cache
+from utils.db_engine import backend_name, get_connection, get_read_connection, read_sql, replica_configured, run_in_transaction
+from utils import sql_dialect
+from utils.data_context import DataContext, QuerySpec
+from utils.db_metrics import instrumented
 from utils.utils import remove_active_session
 
+# 批量更新工单时每行需要提供的字段
+BULK_UPDATE_FIELDS = [
+    'work_date', 'work_time', 'work_address', 'assigned_cleaner', 'source',
+    'remarks', 'income1', 'income2', 'subsidy', 'invoice_status'
+]
 
-def connect_db():
-    """连接数据库"""
+def connect_db(read_only=False):
+    """连接数据库，连接池配置见 BaseConfig.DATABASE_POOL_SETTING
+
+    Args:
+        read_only: 连接是否只用于只读查询，为 True 时可能返回只读副本连接，见 get_read_connection
+
+    Returns:
+        SQLConnection: 数据库连接，连接失败时抛出异常
+    """
     try:
-        conn = st.connection('mysql', type='sql')
-        return conn
+        return get_read_connection() if read_only else get_connection()
     except Exception as e:
         logger.error(f"数据库连接失败，错误信息：{e}")
-        return None
+        raise
+
+
+def _cached_query(conn, sql, tables, params=None):
+    """执行只读查询，结果在所有会话间共享，直到所依赖的表发生写入
+
+    Args:
+        conn: 数据库连接
+        sql: 查询语句
+        tables: 查询所依赖的表，任一表的写入版本变化都会使缓存失效
+        params: 查询参数
+
+    Returns:
+        DataFrame: 查询结果的副本，调用方可以直接修改
+    """
+    params = params or {}
+    key = query_cache.make_key(sql, params)
+
+    # 版本号需在查询前获取，查询期间发生的写入会使本次结果在下次读取时失效
+    snapshot = query_cache.snapshot(tables)
+    result = query_cache.get(key, snapshot)
+    if result is None:
+        result = read_sql(conn, sql, params, tables)
+        query_cache.set(key, snapshot, result)
+    return result.copy()
+
+
+def _fetch_query(spec):
+    """执行单条 QuerySpec 并返回后处理后的结果，spec.tables 不为空时使用共享缓存"""
+    conn = connect_db(read_only=True)
+    if spec.tables:
+        result = _cached_query(conn, spec.sql, spec.tables, spec.params)
+    else:
+        result = read_sql(conn, spec.sql, spec.params)
+    return spec.transform(result) if spec.transform else result
+
+
+def _apply_team_month_rollup(session, where_clause, params, sign):
+    """将满足条件的工单按保洁组和月份增量计入（sign=1）或移出（sign=-1）月度汇总表
 
+    需与工单的增删改在同一个事务中调用：修改前以 -1 移出旧值，修改后以 1 计入新值。
 
+    Args:
+        session: 数据库会话
+        where_clause: 筛选 work_orders 的条件
+        params: 条件中的参数
+        sign: 1 表示计入，-1 表示移出
+    """
+    dialect = session.get_bind().dialect.name
+    year, month = sql_dialect.year(dialect, 'work_date'), sql_dialect.month(dialect, 'work_date')
+    totals = ['income1', 'income2', 'subsidy', 'order_amount', 'total_amount', 'order_count']
+    on_conflict = sql_dialect.on_conflict_update(dialect, ['year', 'month', 'team_name'], {
+        column: f"team_month_rollup.{column} + {sql_dialect.inserted(dialect, column)}" for column in totals
+    })
+
+    session.execute(
+        text(f"""
+        INSERT INTO team_month_rollup (
+            year, month, team_name,
+            income1, income2, subsidy, order_amount, total_amount, order_count
+        )
+        SELECT 
+            {year}, {month}, assigned_cleaner,
+            {sign} * COALESCE(SUM(income1), 0),
+            {sign} * COALESCE(SUM(income2), 0),
+            {sign} * COALESCE(SUM(subsidy), 0),
+            {sign} * COALESCE(SUM(order_amount), 0),
+            {sign} * COALESCE(SUM(total_amount), 0),
+            {sign} * COUNT(*)
+        FROM work_orders
+        WHERE ({where_clause}) AND work_date IS NOT NULL
+        GROUP BY {year}, {month}, assigned_cleaner
+        {on_conflict}
+        """),
+        params
+    )
+
+    # 清理工单已全部移出的汇总行
+    session.execute(text("DELETE FROM team_month_rollup WHERE order_count <= 0"))
+
+
+@instrumented
+def rebuild_team_month_rollup():
+    """根据工单表全量重建保洁组月度汇总表
+
+    Returns:
+        tuple[bool, str]: (成功状态, 错误信息)
+    """
+    try:
+        conn = connect_db()
+
+        def transaction(session):
+            session.execute(text("DELETE FROM team_month_rollup"))
+            _apply_team_month_rollup(session, "1 = 1", {}, 1)
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('team_month_rollup')
+
+        logger.success("保洁组月度汇总表重建完成")
+        return True, None
+    except Exception as e:
+        logger.error(f"重建保洁组月度汇总表失败：{e}")
+        return False, str(e)
+
+
+@instrumented
 def create_work_order(
         order_date, created_by, source, work_address,
         income1=0, income2=0,
@@ -37,14 +156,10 @@ def create_work_order(
     try:
         conn = connect_db()
 
-        # 使用工具函数计算金额
-        order_amount, total_amount = calculate_total_amount(
-            income1, income2, assigned_cleaner, conn
-        )
-
-        with conn.session as session:
-            session.execute(
-                text("""
+        def transaction(session):
+            # 金额在插入时由数据库根据收入和保洁组ABN状态计算
+            result = session.execute(
+                text(f"""
                 INSERT INTO work_orders (
                     order_date, work_date, work_time, created_by, source,
                     work_address, assigned_cleaner, order_amount, total_amount, 
@@ -52,7 +167,9 @@ def create_work_order(
                 )
                 VALUES (
                     :order_date, :work_date, :work_time, :created_by, :source,
-                    :work_address, :assigned_cleaner, :order_amount, :total_amount,
+                    :work_address, :assigned_cleaner,
+                    {order_amount_sql(':income1', ':income2')},
+                    {total_amount_sql(':income1', ':income2', ':assigned_cleaner')},
                     :subsidy, :remarks, :income1, :income2, :invoice_status
                 )
                 """),
@@ -64,8 +181,6 @@ def create_work_order(
                     'source': source,
                     'work_address': work_address,
                     'assigned_cleaner': assigned_cleaner,
-                    'order_amount': order_amount,
-                    'total_amount': total_amount,
                     'subsidy': subsidy,
                     'remarks': remarks,
                     'income1': income1,
@@ -73,7 +188,10 @@ def create_work_order(
                     'invoice_status': invoice_status
                 }
             )
-            session.commit()
+            _apply_team_month_rollup(session, "id = :order_id", {'order_id': result.lastrowid}, 1)
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('work_orders', 'team_month_rollup')
 
         return True, None
     except Exception as e:
@@ -81,30 +199,59 @@ def create_work_order(
         return False, str(e)
 
 
+def get_time_range_bounds(time_range='week', today=None):
+    """计算时间范围对应的半开日期区间 [start_date, end_date)
+
+    直接以区间比较 work_date，避免在列上套用 YEARWEEK/YEAR/MONTH 等函数导致索引失效。
+
+    Args:
+        time_range: 时间范围，可选 day/week/month/quarter/year
+        today: 基准日期，默认为当天
+
+    Returns:
+        tuple: (起始日期(含), 结束日期(不含))
+    """
+    today = today or date.today()
+
+    if time_range == 'day':
+        start_date = today
+        end_date = today + timedelta(days=1)
+    elif time_range == 'month':
+        start_date = today.replace(day=1)
+        end_date = (start_date + timedelta(days=32)).replace(day=1)
+    elif time_range == 'quarter':
+        start_date = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+        end_month = start_date.month + 3
+        end_date = start_date.replace(year=start_date.year + (end_month > 12), month=(end_month - 1) % 12 + 1)
+    elif time_range == 'year':
+        start_date = today.replace(month=1, day=1)
+        end_date = start_date.replace(year=start_date.year + 1)
+    else:
+        # 与 MySQL YEARWEEK 默认模式一致，每周从周日开始
+        start_date = today - timedelta(days=(today.weekday() + 1) % 7)
+        end_date = start_date + timedelta(days=7)
+
+    return start_date, end_date
+
+
+@instrumented
 def get_work_orders(time_range='week'):
     """获取工单列表"""
     try:
-        conn = connect_db()
+        conn = connect_db(read_only=True)
 
-        # 根据时间范围构建查询条件
-        time_filters = {
-            'day': 'DATE(work_date) = CURDATE() OR work_date IS NULL',
-            'week': 'YEARWEEK(work_date) = YEARWEEK(CURDATE()) OR work_date IS NULL',
-            'month': '(YEAR(work_date) = YEAR(CURDATE()) AND MONTH(work_date) = MONTH(CURDATE())) OR work_date IS NULL',
-            'quarter': '(YEAR(work_date) = YEAR(CURDATE()) AND QUARTER(work_date) = QUARTER(CURDATE())) OR work_date IS NULL',
-            'year': 'YEAR(work_date) = YEAR(CURDATE()) OR work_date IS NULL'
-        }
+        # 根据时间范围计算日期区间，work_date 上的索引可同时服务区间和 IS NULL 条件
+        start_date, end_date = get_time_range_bounds(time_range)
 
-        time_filter = time_filters.get(time_range, time_filters['week'])
-
-        query = f"""
+        query = """
             SELECT 
                 id, order_date, work_date, work_time, created_by,
                 source, work_address, assigned_cleaner, 
                 income1, income2, order_amount, total_amount,
                 subsidy, remarks, invoice_status
             FROM work_orders 
-            WHERE {time_filter}
+            WHERE (work_date >= :start_date AND work_date < :end_date)
+               OR work_date IS NULL
             ORDER BY 
                 order_date DESC,
                 CASE WHEN work_date IS NULL THEN 1 ELSE 0 END,
@@ -113,17 +260,443 @@ def get_work_orders(time_range='week'):
                 work_time ASC
         """
 
-        result = conn.query(query, ttl=0)
+        result = _cached_query(
+            conn, query, ('work_orders',),
+            params={'start_date': start_date, 'end_date': end_date}
+        )
         return result, None
     except Exception as e:
         logger.error(f"获取工单列表失败：{e}")
         return None, str(e)
 
 
+def _build_work_order_filters(time_range, cleaners=None, creators=None, page_order=False):
+    """构建工单列表的 WHERE 条件和参数
+
+    Args:
+        time_range: 时间范围
+        cleaners: 保洁组筛选列表
+        creators: 创建人筛选列表
+        page_order: 为 True 时未排期条件改用 work_date_is_null 列，数据库不再合并 work_date 索引的
+            两段范围后排序，而是按 work_orders_page_order_index 的顺序读取，用于分页查询
+
+    Returns:
+        tuple: (WHERE 条件, 查询参数)
+    """
+    start_date, end_date = get_time_range_bounds(time_range)
+    unscheduled = "work_date_is_null = 1" if page_order else "work_date IS NULL"
+    conditions = [f"((work_date >= :start_date AND work_date < :end_date) OR {unscheduled})"]
+    params = {'start_date': start_date, 'end_date': end_date}
+
+    for column, values, prefix in [
+        ('assigned_cleaner', cleaners, 'cleaner'),
+        ('created_by', creators, 'creator')
+    ]:
+        if values:
+            placeholders = []
+            for i, value in enumerate(values):
+                params[f'{prefix}_{i}'] = value
+                placeholders.append(f":{prefix}_{i}")
+            conditions.append(f"{column} IN ({', '.join(placeholders)})")
+
+    return " AND ".join(conditions), params
+
+
+def _to_page_cursor(row):
+    """从工单行提取分页游标（即排序键的取值）"""
+    return {
+        'order_date': row['order_date'],
+        'work_date': None if pd.isna(row['work_date']) else row['work_date'],
+        'work_time': None if pd.isna(row['work_time']) or row['work_time'] == '' else row['work_time'],
+        'id': int(row['id'])
+    }
+
+
+def _build_seek_condition(cursor, backward, params):
+    """构建 keyset 分页的定位条件
+
+    按 get_work_orders 的排序键（再以 id 兜底保证唯一）展开为
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... 的形式，排序方向决定比较符号。
+    展开式之外再单独限定 order_date 的范围，使数据库可以直接在排序索引中定位到游标处。
+
+    Args:
+        cursor: 游标，即边界行的排序键取值
+        backward: 是否向前翻页
+        params: 查询参数，会写入游标取值
+
+    Returns:
+        str: 定位条件
+    """
+    work_date_null = 1 if cursor['work_date'] is None else 0
+    work_time_null = 1 if cursor['work_time'] is None else 0
+
+    # (排序列, 是否升序, 游标取值)，取值为空的列已由对应的 IS NULL 标记确定，无需再比较
+    sort_keys = [
+        ('order_date', False, cursor['order_date']),
+        ('work_date_is_null', True, work_date_null),
+    ]
+    if not work_date_null:
+        sort_keys.append(('work_date', True, cursor['work_date']))
+    sort_keys.append(('work_time_is_null', True, work_time_null))
+    if not work_time_null:
+        sort_keys.append(('work_time', True, cursor['work_time']))
+    sort_keys.append(('id', True, cursor['id']))
+
+    branches = []
+    for i, (expression, ascending, value) in enumerate(sort_keys):
+        params[f'seek_{i}'] = value
+        operator = '>' if ascending != backward else '<'
+        equals = [f"{prev_expression} = :seek_{j}" for j, (prev_expression, _, _) in enumerate(sort_keys[:i])]
+        branches.append("(" + " AND ".join(equals + [f"{expression} {operator} :seek_{i}"]) + ")")
+
+    # 所有分支都不越过游标所在的 order_date，由该条件在索引中定位
+    bound = "<=" if not backward else ">="
+    return f"order_date {bound} :seek_0 AND (" + " OR ".join(branches) + ")"
+
+
+def work_orders_page_query(time_range='week', cursor=None, page_size=None, backward=False, cleaners=None, creators=None):
+    """构建分页获取工单列表（keyset 分页）的查询
+
+    沿用 get_work_orders 的排序键，通过上一页的边界行定位，翻页代价与页码无关。
+    空值排在最后由生成列 work_date_is_null / work_time_is_null 表示，排序键与
+    work_orders_page_order_index 索引一致，数据库按索引顺序读取到一页即停止，无需对整个时间范围排序。
+
+    Args:
+        time_range: 时间范围
+        cursor: 分页游标，为 None 时返回第一页
+        page_size: 每页条数，默认使用 BaseConfig.WORK_ORDER_PAGE_SIZE
+        backward: 为 True 时返回游标之前的一页
+        cleaners: 保洁组筛选列表
+        creators: 创建人筛选列表
+
+    Returns:
+        QuerySpec: 结果为 {'orders': DataFrame, 'next_cursor': 下一页游标, 'prev_cursor': 上一页游标}
+    """
+    page_size = page_size or BaseConfig().WORK_ORDER_PAGE_SIZE
+
+    where_clause, params = _build_work_order_filters(time_range, cleaners, creators, page_order=True)
+    if cursor is not None:
+        where_clause += " AND " + _build_seek_condition(cursor, backward, params)
+
+    direction, reverse = ('DESC', 'ASC') if backward else ('ASC', 'DESC')
+    params['limit'] = page_size + 1
+
+    query = f"""
+        SELECT 
+            id, order_date, work_date, work_time, created_by,
+            source, work_address, assigned_cleaner, 
+            income1, income2, order_amount, total_amount,
+            subsidy, remarks, invoice_status
+        FROM work_orders 
+        WHERE {where_clause}
+        ORDER BY 
+            order_date {reverse},
+            work_date_is_null {direction},
+            work_date {direction},
+            work_time_is_null {direction},
+            work_time {direction},
+            id {direction}
+        LIMIT :limit
+    """
+
+    def to_page(result):
+        # 多取一行用于判断该方向上是否还有数据
+        has_more = len(result) > page_size
+        result = result.iloc[:page_size]
+        if backward:
+            result = result.iloc[::-1]
+        result = result.reset_index(drop=True)
+
+        has_next = has_more if not backward else cursor is not None
+        has_prev = has_more if backward else cursor is not None
+
+        return {
+            'orders': result,
+            'next_cursor': _to_page_cursor(result.iloc[-1]) if has_next and not result.empty else None,
+            'prev_cursor': _to_page_cursor(result.iloc[0]) if has_prev and not result.empty else None
+        }
+
+    return QuerySpec(query, params, ('work_orders',), to_page)
+
+
+@instrumented
+def get_work_orders_page(time_range='week', cursor=None, page_size=None, backward=False, cleaners=None, creators=None):
+    """分页获取工单列表（keyset 分页），参数见 work_orders_page_query
+
+    Returns:
+        tuple: ({'orders': DataFrame, 'next_cursor': 下一页游标, 'prev_cursor': 上一页游标}, 错误信息)
+    """
+    try:
+        spec = work_orders_page_query(time_range, cursor, page_size, backward, cleaners, creators)
+        return _fetch_query(spec), None
+    except Exception as e:
+        logger.error(f"分页获取工单列表失败：{e}")
+        return None, str(e)
+
+
+def _page_sort_key(row):
+    """工单行在 get_work_orders_page 排序中的位置，与 SQL 的排序规则一致"""
+    cursor = _to_page_cursor(row)
+    work_date, work_time = cursor['work_date'], cursor['work_time']
+    return (
+        -pd.Timestamp(cursor['order_date']).toordinal(),
+        work_date is None,
+        pd.Timestamp(work_date).toordinal() if work_date is not None else 0,
+        work_time is None,
+        work_time or '',
+        cursor['id']
+    )
+
+
+def work_order_changes_queries(since=None, time_range='week', cleaners=None, creators=None):
+    """构建获取水位线之后变更和删除工单的查询，结果由 build_work_order_changes 组装
+
+    变更通过 updated_at 判断，删除通过 work_order_tombstones 表判断。
+    为避免遗漏提交较晚的事务，实际查询会从水位线往前多取
+    BaseConfig.WORK_ORDER_REFRESH_OVERLAP 秒，重复取到的行按 id 覆盖即可。
+    配置了只读副本时水位线可能取自副本，再多取允许的最大复制延迟，避免遗漏尚未同步的写入。
+    水位线早于删除记录保留期时不再查询变更，需全量重新加载。
+
+    Args:
+        since: 上次刷新返回的水位线，为 None 时只查询当前水位线
+        time_range: 时间范围
+        cleaners: 保洁组筛选列表
+        creators: 创建人筛选列表
+
+    Returns:
+        dict: {'watermark': QuerySpec, 'updated': QuerySpec, 'deleted': QuerySpec}
+    """
+    dialect = backend_name()
+    queries = {'watermark': QuerySpec(f"SELECT {sql_dialect.now(dialect)} AS watermark")}
+    if since is None:
+        return queries
+
+    config = BaseConfig()
+    overlap = config.WORK_ORDER_REFRESH_OVERLAP
+    if replica_configured():
+        overlap += config.DATABASE_REPLICA_SETTING['max_lag']
+    window = {
+        'since': since - timedelta(seconds=overlap),
+        'watermark': since,
+        'retention_days': config.WORK_ORDER_TOMBSTONE_RETENTION_DAYS
+    }
+    in_retention = f":watermark >= {sql_dialect.days_ago(dialect, ':retention_days')}"
+
+    where_clause, params = _build_work_order_filters(time_range, cleaners, creators)
+    params.update(window)
+    queries['updated'] = QuerySpec(f"""
+        SELECT 
+            id, order_date, work_date, work_time, created_by,
+            source, work_address, assigned_cleaner, 
+            income1, income2, order_amount, total_amount,
+            subsidy, remarks, invoice_status, updated_at,
+            CASE WHEN {where_clause} THEN 1 ELSE 0 END AS in_filter
+        FROM work_orders 
+        WHERE updated_at >= :since AND {in_retention}
+    """, params)
+    queries['deleted'] = QuerySpec(f"""
+        SELECT order_id, deleted_at FROM work_order_tombstones 
+        WHERE deleted_at >= :since AND {in_retention}
+    """, dict(window))
+    return queries
+
+
+def build_work_order_changes(since, results):
+    """组装 work_order_changes_queries 的查询结果
+
+    Args:
+        since: 上次刷新返回的水位线
+        results: 与 work_order_changes_queries 同名的查询结果
+
+    Returns:
+        dict: {'updated': 变更的工单DataFrame（in_filter 列表示是否仍满足筛选条件）,
+               'deleted_ids': 已删除的工单ID列表,
+               'watermark': 新的水位线,
+               'complete': 水位线是否仍在删除记录保留期内，为 False 时需全量重新加载}
+    """
+    watermark = pd.Timestamp(results['watermark'].iloc[0]['watermark']).to_pydatetime()
+    changes = {'updated': pd.DataFrame(), 'deleted_ids': [], 'watermark': watermark, 'complete': True}
+    if since is None:
+        return changes
+
+    if since < watermark - timedelta(days=BaseConfig().WORK_ORDER_TOMBSTONE_RETENTION_DAYS):
+        changes['complete'] = False
+        return changes
+
+    updated, deleted = results['updated'], results['deleted']
+    changes['updated'] = updated
+    changes['deleted_ids'] = [int(order_id) for order_id in deleted['order_id']]
+
+    # 重叠区间内的变更之前已经取到过，只有水位线之后出现的写入（可能来自其他进程）才使共享的查询缓存失效
+    if (pd.to_datetime(updated['updated_at']) >= since).any() or (pd.to_datetime(deleted['deleted_at']) >= since).any():
+        query_cache.bump('work_orders', 'team_month_rollup')
+
+    return changes
+
+
+@instrumented
+def get_work_order_changes(since=None, time_range='week', cleaners=None, creators=None):
+    """获取水位线之后变更和删除的工单，用于增量刷新已加载的工单页，参数见 work_order_changes_queries
+
+    Returns:
+        tuple: (build_work_order_changes 返回的增量变更, 错误信息)
+    """
+    try:
+        data = DataContext(connect_db(read_only=True))
+        for name, spec in work_order_changes_queries(since, time_range, cleaners, creators).items():
+            data.add(name, spec)
+
+        results, error = data.fetch()
+        if error:
+            logger.error(f"获取工单增量变更失败：{error}")
+            return None, error
+        return build_work_order_changes(since, results), None
+    except Exception as e:
+        logger.error(f"获取工单增量变更失败：{e}")
+        return None, str(e)
+
+
+def apply_work_order_changes(page, changes):
+    """将增量变更合并到已加载的工单页
+
+    删除或不再满足筛选条件的工单从页中移除；仍满足条件且排序位置落在本页范围内的
+    工单（包括新出现的工单）按 id 覆盖后重新排序，其余变更属于其他页，忽略即可。
+
+    Args:
+        page: get_work_orders_page 返回的工单页
+        changes: get_work_order_changes 返回的增量变更
+
+    Returns:
+        dict: 合并后的工单页；页中已无工单时返回 None，需重新加载
+    """
+    updated = changes['updated']
+    if updated.empty and not changes['deleted_ids']:
+        return page
+
+    orders = page['orders']
+    if orders.empty:
+        return None
+
+    # 本页在排序中覆盖的范围，第一页/最后一页在对应方向上没有边界
+    lower = _page_sort_key(orders.iloc[0]) if page['prev_cursor'] is not None else None
+    upper = _page_sort_key(orders.iloc[-1]) if page['next_cursor'] is not None else None
+
+    removed_ids = set(changes['deleted_ids']) | set(int(order_id) for order_id in updated.get('id', []))
+    rows = [row for _, row in orders.iterrows() if int(row['id']) not in removed_ids]
+    for _, row in updated.iterrows():
+        key = _page_sort_key(row)
+        if row['in_filter'] == 1 and (lower is None or key >= lower) and (upper is None or key <= upper):
+            rows.append(row[orders.columns])
+
+    if not rows:
+        return None
+
+    rows.sort(key=_page_sort_key)
+    orders = pd.DataFrame(rows, columns=orders.columns).reset_index(drop=True)
+
+    return {
+        'orders': orders,
+        'next_cursor': _to_page_cursor(orders.iloc[-1]) if page['next_cursor'] is not None else None,
+        'prev_cursor': _to_page_cursor(orders.iloc[0]) if page['prev_cursor'] is not None else None
+    }
+
+
+def work_order_totals_query(time_range='week', cleaners=None, creators=None):
+    """构建在数据库中汇总时间范围内工单金额和数量的查询
+
+    Args:
+        time_range: 时间范围
+        cleaners: 保洁组筛选列表
+        creators: 创建人筛选列表
+
+    Returns:
+        QuerySpec: 结果为汇总字典，包含 income1、income2、subsidy、
+            order_amount、total_amount 合计及 order_count 工单数
+    """
+    where_clause, params = _build_work_order_filters(time_range, cleaners, creators)
+
+    def to_totals(result):
+        totals = {key: float(value) for key, value in result.iloc[0].items()}
+        totals['order_count'] = int(totals['order_count'])
+        return totals
+
+    return QuerySpec(f"""
+        SELECT 
+            COALESCE(SUM(income1), 0) AS income1,
+            COALESCE(SUM(income2), 0) AS income2,
+            COALESCE(SUM(subsidy), 0) AS subsidy,
+            COALESCE(SUM(order_amount), 0) AS order_amount,
+            COALESCE(SUM(total_amount), 0) AS total_amount,
+            COUNT(*) AS order_count
+        FROM work_orders 
+        WHERE {where_clause}
+    """, params, ('work_orders',), to_totals)
+
+
+@instrumented
+def get_work_order_totals(time_range='week', cleaners=None, creators=None):
+    """在数据库中汇总时间范围内的工单金额和数量，参数见 work_order_totals_query
+
+    Returns:
+        tuple: (汇总字典, 错误信息)
+    """
+    try:
+        return _fetch_query(work_order_totals_query(time_range, cleaners, creators)), None
+    except Exception as e:
+        logger.error(f"汇总工单统计失败：{e}")
+        return None, str(e)
+
+
+def work_order_filter_options_query(time_range='week'):
+    """构建获取时间范围内可供筛选的保洁组和创建人的查询
+
+    Args:
+        time_range: 时间范围
+
+    Returns:
+        QuerySpec: 结果为 {'cleaners': 保洁组列表, 'creators': 创建人列表}
+    """
+    where_clause, params = _build_work_order_filters(time_range)
+
+    def to_options(result):
+        result = result.dropna()
+        return {
+            'cleaners': sorted(result.loc[result['kind'] == 'cleaner', 'value'].tolist()),
+            'creators': sorted(result.loc[result['kind'] == 'creator', 'value'].tolist())
+        }
+
+    return QuerySpec(f"""
+        SELECT 'cleaner' AS kind, assigned_cleaner AS value
+        FROM work_orders 
+        WHERE {where_clause} AND assigned_cleaner != '暂未派单'
+        GROUP BY assigned_cleaner
+        UNION ALL
+        SELECT 'creator' AS kind, created_by AS value
+        FROM work_orders 
+        WHERE {where_clause}
+        GROUP BY created_by
+    """, params, ('work_orders',), to_options)
+
+
+@instrumented
+def get_work_order_filter_options(time_range='week'):
+    """获取时间范围内可供筛选的保洁组和创建人
+
+    Returns:
+        tuple: ({'cleaners': 保洁组列表, 'creators': 创建人列表}, 错误信息)
+    """
+    try:
+        return _fetch_query(work_order_filter_options_query(time_range)), None
+    except Exception as e:
+        logger.error(f"获取工单筛选选项失败：{e}")
+        return {'cleaners': [], 'creators': []}, str(e)
+
+
+@instrumented
 def get_work_orders_by_date_range(start_date, end_date):
     """根据日期范围获取工单列表"""
     try:
-        conn = connect_db()
+        conn = connect_db(read_only=True)
 
         query = """
             SELECT 
@@ -142,10 +715,9 @@ def get_work_orders_by_date_range(start_date, end_date):
                 work_time ASC
         """
 
-        result = conn.query(
-            query,
-            params={'start_date': start_date, 'end_date': end_date},
-            ttl=0
+        result = _cached_query(
+            conn, query, ('work_orders',),
+            params={'start_date': start_date, 'end_date': end_date}
         )
         return result, None
     except Exception as e:
@@ -153,6 +725,7 @@ def get_work_orders_by_date_range(start_date, end_date):
         return None, str(e)
 
 
+@instrumented
 def update_work_order(data):
     """更新工单信息"""
     if 'assigned_cleaner' in data and not data['assigned_cleaner']:
@@ -165,34 +738,20 @@ def update_work_order(data):
         update_fields = []
         params = {'order_id': data['id']}
 
-        # 防止更新total_amount
-        if 'total_amount' in data:
-            del data['total_amount']
+        # 防止直接更新金额，金额统一由数据库根据收入和保洁组ABN状态计算
+        for key in ['order_amount', 'total_amount']:
+            if key in data:
+                del data[key]
 
-        # 如果更新了income1、income2或assigned_cleaner，需要重新计算金额
+        # 如果更新了income1、income2或assigned_cleaner，在同一条语句中重新计算金额
+        # 未更新的字段直接引用列的当前值，无需预先查询
         if 'income1' in data or 'income2' in data or 'assigned_cleaner' in data:
-            # 获取当前的值
-            current = conn.query(
-                """
-                SELECT income1, income2, assigned_cleaner 
-                FROM work_orders 
-                WHERE id = :id
-                """,
-                params={'id': data['id']},
-                ttl=0
-            ).iloc[0]
-
-            income1 = float(data.get('income1', current['income1']) or 0)
-            income2 = float(data.get('income2', current['income2']) or 0)
-            assigned_cleaner = data.get('assigned_cleaner', current['assigned_cleaner'])
-
-            # 计算新的金额
-            order_amount, total_amount = calculate_total_amount(
-                income1, income2, assigned_cleaner, conn
-            )
-
-            data['order_amount'] = order_amount
-            data['total_amount'] = total_amount
+            income1, income2, assigned_cleaner = [
+                f":{key}" if key in data else f"work_orders.{key}"
+                for key in ['income1', 'income2', 'assigned_cleaner']
+            ]
+            update_fields.append(f"order_amount = {order_amount_sql(income1, income2)}")
+            update_fields.append(f"total_amount = {total_amount_sql(income1, income2, assigned_cleaner)}")
 
         for key, value in data.items():
             if key not in ['id', '总金额']:  # 排除id字段
@@ -215,11 +774,17 @@ def update_work_order(data):
             WHERE id = :order_id
         """)
 
-        with conn.session as session:
+        def transaction(session):
+            rollup_params = {'order_id': data['id']}
+            _apply_team_month_rollup(session, "id = :order_id", rollup_params, -1)
             result = session.execute(query, params)
-            session.commit()
+            _apply_team_month_rollup(session, "id = :order_id", rollup_params, 1)
+            return result.rowcount
 
-        success = result.rowcount > 0
+        rowcount = run_in_transaction(conn, transaction)
+        query_cache.bump('work_orders', 'team_month_rollup')
+
+        success = rowcount > 0
         error = None if success else "未找到要更新的工单"
 
         return success, error
@@ -229,6 +794,83 @@ def update_work_order(data):
         return False, str(e)
 
 
+@instrumented
+def update_work_orders_bulk(changes):
+    """批量更新工单信息，所有修改在同一个事务中提交
+
+    所有工单由一条 UPDATE 语句更新：每个字段的新值用 CASE work_orders.id 按工单选取，只需一次数据库往返。
+
+    Args:
+        changes: 修改后的工单列表，每项需包含 id 及 BULK_UPDATE_FIELDS 中的全部字段
+
+    Returns:
+        tuple[bool, str]: (成功状态, 错误信息)
+    """
+    if not changes:
+        return True, None
+
+    try:
+        conn = connect_db()
+
+        rows = []
+        for change in changes:
+            missing_fields = [field for field in BULK_UPDATE_FIELDS if field not in change]
+            if missing_fields:
+                raise ValueError(f"工单 {change.get('id')} 缺少字段：{', '.join(missing_fields)}")
+
+            row = {field: change[field] for field in BULK_UPDATE_FIELDS}
+            row['id'] = int(change['id'])
+            row['assigned_cleaner'] = row['assigned_cleaner'] or '暂未派单'
+            row['work_date'] = row['work_date'] or None
+            row['work_time'] = row['work_time'] or None
+            rows.append(row)
+
+        order_ids = {f'order_{i}': row['id'] for i, row in enumerate(rows)}
+        rollup_condition = f"id IN ({', '.join(':' + key for key in order_ids)})"
+
+        # 每个字段的新值：CASE work_orders.id WHEN :order_0 THEN :work_date_0 ... END
+        # id 需带表名，金额表达式中查询 clean_teams 的子查询会把不带表名的 id 解析为 clean_teams.id
+        params = dict(order_ids)
+        values = {}
+        for field in BULK_UPDATE_FIELDS:
+            branches = []
+            for i, row in enumerate(rows):
+                params[f'{field}_{i}'] = row[field]
+                branches.append(f"WHEN :order_{i} THEN :{field}_{i}")
+            values[field] = f"CASE work_orders.id {' '.join(branches)} END"
+
+        assignments = [f"{field} = {values[field]}" for field in BULK_UPDATE_FIELDS]
+        # 金额在同一条语句中由数据库根据收入和保洁组ABN状态计算，使用新值而不是列的旧值
+        assignments.append(f"order_amount = {order_amount_sql(values['income1'], values['income2'])}")
+        assignments.append(
+            f"total_amount = {total_amount_sql(values['income1'], values['income2'], values['assigned_cleaner'])}"
+        )
+        set_clause = ",\n                    ".join(assignments)
+
+        def transaction(session):
+            _apply_team_month_rollup(session, rollup_condition, order_ids, -1)
+            session.execute(
+                text(f"""
+                UPDATE work_orders 
+                SET {set_clause}
+                WHERE {rollup_condition}
+                """),
+                params
+            )
+            _apply_team_month_rollup(session, rollup_condition, order_ids, 1)
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('work_orders', 'team_month_rollup')
+
+        logger.info(f"批量更新了 {len(rows)} 个工单")
+        return True, None
+
+    except Exception as e:
+        logger.error(f"批量更新工单失败：{e}")
+        return False, str(e)
+
+
+@instrumented
 def delete_work_order(order_id: int) -> tuple[bool, str]:
     """删除工单
 
@@ -239,26 +881,50 @@ def delete_work_order(order_id: int) -> tuple[bool, str]:
     """
     try:
         conn = connect_db()
-        with conn.session as session:
+
+        def transaction(session):
+            dialect = session.get_bind().dialect.name
+            _apply_team_month_rollup(session, "id = :order_id", {'order_id': order_id}, -1)
             session.execute(
                 text("DELETE FROM work_orders WHERE id = :order_id"),
                 params={'order_id': order_id}
             )
-            session.commit()
-            return True, None
+
+            # 记录删除，供已加载工单页的增量刷新移除该工单，并清理超过保留期的记录
+            now = sql_dialect.now(dialect)
+            session.execute(
+                text(f"""
+                INSERT INTO work_order_tombstones (order_id, deleted_at) 
+                VALUES (:order_id, {now})
+                {sql_dialect.on_conflict_update(dialect, ['order_id'], {'deleted_at': now})}
+                """),
+                params={'order_id': order_id}
+            )
+            session.execute(
+                text(f"""
+                DELETE FROM work_order_tombstones 
+                WHERE deleted_at < {sql_dialect.days_ago(dialect, ':days')}
+                """),
+                params={'days': BaseConfig().WORK_ORDER_TOMBSTONE_RETENTION_DAYS}
+            )
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('work_orders', 'team_month_rollup')
+        return True, None
     except Exception as e:
         error_msg = f"删除工单失败：{e}"
         logger.error(error_msg)
         return False, error_msg
 
 
+@instrumented
 def login_auth(username, password):
     try:
         conn = connect_db()
-        query_result = conn.query(
+        query_result = read_sql(
+            conn,
             "SELECT password, role, name FROM users WHERE username = :username",
-            params={'username': username},
-            ttl=0  # 禁用缓存
+            params={'username': username}
         ).to_dict()
         if not query_result or len(query_result['password']) == 0:
             logger.error(f"用户 {username} 不存在")
@@ -286,6 +952,26 @@ def login_auth(username, password):
         return False, None, str(e), None
 
 
+def active_clean_teams_query():
+    """构建获取所有活跃保洁组信息的查询
+
+    Returns:
+        QuerySpec: 结果为保洁组字典列表
+    """
+    return QuerySpec("""
+        SELECT 
+            id,
+            team_name,
+            contact_number,
+            has_abn,
+            notes
+        FROM clean_teams 
+        WHERE is_active = 1
+        ORDER BY team_name ASC
+    """, None, ('clean_teams',), lambda result: result.to_dict('records'))
+
+
+@instrumented
 def get_active_clean_teams():
     """获取所有活跃的保洁组信息
 
@@ -293,31 +979,26 @@ def get_active_clean_teams():
         tuple: (清洁组列表, 错误信息)
     """
     try:
-        conn = connect_db()
-        if not conn:
-            return None, "数据库连接失败"
-
-        result = conn.query("""
-            SELECT 
-                id,
-                team_name,
-                contact_number,
-                has_abn,
-                notes
-            FROM clean_teams 
-            WHERE is_active = 1
-            ORDER BY team_name ASC
-        """, ttl=0)
-
-        # 转换为字典列表格式
-        teams = result.to_dict('records')
-        return teams, None
+        return _fetch_query(active_clean_teams_query()), None
 
     except Exception as e:
         logger.error(f"获取在职保洁组失败：{e}")
         return None, str(e)
 
 
+def staff_names_query():
+    """构建获取所有员工姓名的查询
+
+    Returns:
+        QuerySpec: 结果为按姓名排序的姓名列表
+    """
+    return QuerySpec(
+        "SELECT name FROM users ORDER BY name", None, ('users',),
+        lambda result: result['name'].tolist()
+    )
+
+
+@instrumented
 def get_team_monthly_orders(team_id, year, month):
     """获取指定保洁组的月度工单统计
 
@@ -330,8 +1011,9 @@ def get_team_monthly_orders(team_id, year, month):
         tuple: (DataFrame, error_message)
     """
     try:
-        conn = connect_db()
-        query_result = conn.query("""
+        conn = connect_db(read_only=True)
+        start_date, end_date = get_time_range_bounds('month', date(year, month, 1))
+        query_result = _cached_query(conn, """
             SELECT 
                 wo.work_date,
                 wo.work_time,
@@ -342,19 +1024,16 @@ def get_team_monthly_orders(team_id, year, month):
                 wo.total_amount,
                 wo.subsidy
             FROM work_orders wo
-            WHERE wo.assigned_cleaner = (
-                SELECT team_name 
-                FROM clean_teams 
-                WHERE id = :team_id
-            )
-            AND YEAR(wo.work_date) = :year
-            AND MONTH(wo.work_date) = :month
+            JOIN clean_teams ct ON ct.team_name = wo.assigned_cleaner
+            WHERE ct.id = :team_id
+            AND wo.work_date >= :start_date
+            AND wo.work_date < :end_date
             ORDER BY wo.work_date ASC, wo.work_time ASC
-        """, params={
+        """, ('work_orders', 'clean_teams'), params={
             'team_id': team_id,
-            'year': year,
-            'month': month
-        }, ttl=0)
+            'start_date': start_date,
+            'end_date': end_date
+        })
 
         return query_result, None
 
@@ -363,6 +1042,66 @@ def get_team_monthly_orders(team_id, year, month):
         return pd.DataFrame(), f"获取保洁组月度工单统计失败：{str(e)}"
 
 
+@instrumented
+def get_all_teams_monthly_orders(year, month):
+    """获取所有在职保洁组的月度工单及按保洁组汇总的统计
+
+    工单明细由一次按日期区间筛选的查询获取，汇总统计读取增量维护的 team_month_rollup 表。
+
+    Args:
+        year: 年份
+        month: 月份
+
+    Returns:
+        tuple: (工单明细DataFrame, 按保洁组汇总的DataFrame, error_message)
+            汇总以 team_name 为索引，包含 income1、income2、subsidy、order_amount、
+            total_amount 合计及 order_count 工单数
+    """
+    try:
+        conn = connect_db(read_only=True)
+        start_date, end_date = get_time_range_bounds('month', date(year, month, 1))
+        orders = _cached_query(conn, """
+            SELECT 
+                ct.id AS team_id,
+                wo.assigned_cleaner AS team_name,
+                wo.work_date,
+                wo.work_time,
+                wo.work_address,
+                wo.income1,
+                wo.income2,
+                wo.order_amount,
+                wo.total_amount,
+                wo.subsidy
+            FROM work_orders wo
+            JOIN clean_teams ct ON ct.team_name = wo.assigned_cleaner
+            WHERE wo.work_date >= :start_date
+            AND wo.work_date < :end_date
+            AND ct.is_active = 1
+            AND ct.team_name != '暂未派单'
+            ORDER BY wo.assigned_cleaner ASC, wo.work_date ASC, wo.work_time ASC
+        """, ('work_orders', 'clean_teams'), params={
+            'start_date': start_date,
+            'end_date': end_date
+        })
+
+        # 汇总统计直接读取月度汇总表，无需重新扫描工单
+        totals = _cached_query(conn, """
+            SELECT 
+                team_name, income1, income2, subsidy,
+                order_amount, total_amount, order_count
+            FROM team_month_rollup
+            WHERE year = :year AND month = :month
+        """, ('team_month_rollup',), params={'year': year, 'month': month})
+        totals = totals.set_index('team_name').astype(float)
+
+        return orders, totals, None
+
+    except Exception as e:
+        logger.error(f"获取所有保洁组月度工单失败！错误信息：{e}")
+        return pd.DataFrame(), pd.DataFrame(), f"获取所有保洁组月度工单失败：{str(e)}"
+
+
+@instrumented
 def create_new_account(username, password, name, role):
     """
     创建新的用户账户
@@ -376,7 +1115,8 @@ def create_new_account(username, password, name, role):
         conn = connect_db()
 
         # 首先检查用户名是否已存在
-        check_query = conn.query(
+        check_query = read_sql(
+            conn,
             "SELECT COUNT(*) as count FROM users WHERE username = :username",
             params={'username': username}
         ).to_dict()
@@ -385,7 +1125,7 @@ def create_new_account(username, password, name, role):
             return False, "用户名已存在"
 
         # 使用 text() 函数包装 SQL 语句
-        with conn.session as session:
+        def transaction(session):
             session.execute(
                 text("""
                 INSERT INTO users (username, password, name, role) 
@@ -398,7 +1138,9 @@ def create_new_account(username, password, name, role):
                     'role': role
                 }
             )
-            session.commit()
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('users')
 
         logger.success(f"成功创建新用户：{username}")
         return True, None
@@ -408,11 +1150,12 @@ def create_new_account(username, password, name, role):
         return False, str(e)
 
 
+@instrumented
 def get_all_staff_acc():
     try:
-        conn = connect_db()
-        # 将 ttl 设置为 0 以禁用缓存
-        query_result = conn.query("SELECT *  FROM users", ttl=0)
+        conn = connect_db(read_only=True)
+        # 结果在所有会话间共享，账户增删改后自动失效
+        query_result = _cached_query(conn, "SELECT *  FROM users", ('users',))
         # 移除 id 列，只选择其他需要的列
         df = query_result[['username', 'password', 'role', 'name']]
         df['password'] = "********"
@@ -424,6 +1167,7 @@ def get_all_staff_acc():
         return None, error_message
 
 
+@instrumented
 def delete_account(username):
     """
     删除用户账户
@@ -439,12 +1183,14 @@ def delete_account(username):
         conn = connect_db()
 
         # 使用session执行删除
-        with conn.session as session:
+        def transaction(session):
             session.execute(
                 text("DELETE FROM users WHERE username = :username"),
                 params={'username': username}
             )
-            session.commit()
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('users')
 
         # 只清除被删除用户的会话
         remove_active_session(username)
@@ -457,6 +1203,7 @@ def delete_account(username):
         return False, str(e)
 
 
+@instrumented
 def update_account(username, new_name, new_password=None, new_role=None):
     try:
         conn = connect_db()
@@ -482,18 +1229,20 @@ def update_account(username, new_name, new_password=None, new_role=None):
         """
 
         # 使用session执行更新
-        with conn.session as session:
+        def transaction(session):
             session.execute(text(update_sql), params)
-            session.commit()
+
+        run_in_transaction(conn, transaction)
+        query_cache.bump('users')
 
         # 获取新的数据库连接来验证更新
         verify_conn = connect_db()
 
         if new_password:
-            verify_query = verify_conn.query(
+            verify_query = read_sql(
+                verify_conn,
                 "SELECT password FROM users WHERE username = :username",
-                params={'username': username},
-                ttl=0
+                params={'username': username}
             ).to_dict()
             actual_password = verify_query['password'][0]
             logger.info(f"更新后验证 - 数据库中的新密码: {actual_password}")
@@ -512,6 +1261,7 @@ def update_account(username, new_name, new_password=None, new_role=None):
         return False, str(e)
 
 
+@instrumented
 def delete_clean_team(team_id: int) -> tuple[bool, str]:
     """删除保洁组
 
@@ -525,27 +1275,32 @@ def delete_clean_team(team_id: int) -> tuple[bool, str]:
         conn = connect_db()
 
         # 检查是否有关联的工单
-        check_result = conn.query(
+        check_result = read_sql(
+            conn,
             """
             SELECT COUNT(*) as count 
             FROM work_orders wo 
             JOIN clean_teams ct ON wo.assigned_cleaner = ct.team_name 
             WHERE ct.id = :team_id
             """,
-            params={'team_id': team_id},
-            ttl=0
+            params={'team_id': team_id}
         ).to_dict()
 
         if check_result['count'][0] > 0:
             return False, "该保洁组有关联的工单,无法删除"
 
         # 执行删除操作
-        with conn.session as session:
+        def transaction(session):
             session.execute(
                 text("DELETE FROM clean_teams WHERE id = :team_id"),
                 params={'team_id': team_id}
             )
-            session.commit()
+
+        run_in_transaction(conn, transaction)
+
+        # 保洁组信息已变化，清除ABN状态缓存
+        invalidate_team_cache()
+        query_cache.bump('clean_teams')
 
         return True, ""
 
@@ -554,12 +1309,13 @@ def delete_clean_team(team_id: int) -> tuple[bool, str]:
         return False, str(e)
 
 
+@instrumented
 def get_all_clean_teams():
     """获取所有保洁组信息,包含ABN状态"""
     try:
-        conn = connect_db()
+        conn = connect_db(read_only=True)
 
-        df = conn.query("""
+        df = _cached_query(conn, """
             SELECT 
                 id, 
                 team_name AS '保洁组名称',
@@ -575,7 +1331,7 @@ def get_all_clean_teams():
             FROM clean_teams 
             WHERE team_name != '暂未派单'
             ORDER BY is_active DESC, team_name ASC
-        """, ttl=0)
+        """, ('clean_teams',))
 
         return df, None
 
@@ -584,23 +1340,24 @@ def get_all_clean_teams():
         return None, str(e)
 
 
+@instrumented
 def create_clean_team(team_name: str, contact_number: str, has_abn: bool = False, notes: str = None) -> tuple[bool, str]:
     """创建新保洁组"""
     try:
         conn = connect_db()
 
         # 检查名称是否存在
-        check_result = conn.query(
+        check_result = read_sql(
+            conn,
             "SELECT id FROM clean_teams WHERE team_name = :team_name",
-            params={'team_name': team_name},
-            ttl=0
+            params={'team_name': team_name}
         )
 
         if not check_result.empty:
             return False, "保洁组名称已存在"
 
         # 插入新记录
-        with conn.session as session:
+        def transaction(session):
             session.execute(
                 text("""
                 INSERT INTO clean_teams (team_name, contact_number, has_abn, notes)
@@ -613,7 +1370,12 @@ def create_clean_team(team_name: str, contact_number: str, has_abn: bool = False
                     'notes': notes
                 }
             )
-            session.commit()
+
+        run_in_transaction(conn, transaction)
+
+        # 保洁组信息已变化，清除ABN状态缓存
+        invalidate_team_cache()
+        query_cache.bump('clean_teams')
 
         return True, ""
 
@@ -621,133 +1383,111 @@ def create_clean_team(team_name: str, contact_number: str, has_abn: bool = False
         return False, str(e)
 
 
+@instrumented
 def update_clean_team(team_id: int, team_name: str, contact_number: str, has_abn: bool, is_active: bool = True, notes: str = None) -> tuple[bool, str]:
+    """更新保洁组信息
+
+    保洁组信息、工单中的保洁组名称以及ABN状态变化后的工单金额在同一个事务中更新，
+    金额直接由一条 UPDATE 语句在数据库中重新计算。
+
+    Returns:
+        tuple[bool, str]: (是否成功, 错误信息)
+    """
     try:
         conn = connect_db()
 
-        # 检查是否存在相同名称的其他保洁组
-        check_result = conn.query(
-            """
-            SELECT id, team_name, has_abn FROM clean_teams 
-            WHERE id = :team_id
-            """,
-            params={'team_id': team_id},
-            ttl=0
-        )
+        def transaction(session):
+            dialect = session.get_bind().dialect.name
 
-        if check_result.empty:
-            return False, "保洁组不存在"
+            # 锁定该保洁组，读取修改前的名称和ABN状态
+            check_result = session.execute(
+                text(f"""
+                SELECT team_name, has_abn FROM clean_teams 
+                WHERE id = :team_id
+                {sql_dialect.for_update(dialect)}
+                """),
+                params={'team_id': team_id}
+            ).fetchone()
 
-        old_team_name = check_result.iloc[0]['team_name']
-        old_has_abn = bool(check_result.iloc[0]['has_abn'])
-
-        # 如果ABN状态发生改变，需要更新相关工单的总金额
-        if has_abn != old_has_abn:
-            # 获取该保洁组的所有工单
-            orders = conn.query(
-                """
-                SELECT id, income1, income2 
-                FROM work_orders 
-                WHERE assigned_cleaner = :team_name
-                """,
-                params={'team_name': old_team_name},
-                ttl=0
-            )
+            if check_result is None:
+                return False
+
+            old_team_name = check_result.team_name
+            old_has_abn = bool(check_result.has_abn)
+
+            # 名称或ABN状态变化会影响该保洁组的月度汇总，先移出旧值
+            rollup_changed = team_name != old_team_name or has_abn != old_has_abn
+            if rollup_changed:
+                _apply_team_month_rollup(
+                    session, "assigned_cleaner = :team_name", {'team_name': old_team_name}, -1
+                )
 
             # 更新保洁组信息
-            with conn.session as s1:
-                s1.execute(
-                    text("""
-                    UPDATE clean_teams 
-                    SET team_name = :team_name,
-                        contact_number = :contact_number,
-                        has_abn = :has_abn,
-                        is_active = :is_active,
-                        notes = :notes,
-                        updated_at = NOW()
-                    WHERE id = :team_id
+            session.execute(
+                text(f"""
+                UPDATE clean_teams 
+                SET team_name = :team_name,
+                    contact_number = :contact_number,
+                    has_abn = :has_abn,
+                    is_active = :is_active,
+                    notes = :notes,
+                    updated_at = {sql_dialect.now(dialect)}
+                WHERE id = :team_id
+                """),
+                params={
+                    'team_name': team_name,
+                    'contact_number': contact_number,
+                    'has_abn': 1 if has_abn else 0,
+                    'is_active': 1 if is_active else 0,
+                    'notes': notes,
+                    'team_id': team_id
+                }
+            )
+
+            # 外键级联可能已经更新了工单中的保洁组名称，因此新旧名称都需要匹配
+            params = {
+                'new_team_name': team_name,
+                'old_team_name': old_team_name
+            }
+
+            if has_abn != old_has_abn:
+                # ABN状态改变：一条语句同时更新保洁组名称和所有相关工单的金额
+                # 保洁组信息已在本事务中更新，金额表达式读取到的是新的ABN状态
+                result = session.execute(
+                    text(f"""
+                    UPDATE work_orders 
+                    SET assigned_cleaner = :new_team_name,
+                        order_amount = {order_amount_sql('income1', 'income2')},
+                        total_amount = {total_amount_sql('income1', 'income2', ':new_team_name')}
+                    WHERE assigned_cleaner IN (:old_team_name, :new_team_name)
                     """),
-                    params={
-                        'team_name': team_name,
-                        'contact_number': contact_number,
-                        'has_abn': 1 if has_abn else 0,
-                        'is_active': 1 if is_active else 0,
-                        'notes': notes,
-                        'team_id': team_id
-                    }
+                    params=params
                 )
-                s1.commit()
-
-            # 更新所有相关工单的总金额
-            if not orders.empty:
-                with conn.session as s2:
-                    for _, order in orders.iterrows():
-                        # 计算新的金额
-                        order_amount, total_amount = calculate_total_amount(
-                            float(order['income1']),
-                            float(order['income2']),
-                            team_name,
-                            conn
-                        )
-
-                        # 更新工单金额
-                        s2.execute(
-                            text("""
-                            UPDATE work_orders 
-                            SET order_amount = :order_amount,
-                                total_amount = :total_amount,
-                                assigned_cleaner = :new_team_name
-                            WHERE id = :order_id
-                            """),
-                            params={
-                                'order_amount': order_amount,
-                                'total_amount': total_amount,
-                                'new_team_name': team_name,
-                                'order_id': order['id']
-                            }
-                        )
-                    s2.commit()
-
-                # 记录日志
-                logger.info(f"已更新 {len(orders)} 个工单的金额")
-        else:
-            # 如果ABN状态没有改变，只更新保洁组信息
-            with conn.session as session:
+                logger.info(f"已更新 {result.rowcount} 个工单的金额")
+            elif team_name != old_team_name:
+                # 如果team_name发生改变，更新工单表中的保洁组名称
                 session.execute(
                     text("""
-                    UPDATE clean_teams 
-                    SET team_name = :team_name,
-                        contact_number = :contact_number,
-                        has_abn = :has_abn,
-                        is_active = :is_active,
-                        notes = :notes,
-                        updated_at = NOW()
-                    WHERE id = :team_id
+                    UPDATE work_orders 
+                    SET assigned_cleaner = :new_team_name
+                    WHERE assigned_cleaner = :old_team_name
                     """),
-                    params={
-                        'team_name': team_name,
-                        'contact_number': contact_number,
-                        'has_abn': 1 if has_abn else 0,
-                        'is_active': 1 if is_active else 0,
-                        'notes': notes,
-                        'team_id': team_id
-                    }
+                    params=params
                 )
 
-                # 如果team_name发生改变，更新工单表中的保洁组名称
-                if team_name != old_team_name:
-                    session.execute(
-                        text("""
-                        UPDATE work_orders 
-                        SET assigned_cleaner = :new_team_name
-                        WHERE assigned_cleaner = :old_team_name
-                        """),
-                        params={
-                            'new_team_name': team_name,
-                            'old_team_name': old_team_name
-                        }
-                    )
-                session.commit()
+            if rollup_changed:
+                _apply_team_month_rollup(
+                    session, "assigned_cleaner = :team_name", {'team_name': team_name}, 1
+                )
+
+            return True
+
+        if not run_in_transaction(conn, transaction):
+            return False, "保洁组不存在"
+
+        # 保洁组信息已变化，清除ABN状态缓存；名称和ABN状态变化还会改写工单及月度汇总
+        invalidate_team_cache()
+        query_cache.bump('clean_teams', 'work_orders', 'team_month_rollup')
 
         return True, ""
 
@@ -0,0 +1,95 @@
+"""
+Description: 跨会话共享的查询结果缓存
+
+    缓存以 (SQL, 参数) 为键，每条结果记录查询时所依赖各表的写入版本号。
+    所有修改数据的函数在提交后递增对应表的版本号，读取时版本号不一致即视为失效，
+    因此在没有写入发生之前，重复查询直接由内存返回，且不会读到过期数据。
+
+-*- Encoding: UTF-8 -*-
+@File     ：query_cache.py
+@Author   ：King Songtao
+@Time     ：2025/2/21 上午10:26
+@Contact  ：king.songtao@gmail.com
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from configs.settings import BaseConfig
+
+
+class QueryCache:
+    """按表写入版本号失效的查询结果缓存（进程内共享，线程安全）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._written_at = {}
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(sql: str, params: dict = None) -> tuple:
+        """由查询语句和参数生成缓存键"""
+        return sql, tuple(sorted((params or {}).items()))
+
+    def snapshot(self, tables: tuple) -> tuple:
+        """获取各表当前的写入版本号，需在执行查询之前获取"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, key, snapshot: tuple):
+        """读取缓存，缓存记录的版本号与当前版本号不一致时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == snapshot:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, snapshot: tuple, result):
+        """写入缓存，snapshot 为执行查询前获取的版本号
+
+        若查询期间有写入发生，记录的版本号已经过期，下次读取会自动失效。
+        """
+        with self._lock:
+            self._entries[key] = (snapshot, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self, *tables: str):
+        """递增表的写入版本号，使依赖这些表的缓存全部失效"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._written_at[table] = time.monotonic()
+
+    def written_within(self, tables: tuple, seconds: float) -> bool:
+        """判断最近 seconds 秒内本进程是否写入过其中任意一张表"""
+        since = time.monotonic() - seconds
+        with self._lock:
+            return any(self._written_at.get(table, float('-inf')) > since for table in tables)
+
+    def clear(self):
+        """清空所有缓存结果"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+query_cache = QueryCache(BaseConfig().QUERY_CACHE_MAX_ENTRIES)
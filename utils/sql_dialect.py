@@ -0,0 +1,88 @@
+"""
+Description: 与数据库方言相关的 SQL 片段
+
+    db_operations_v2 中依赖数据库方言的语法集中在这里生成，其余 SQL 均为两种数据库通用的写法。
+    支持 MySQL（生产环境）和 SQLite（本地开发、测试与性能分析，见 sqlite_backend.py）。
+    dialect 参数为 SQLAlchemy 方言名称，即 engine.dialect.name。
+
+-*- Encoding: UTF-8 -*-
+@File     ：sql_dialect.py
+@Author   ：King Songtao
+@Time     ：2025/2/23 上午10:20
+@Contact  ：king.songtao@gmail.com
+"""
+
+
+def now(dialect: str) -> str:
+    """当前时间，SQLite 中为 UTC 时间，与 CURRENT_TIMESTAMP 默认值一致"""
+    return "CURRENT_TIMESTAMP" if dialect == 'sqlite' else "NOW()"
+
+
+def days_ago(dialect: str, days: str) -> str:
+    """当前时间往前 days 天
+
+    Args:
+        dialect: 数据库方言
+        days: 天数的SQL表达式（绑定参数或数字）
+    """
+    if dialect == 'sqlite':
+        return f"datetime('now', '-' || ({days}) || ' days')"
+    return f"DATE_SUB(NOW(), INTERVAL {days} DAY)"
+
+
+def year(dialect: str, column: str) -> str:
+    """日期列的年份（整数）"""
+    if dialect == 'sqlite':
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+    return f"YEAR({column})"
+
+
+def month(dialect: str, column: str) -> str:
+    """日期列的月份（整数）"""
+    if dialect == 'sqlite':
+        return f"CAST(strftime('%m', {column}) AS INTEGER)"
+    return f"MONTH({column})"
+
+
+def inserted(dialect: str, column: str) -> str:
+    """在 on_conflict_update 的赋值中引用本次插入的新值"""
+    return f"excluded.{column}" if dialect == 'sqlite' else f"VALUES({column})"
+
+
+def on_conflict_update(dialect: str, keys: list, assignments: dict) -> str:
+    """生成主键或唯一键冲突时改为更新的子句，附加在 INSERT 语句末尾
+
+    Args:
+        dialect: 数据库方言
+        keys: 冲突判断使用的主键或唯一键列（SQLite 需要，MySQL 忽略）
+        assignments: {列名: 更新后的值表达式}，用 inserted() 引用插入的新值
+
+    Returns:
+        str: SQL 子句
+    """
+    updates = ",\n    ".join(f"{column} = {value}" for column, value in assignments.items())
+    if dialect == 'sqlite':
+        return f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET\n    {updates}"
+    return f"ON DUPLICATE KEY UPDATE\n    {updates}"
+
+
+def for_update(dialect: str) -> str:
+    """锁定读取的行直到事务结束
+
+    SQLite 没有行锁，run_in_transaction 在事务开始时即获取写锁（见 begin_write），返回空字符串。
+    """
+    return "" if dialect == 'sqlite' else "FOR UPDATE"
+
+
+def begin_write(dialect: str):
+    """写事务开始时执行的语句，不需要时返回 None"""
+    return "BEGIN IMMEDIATE" if dialect == 'sqlite' else None
+
+
+def begin_read_snapshot(dialect: str):
+    """只读批量查询开始时执行的语句，使所有查询读取同一个一致性快照，不需要时返回 None"""
+    if dialect == 'mysql':
+        return "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
+    if dialect == 'sqlite':
+        return "BEGIN"
+    return None
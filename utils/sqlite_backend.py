@@ -0,0 +1,221 @@
+"""
+Description: SQLite 本地数据库
+
+    secrets 中 mysql 连接的 url 指向 SQLite 文件（如 sqlite:///data/atm_erp.sqlite）时，
+    db_engine 通过 prepare_engine 配置连接，并把 docs/db_structure.txt 中的 MySQL 建表语句
+    转换为 SQLite 语句，自动创建缺少的表、索引以及 updated_at 自动更新触发器，
+    无需 MySQL 服务即可运行页面、测试和性能分析。
+
+    SQLite 中 CURRENT_TIMESTAMP 为 UTC 时间；必须使用数据库文件，内存数据库无法在连接池中共享。
+    也可以在项目根目录手动创建数据库：python -m utils.sqlite_backend data/atm_erp.sqlite
+
+-*- Encoding: UTF-8 -*-
+@File     ：sqlite_backend.py
+@Author   ：King Songtao
+@Time     ：2025/2/23 上午10:45
+@Contact  ：king.songtao@gmail.com
+"""
+import re
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+
+from configs.settings import *
+from utils import sql_dialect
+
+# 建表语句来源
+SCHEMA_FILE = Path(__file__).resolve().parent.parent / 'docs' / 'db_structure.txt'
+
+# 建表后写入的基础数据：未派单工单默认关联的保洁组
+SEED_STATEMENTS = [
+    "INSERT OR IGNORE INTO clean_teams (team_name, contact_number) VALUES ('暂未派单', '')"
+]
+
+_COMMENT = re.compile(r"\s+comment\s+'(?:[^']|'')*'", re.I)
+_ON_UPDATE = re.compile(r"\s+on update current_timestamp", re.I)
+_AUTO_PRIMARY_KEY = re.compile(r"^(\w+)\s+int\s+auto_increment\s+primary key", re.I)
+_ENUM = re.compile(r"^(\w+)\s+enum\s*(\([^)]*\))", re.I)
+_NULL = re.compile(r"(?<!not)(?<!is)\s+null\b", re.I)
+_CREATE_TABLE = re.compile(r"^create table\s+(\w+)\s*\(", re.I)
+_FOREIGN_KEY = re.compile(r"^(?:constraint\s+(\w+)\s+)?foreign key\s*(\([^)]*\))", re.I)
+_CREATE_INDEX = re.compile(r"^create\s+(unique\s+)?index\s+(\w+)\s+on\s+(\w+)\s*(\(.*\))$", re.I | re.S)
+_INSERT_SELECT = re.compile(r"^insert into\s+\w+\s*\([^)]*\)\s*select\b", re.I)
+_DATE_PART = re.compile(r"\b(year|month)\((\w+)\)", re.I)
+
+_prepare_lock = threading.Lock()
+
+
+def _to_date(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text).date() if len(text) > 10 else date.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _to_datetime(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+# 日期时间以 ISO 格式文本保存，读取时按列声明的类型还原，与 MySQL 驱动返回的类型一致
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('date', _to_date)
+sqlite3.register_converter('datetime', _to_datetime)
+sqlite3.register_converter('timestamp', _to_datetime)
+
+
+def _split_outside(text: str, separator: str) -> list:
+    """按不在括号和引号内的分隔符拆分"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif not quoted:
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == separator and depth == 0:
+                parts.append(text[start:i])
+                start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parenthesized(text: str, start: int) -> str:
+    """返回从 start 处的左括号到与之匹配的右括号之间的内容（不含括号）"""
+    depth, quoted = 0, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+            if depth == 0:
+                return text[start + 1:i]
+    raise ValueError(f"括号不匹配：{text[start:start + 50]}")
+
+
+def _translate_column(table: str, definition: str, extra_statements: list) -> str:
+    """转换一条列定义或表约束，需要在建表后执行的触发器和索引语句追加到 extra_statements"""
+    definition = _COMMENT.sub('', ' '.join(definition.split()))
+
+    if _ON_UPDATE.search(definition):
+        definition = _ON_UPDATE.sub('', definition)
+        column = definition.split()[0]
+        # 对应 MySQL 的 ON UPDATE CURRENT_TIMESTAMP，语句中显式修改该列时不覆盖
+        extra_statements.append(f"""CREATE TRIGGER IF NOT EXISTS {table}_{column}_on_update
+AFTER UPDATE ON {table} FOR EACH ROW WHEN NEW.{column} IS OLD.{column}
+BEGIN
+    UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END""")
+
+    foreign_key = _FOREIGN_KEY.match(definition)
+    if foreign_key:
+        # InnoDB 会为外键列自动创建索引，SQLite 不会，需显式创建
+        name = foreign_key.group(1) or '_'.join(re.findall(r"\w+", foreign_key.group(2)))
+        extra_statements.append(f"CREATE INDEX IF NOT EXISTS {table}_{name}_index ON {table} {foreign_key.group(2)}")
+
+    definition = _AUTO_PRIMARY_KEY.sub(r"\1 INTEGER PRIMARY KEY AUTOINCREMENT", definition)
+    definition = _ENUM.sub(r"\1 TEXT CHECK (\1 IN \2)", definition)
+    return _NULL.sub('', definition)
+
+
+def translate_mysql_ddl(ddl: str) -> list:
+    """将 MySQL 建表语句转换为 SQLite 语句
+
+    支持 docs/db_structure.txt 中用到的语法：自增主键、枚举、列和表注释、表选项、
+    ON UPDATE CURRENT_TIMESTAMP（转换为触发器）、外键（同时创建 InnoDB 自动创建的索引）、普通索引，
+    以及初始化数据的 INSERT ... SELECT（其中的 year()、month() 转换为 SQLite 函数）。
+
+    Args:
+        ddl: 以分号分隔的 MySQL 建表语句
+
+    Returns:
+        list: SQLite 语句，均可重复执行
+    """
+    ddl = '\n'.join(line for line in ddl.splitlines() if not line.lstrip().startswith('--'))
+    statements = []
+
+    for statement in _split_outside(ddl, ';'):
+        table_match = _CREATE_TABLE.match(statement)
+        index_match = _CREATE_INDEX.match(statement)
+        insert_match = _INSERT_SELECT.match(statement)
+
+        if table_match:
+            table = table_match.group(1)
+            # 表定义之后的注释、字符集等表选项直接丢弃
+            body = _parenthesized(statement, table_match.end() - 1)
+            extra_statements = []
+            columns = [
+                _translate_column(table, definition, extra_statements) for definition in _split_outside(body, ',')
+            ]
+            statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)")
+            statements.extend(extra_statements)
+        elif index_match:
+            unique, name, table, columns = index_match.groups()
+            statements.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} {columns}")
+        elif insert_match:
+            # 初始化语句自带重复执行的判断条件，只需转换日期函数
+            statements.append(_DATE_PART.sub(
+                lambda match: getattr(sql_dialect, match.group(1).lower())('sqlite', match.group(2)), statement
+            ))
+        else:
+            raise ValueError(f"无法转换的建表语句：{statement[:50]}")
+
+    return statements
+
+
+def connect_args() -> dict:
+    """SQLite 连接参数：等待写锁的时间与写入超时一致，按列声明的类型还原日期时间"""
+    return {
+        'timeout': BaseConfig().DATABASE_TIMEOUT_SETTING['write_timeout'],
+        'detect_types': sqlite3.PARSE_DECLTYPES,
+        'check_same_thread': False
+    }
+
+
+def _on_connect(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    # WAL 模式下读取不会阻塞写入
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.close()
+
+
+def prepare_engine(engine):
+    """配置 SQLite 引擎并创建缺少的表，同一个引擎只执行一次
+
+    Args:
+        engine: SQLAlchemy 引擎
+    """
+    with _prepare_lock:
+        if getattr(engine, '_sqlite_prepared', False):
+            return
+
+        event.listen(engine, 'connect', _on_connect)
+        with engine.begin() as connection:
+            for statement in translate_mysql_ddl(SCHEMA_FILE.read_text(encoding='utf-8')) + SEED_STATEMENTS:
+                connection.exec_driver_sql(statement)
+
+        engine._sqlite_prepared = True
+        logger.info(f"SQLite 数据库已就绪：{engine.url.database}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("用法：python -m utils.sqlite_backend <数据库文件>")
+        sys.exit(1)
+    prepare_engine(create_engine(f"sqlite:///{sys.argv[1]}", connect_args=connect_args()))
+    print("创建完成")
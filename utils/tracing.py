@@ -0,0 +1,178 @@
+"""
+Description: 链路追踪
+
+    每次页面运行（page_timer）开启一条链路，页面中的数据库函数、LLM 调用和 Word 文档操作作为子 span 记录，
+    所有 span 以 JSON Lines 写入日志目录下轮转的 traces.jsonl，每行一个 span：
+        trace_id / span_id / parent_id: 链路、span 及父 span 的 ID，按 trace_id 可还原一次用户操作
+        name: 名称，如 page.new_work_order_v2、db.create_work_order、llm.validate_address、docx.generate_receipt
+        start: 开始时间；duration_ms: 耗时；self_ms: 扣除子 span 后的耗时（如 time.sleep、页面渲染），子 span 并发时为 0
+        status: ok、error（异常）或 interrupted（页面跳转、st.stop 等中断）
+        attributes: 附加信息，根 span 包含页面、用户和会话 ID
+
+    没有进行中的链路时（如命令行脚本、后台线程），span 不做任何记录。
+    离线分析：pandas.read_json('logs/traces.jsonl', lines=True)
+
+-*- Encoding: UTF-8 -*-
+@File     ：tracing.py
+@Author   ：King Songtao
+@Time     ：2025/2/24 下午2:30
+@Contact  ：king.songtao@gmail.com
+"""
+import contextvars
+import inspect
+import json
+import logging
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from configs.settings import *
+
+# Streamlit 用于页面跳转和停止运行的异常，不视为错误
+_CONTROL_FLOW_EXCEPTIONS = {'RerunException', 'StopException'}
+
+# 当前上下文中进行中的 span
+_current_span = contextvars.ContextVar('trace_current_span', default=None)
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+class Span:
+    """一个进行中的 span，attributes 可在结束前补充"""
+    __slots__ = ('trace_id', 'span_id', 'parent', 'name', 'attributes', 'started_at', 'start', 'child_ms')
+
+    def __init__(self, name: str, parent=None, attributes: dict = None):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent = parent
+        self.name = name
+        self.attributes = attributes or {}
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.child_ms = 0.0
+
+
+def _get_sink() -> logging.Logger:
+    """轮转写入 JSON Lines 的日志记录器，首次使用时创建"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            config = BaseConfig()
+            settings = config.TRACE_SETTING
+            log_directory = Path(config.LOG_DIRECTORY)
+            log_directory.mkdir(parents=True, exist_ok=True)
+
+            handler = RotatingFileHandler(
+                log_directory / settings['file_name'], maxBytes=settings['max_bytes'],
+                backupCount=settings['backup_count'], encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            sink = logging.getLogger('atm_erp.trace')
+            sink.setLevel(logging.INFO)
+            sink.propagate = False
+            sink.addHandler(handler)
+            _sink = sink
+        return _sink
+
+
+def _write(span: Span, status: str, error: str = None):
+    duration_ms = (time.perf_counter() - span.start) * 1000
+    if span.parent:
+        span.parent.child_ms += duration_ms
+
+    record = {
+        'trace_id': span.trace_id,
+        'span_id': span.span_id,
+        'parent_id': span.parent.span_id if span.parent else None,
+        'name': span.name,
+        'start': span.started_at.isoformat(timespec='milliseconds'),
+        'duration_ms': round(duration_ms, 2),
+        'self_ms': round(max(duration_ms - span.child_ms, 0.0), 2),
+        'status': status,
+        'error': error,
+        'attributes': span.attributes
+    }
+    try:
+        _get_sink().info(json.dumps(record, ensure_ascii=False, default=str))
+    except Exception as e:
+        logger.warning(f"写入链路追踪记录失败：{e}")
+
+
+@contextmanager
+def _run_span(span: Span):
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if type(e).__name__ in _CONTROL_FLOW_EXCEPTIONS:
+            _write(span, 'interrupted')
+        else:
+            _write(span, 'error', f"{type(e).__name__}: {e}")
+        raise
+    else:
+        _write(span, 'ok')
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """开启一条新链路，作为根 span
+
+    Args:
+        name: 根 span 名称
+        attributes: 附加信息
+    """
+    if not BaseConfig().TRACE_SETTING['enabled']:
+        yield None
+        return
+    with _run_span(Span(name, attributes=attributes)) as span:
+        yield span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """在当前链路中记录一个子 span，没有进行中的链路时不做记录
+
+    Args:
+        name: span 名称
+        attributes: 附加信息，也可在 with 块中通过返回的 Span.attributes 补充
+
+    Returns:
+        Span | None: 进行中的 span，不记录时为 None
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _run_span(Span(name, parent, attributes)) as current:
+        yield current
+
+
+def traced(name: str):
+    """以 span 记录函数的每次调用，支持普通函数和协程函数
+
+    Args:
+        name: span 名称
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
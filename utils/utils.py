@@ -16,6 +16,12 @@ from docx.shared import Pt
 from langchain.document_loaders import toml
 from langchain.memory import ConversationBufferMemory
 from configs.log_config import *
+from utils.app_metrics import record_llm_call
+from utils.tracing import traced
+
+
+# 登录页面，未登录或无权限时跳转至此
+LOGIN_PAGE = "app.py"
 
 
 def stream_res(res):
@@ -48,8 +54,7 @@ def check_login_state():
             return False, st.session_state["role"]
     except Exception as e:
         logger.error(f"检测登录状态时发生错误！错误信息：{e}")
-        st.error("发生未知错误！即将跳转到首页...")
-        st.switch_page("pages/login_page.py")
+        redirect(LOGIN_PAGE, "发生未知错误！请重新登录。", icon="⚠️")
 
     # """通过cookies管理登陆状态"""
     # if cookies.get("is_logged_in") == "1":
@@ -61,6 +66,58 @@ def check_login_state():
     #     return False, cookies.get("role")
 
 
+def notify(message, icon="ℹ️"):
+    """暂存一条提示，在下一次页面运行时以 st.toast 显示
+
+    st.switch_page 会立即结束本次运行，跳转前显示的内容用户看不到，因此提示留到目标页面显示，
+    由浏览器端定时关闭，服务端无需等待。
+
+    Args:
+        message: 提示内容
+        icon: 提示图标
+    """
+    st.session_state.setdefault("pending_notices", []).append((message, icon))
+
+
+def show_notices():
+    """显示暂存的提示"""
+    for message, icon in st.session_state.pop("pending_notices", []):
+        st.toast(message, icon=icon)
+
+
+def redirect(page, message=None, icon="ℹ️"):
+    """立即跳转到指定页面，提示在目标页面显示
+
+    Args:
+        page: 目标页面
+        message: 提示内容，为空时不提示
+        icon: 提示图标
+    """
+    if message:
+        notify(message, icon)
+    st.switch_page(page)
+
+
+def require_login(roles=None, users=None):
+    """页面访问守卫，未登录或无权限时立即跳转至登录页，并显示暂存的提示
+
+    Args:
+        roles: 允许访问的角色，为空时不限制
+        users: 允许访问的登录账号，为空时不限制
+
+    Returns:
+        str: 当前用户的角色
+    """
+    login_state, role = check_login_state()
+    if not login_state:
+        redirect(LOGIN_PAGE, "您还没有登录！请先登录。", icon="⚠️")
+    if (roles and role not in roles) or (users and st.session_state.get("logged_in_username") not in users):
+        redirect(LOGIN_PAGE, "您没有权限访问此页面！请联系系统管理员。", icon="⚠️")
+
+    show_notices()
+    return role
+
+
 def set_login_state(is_logged_in, role, name):
     st.session_state["login_state"] = True if is_logged_in else False
     st.session_state["role"] = role
@@ -113,6 +170,7 @@ def extract_date_from_html(html_content):
     return None
 
 
+@traced('docx.generate_receipt')
 def generate_receipt(doc, data_dict):
     """
         替换文档中的占位符并统一字体
@@ -285,6 +343,7 @@ def confirm_back():
             clear_form_state()
 
 
+@traced('llm.get_response')
 def get_response(prompt, memory):
     """
     获取AI响应的函数
@@ -314,18 +373,22 @@ def get_response(prompt, memory):
         verbose=True
     )
 
+    start = time.perf_counter()
     try:
         if not isinstance(prompt, str):
             prompt = str(prompt)
 
         response = chain.run(prompt)
+        record_llm_call('get_response', (time.perf_counter() - start) * 1000)
         return response
 
     except Exception as e:
+        record_llm_call('get_response', (time.perf_counter() - start) * 1000, success=False)
         logger.error(f"Error in get_response: {str(e)}")
         return f"抱歉，生成回复时出现错误：{str(e)}"
 
 
+@traced('llm.get_response_connie')
 def get_response_connie(prompt, memory):
     """
     获取AI响应的函数
@@ -348,6 +411,7 @@ def get_response_connie(prompt, memory):
     max_retries = 3
     retry_delay = 5  # 增加重试间隔
     last_error = None
+    start = time.perf_counter()
 
     for attempt in range(max_retries):
         try:
@@ -383,6 +447,7 @@ def get_response_connie(prompt, memory):
             if not all(keyword in response for keyword in required_keywords):
                 raise ValueError("API响应缺少必要的内容结构")
 
+            record_llm_call('get_response_connie', (time.perf_counter() - start) * 1000, retries=attempt)
             return response
 
         except Exception as e:
@@ -394,6 +459,7 @@ def get_response_connie(prompt, memory):
                 continue
 
             # 所有重试都失败后，抛出异常
+            record_llm_call('get_response_connie', (time.perf_counter() - start) * 1000, retries=attempt, success=False)
             raise Exception(f"多次尝试后API调用仍然失败: {last_error}")
 
 
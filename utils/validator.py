@@ -5,7 +5,10 @@ import aiohttp
 import hashlib
 from datetime import datetime, timedelta
 import re
+import time
 import streamlit as st
+from utils.app_metrics import record_llm_call
+from utils.tracing import traced
 
 
 @dataclass
@@ -23,6 +26,8 @@ class LLMAddressValidator:
         self.deepseek_api_key = deepseek_api_key
         self.cache = {}
         self.cache_expiry = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.CACHE_DURATION = timedelta(hours=24)
         self.session = None
         self.validation_patterns = self._compile_address_patterns()
@@ -74,11 +79,14 @@ class LLMAddressValidator:
     - 单元号在前，用斜杠分隔
     - 确保包含所有必要的方向标示(如North, South等)"""
 
+    @traced('llm.validate_address')
     async def _call_deepseek_api(self, prompt: str) -> Optional[Dict]:
         """调用 Deepseek API 进行地址验证"""
         if not self.session:
             self.session = aiohttp.ClientSession()
 
+        start = time.perf_counter()
+        success = False
         try:
             async with self.session.post(
                     "https://api.deepseek.com/v1/chat/completions",
@@ -96,7 +104,9 @@ class LLMAddressValidator:
                     }
             ) as response:
                 if response.status == 200:
-                    return await response.json()
+                    result = await response.json()
+                    success = True
+                    return result
                 return None
 
         except aiohttp.ClientError as e:
@@ -105,6 +115,8 @@ class LLMAddressValidator:
         except Exception as e:
             st.error(f"未预期的错误: {str(e)}")
             return None
+        finally:
+            record_llm_call('validate_address', (time.perf_counter() - start) * 1000, success=success)
 
     def _parse_llm_response(self, response: Dict, raw_input: str) -> Optional[AddressMatch]:
         """解析 LLM 响应并创建 AddressMatch 对象"""
@@ -204,7 +216,9 @@ class LLMAddressValidator:
         # 检查缓存
         cache_key = hashlib.md5(input_address.lower().encode()).hexdigest()
         if cache_key in self.cache and datetime.now() < self.cache_expiry[cache_key]:
+            self.cache_hits += 1
             return self.cache[cache_key]
+        self.cache_misses += 1
 
         matches = []
 
@@ -253,6 +267,21 @@ class LLMAddressValidator:
 
             return matches
 
+    def cache_stats(self) -> dict:
+        """获取地址缓存统计信息"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / total if total else 0.0
+        }
+
+    def clear_cache(self):
+        """清空地址缓存"""
+        self.cache.clear()
+        self.cache_expiry.clear()
+
     async def close_session(self):
         """关闭 aiohttp 会话"""
         if self.session: